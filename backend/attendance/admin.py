@@ -1,8 +1,15 @@
 from django.contrib import admin
-from .models import Attendance
+from .models import Attendance, Site
 
 
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = ("user", "day", "check_in", "check_out")
     list_filter = ("day",)
+
+
+@admin.register(Site)
+class SiteAdmin(admin.ModelAdmin):
+    list_display = ("name", "latitude", "longitude", "radius", "is_active")
+    list_filter = ("is_active",)
+    filter_horizontal = ("users", "teams")
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AttendanceConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "attendance"
+
+    def ready(self):
+        from attendance import signals  # noqa
@@ -10,7 +10,52 @@ class PeriodicityChoices(models.TextChoices):
     YEARLY = "yearly", _("Yearly")
 
 
+class GranularityChoices(models.TextChoices):
+    """Bucket size of the KPI time series (PostgreSQL date_trunc fields)."""
+
+    DAY = "day", _("Day")
+    WEEK = "week", _("Week")
+    MONTH = "month", _("Month")
+
+
+class RollingUnitChoices(models.TextChoices):
+    DAYS = "days", _("Days")
+    BUSINESS_DAYS = "business_days", _("Business days")
+    WEEKS = "weeks", _("Weeks")
+
+
 class AttendanceStatusChoices(models.TextChoices):
     ABSENT = "absent", _("Absent")
     PRESENT = "present", _("Present")
     EXCUSED = "excused", _("Excused")
+
+
+class ClockIngestionChoices(models.TextChoices):
+    DIRECT = "direct", _("Direct")
+    STREAM = "stream", _("Stream")
+
+
+class ClockSyncStatusChoices(models.TextChoices):
+    APPLIED = "applied", _("Applied")
+    DUPLICATE = "duplicate", _("Already recorded")
+    NO_CHECK_IN = "no_check_in", _("No check-in before this check-out")
+    OUT_OF_ORDER = "out_of_order", _("Check-out before check-in")
+    OUT_OF_HOURS = "out_of_hours", _("Outside of the allowed hours")
+    TOO_FAR = "too_far", _("Too far from the company location")
+    FUTURE = "future", _("Timestamp in the future")
+    TOO_OLD = "too_old", _("Timestamp older than the maximum age")
+    UNKNOWN_USER = "unknown_user", _("Unknown or inactive user")
+    FORBIDDEN = "forbidden", _("Not allowed to clock for this user")
+
+
+class ReportKindChoices(models.TextChoices):
+    ATTENDANCE = "attendance", _("Attendance")
+    TEAM_TIMESHEETS = "team_timesheets", _("Monthly team timesheets")
+
+
+class ReportStatusChoices(models.TextChoices):
+    PENDING = "pending", _("Pending")
+    RUNNING = "running", _("Running")
+    SUCCEEDED = "succeeded", _("Succeeded")
+    FAILED = "failed", _("Failed")
+    CANCELLED = "cancelled", _("Cancelled")
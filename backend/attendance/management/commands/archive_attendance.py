@@ -0,0 +1,33 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from attendance.utils import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves the attendances of the years before the hot window "
+        "(ATTENDANCE_HOT_YEARS) to the attendance archive, or restores the "
+        "archived attendances of a year."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--restore",
+            type=int,
+            metavar="YEAR",
+            help="Move the archived attendances of this year back to the table.",
+        )
+
+    def handle(self, *args, **options):
+        year = options["restore"]
+        if year is not None:
+            restored = archive.restore_attendance(date(year, 1, 1), date(year, 12, 31))
+            self.stdout.write(
+                self.style.SUCCESS(f"Restored {restored} archived attendances")
+            )
+            return
+
+        archived = archive.archive_attendance(archive.get_hot_start())
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} attendances"))
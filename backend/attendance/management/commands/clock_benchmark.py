@@ -0,0 +1,264 @@
+import http.client
+import json
+import logging
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+
+from attendance import serializers as attendance_serializers
+from attendance.management.commands.seed_clock_benchmark import get_benchmark_users
+from users.tokens import RoleRefreshToken
+
+REQUEST_ID_HEADER = "HTTP_X_BENCHMARK_REQUEST"
+WAVES = {"check_in": True, "check_out": False}
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class QueryRecorder:
+    """Counts the SQL queries (and their time) of the current thread's request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class InstrumentedApplication:
+    """
+    Wraps the project WSGI application to record the queries of each request.
+    Requests are served as HTTPS, as behind the production proxy.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.records = {}
+
+    def __call__(self, environ, start_response):
+        environ["wsgi.url_scheme"] = "https"
+        recorder = QueryRecorder()
+        try:
+            with connection.execute_wrapper(recorder):
+                return self.application(environ, start_response)
+        finally:
+            self.records[environ.get(REQUEST_ID_HEADER)] = recorder
+
+
+class LockWaitSampler(threading.Thread):
+    """
+    Samples pg_stat_activity for backends waiting on a lock. The number of
+    waiting backends times the sampling interval estimates the lock-wait time.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.waiting_seconds = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            with connection.cursor() as cursor:
+                while not self._stop_event.wait(self.interval):
+                    cursor.execute(
+                        "SELECT count(*) FROM pg_stat_activity "
+                        "WHERE datname = current_database() AND wait_event_type = 'Lock'"
+                    )
+                    self.waiting_seconds += cursor.fetchone()[0] * self.interval
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _percentile(values, percent):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fires concurrent check-in/check-out waves at /api/clocks/ through the "
+        "project WSGI application and reports throughput, latency percentiles, "
+        "SQL queries per request and lock-wait time. "
+        "Seed the users first with seed_clock_benchmark."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, help="Defaults to all seeded users.")
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument(
+            "--waves", nargs="+", choices=list(WAVES), default=list(WAVES)
+        )
+        parser.add_argument(
+            "--duplicates",
+            type=int,
+            default=1,
+            help="Requests sent per user and wave (double taps, retries).",
+        )
+        parser.add_argument(
+            "--open-windows",
+            action="store_true",
+            help="Accept clocks at any hour (benchmark outside of the clock windows).",
+        )
+        parser.add_argument("--lock-sample-interval", type=float, default=0.01)
+        parser.add_argument("--json", action="store_true", help="Print a JSON report.")
+
+    def handle(self, *args, **options):
+        users = list(get_benchmark_users().order_by("email")[: options["users"]])
+        if not users:
+            raise CommandError("No benchmark users, run seed_clock_benchmark first.")
+
+        if options["open_windows"]:
+            for name in ("CHECK_IN", "CHECK_OUT"):
+                setattr(attendance_serializers, f"{name}_START_HOUR", 0)
+                setattr(attendance_serializers, f"{name}_END_HOUR", 23)
+
+        # Rejected clocks (400) are expected and counted in the report
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+
+        tokens = [str(RoleRefreshToken.for_user(user).access_token) for user in users]
+        # The server threads open their own connections
+        connection.close()
+
+        application = InstrumentedApplication(get_wsgi_application())
+        server = make_server(
+            "127.0.0.1",
+            0,
+            application,
+            server_class=ThreadingWSGIServer,
+            handler_class=QuietWSGIRequestHandler,
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        try:
+            reports = [
+                self.run_wave(server.server_port, application, wave, tokens, options)
+                for wave in options["waves"]
+            ]
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(reports, indent=2))
+        else:
+            for report in reports:
+                self.print_report(report)
+
+    def run_wave(self, port, application, wave, tokens, options):
+        body = json.dumps({"is_check_in_action": WAVES[wave]})
+        requests = [
+            (f"{wave}-{i}-{n}", token)
+            for n in range(options["duplicates"])
+            for i, token in enumerate(tokens)
+        ]
+
+        def send(request):
+            request_id, token = request
+            client = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+            start = time.perf_counter()
+            try:
+                client.request(
+                    "POST",
+                    "/api/clocks/",
+                    body=body,
+                    headers={
+                        "Host": "localhost",
+                        "Authorization": f"Bearer {token}",
+                        "Content-Type": "application/json",
+                        "X-Benchmark-Request": request_id,
+                    },
+                )
+                response = client.getresponse()
+                response.read()
+                return request_id, response.status, time.perf_counter() - start
+            finally:
+                client.close()
+
+        application.records.clear()
+        sampler = LockWaitSampler(options["lock_sample_interval"])
+        sampler.start()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            results = list(executor.map(send, requests))
+        duration = time.perf_counter() - start
+
+        sampler.stop()
+
+        latencies = sorted(latency * 1000 for _, _, latency in results)
+        records = [application.records[request_id] for request_id, _, _ in results]
+        queries = [record.count for record in records]
+
+        return {
+            "wave": wave,
+            "requests": len(results),
+            "concurrency": options["concurrency"],
+            "statuses": dict(Counter(status for _, status, _ in results)),
+            "duration_s": round(duration, 3),
+            "throughput_rps": round(len(results) / duration, 1),
+            "latency_ms": {
+                "p50": round(_percentile(latencies, 50), 2),
+                "p95": round(_percentile(latencies, 95), 2),
+                "p99": round(_percentile(latencies, 99), 2),
+                "max": round(latencies[-1], 2),
+            },
+            "queries_per_request": {
+                "mean": round(statistics.mean(queries), 2),
+                "max": max(queries),
+            },
+            "db_time_per_request_ms": round(
+                statistics.mean(record.duration for record in records) * 1000, 2
+            ),
+            "lock_wait_s": round(sampler.waiting_seconds, 3),
+        }
+
+    def print_report(self, report):
+        latency = report["latency_ms"]
+        queries = report["queries_per_request"]
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Wave {report['wave']}"))
+        self.stdout.write(
+            f"  requests     {report['requests']} "
+            f"(concurrency {report['concurrency']}) -> {report['statuses']}"
+        )
+        self.stdout.write(
+            f"  throughput   {report['throughput_rps']} req/s "
+            f"in {report['duration_s']} s"
+        )
+        self.stdout.write(
+            f"  latency      p50 {latency['p50']} ms | p95 {latency['p95']} ms | "
+            f"p99 {latency['p99']} ms | max {latency['max']} ms"
+        )
+        self.stdout.write(
+            f"  SQL          {queries['mean']} queries/request (max {queries['max']}), "
+            f"{report['db_time_per_request_ms']} ms/request"
+        )
+        self.stdout.write(f"  lock wait    {report['lock_wait_s']} s (sampled)")
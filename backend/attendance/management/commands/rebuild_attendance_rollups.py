@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from attendance.utils.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the attendance rollups (daily, weekly, monthly and yearly "
+        "totals per user) from the attendances, e.g. after a backfill or an "
+        "import with bulk operations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            dest="user_ids",
+            action="append",
+            help="Only rebuild the rollups of this user id (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        saved = rebuild_rollups(options["user_ids"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {saved} attendance rollups"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.utils import snapshots
+from attendance.utils.kpi_helpers import get_snapshot_until
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrites the columnar attendance snapshots of the closed days, e.g. "
+        "after a correction of the attendances of a snapshotted day."
+    )
+
+    def handle(self, *args, **options):
+        if not snapshots.get_snapshot_dir():
+            raise CommandError("ATTENDANCE_SNAPSHOT_DIR is not set.")
+
+        exported = snapshots.rebuild_snapshots(get_snapshot_until())
+        self.stdout.write(
+            self.style.SUCCESS(f"Exported {exported} attendances to the snapshots")
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from attendance.utils.rollups import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstructs the best performers leaderboards (per period and per "
+        "team) from the attendance rollups, e.g. after a Redis flush."
+    )
+
+    def handle(self, *args, **options):
+        saved = rebuild_leaderboards()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {saved} leaderboard scores"))
@@ -0,0 +1,72 @@
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from attendance.models import Attendance
+from attendance.tasks import create_daily_attendance_records
+from attendance.utils.rollups import refresh_rollups
+from users.constants import UserGroupChoices
+from users.models import User
+from users.utils import get_group
+
+BENCHMARK_EMAIL_DOMAIN = "clock-benchmark.local"
+
+
+def get_benchmark_users():
+    return User.objects.filter(email__endswith=f"@{BENCHMARK_EMAIL_DOMAIN}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds N active employees with today's attendance rows "
+        "(create_daily_attendance_records) for the clock benchmark."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Delete the benchmark users (and their attendances) first.",
+        )
+
+    def handle(self, *args, **options):
+        count = options["users"]
+
+        if options["reset"]:
+            deleted, _ = get_benchmark_users().delete()
+            self.stdout.write(f"Deleted {deleted} benchmark objects")
+
+        existing = set(get_benchmark_users().values_list("email", flat=True))
+        password = make_password("benchmark")
+        new_users = [
+            User(
+                email=f"user{i}@{BENCHMARK_EMAIL_DOMAIN}",
+                firstname="Benchmark",
+                lastname=f"User {i}",
+                password=password,
+                is_active=True,
+            )
+            for i in range(count)
+            if f"user{i}@{BENCHMARK_EMAIL_DOMAIN}" not in existing
+        ]
+        User.objects.bulk_create(new_users, batch_size=1000)
+
+        employee_group = get_group(UserGroupChoices.EMPLOYEE)
+        User.groups.through.objects.bulk_create(
+            [
+                User.groups.through(user_id=user.id, group_id=employee_group.id)
+                for user in new_users
+            ],
+            batch_size=1000,
+        )
+        self.stdout.write(f"Created {len(new_users)} benchmark users")
+
+        # Make today's rows clockable again for a new run
+        today = timezone.localdate()
+        reset = Attendance.objects.filter(user__in=get_benchmark_users(), day=today)
+        user_ids = list(reset.values_list("user_id", flat=True))
+        reset.update(check_in=None, check_out=None)
+        refresh_rollups((user_id, today) for user_id in user_ids)
+
+        self.stdout.write(create_daily_attendance_records())
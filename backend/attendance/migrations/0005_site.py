@@ -0,0 +1,71 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:56
+
+import shortuuid.django_fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("attendance", "0004_attendance_excuse_reason_attendance_is_excused"),
+        ("teams", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Site",
+            fields=[
+                (
+                    "id",
+                    shortuuid.django_fields.ShortUUIDField(
+                        alphabet=None,
+                        editable=False,
+                        length=22,
+                        max_length=22,
+                        prefix="",
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created at"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+                ("name", models.CharField(max_length=150, unique=True)),
+                ("latitude", models.FloatField()),
+                ("longitude", models.FloatField()),
+                (
+                    "radius",
+                    models.PositiveIntegerField(
+                        default=150,
+                        help_text="Authorized radius (in meters) around the site location.",
+                    ),
+                ),
+                ("is_active", models.BooleanField(default=True)),
+                (
+                    "teams",
+                    models.ManyToManyField(
+                        blank=True, related_name="allowed_sites", to="teams.team"
+                    ),
+                ),
+                (
+                    "users",
+                    models.ManyToManyField(
+                        blank=True,
+                        related_name="allowed_sites",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Site",
+                "verbose_name_plural": "Sites",
+                "ordering": ["name"],
+            },
+        ),
+    ]
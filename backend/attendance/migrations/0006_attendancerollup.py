@@ -0,0 +1,84 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:10
+
+import django.db.models.deletion
+import shortuuid.django_fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("attendance", "0005_site"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AttendanceRollup",
+            fields=[
+                (
+                    "id",
+                    shortuuid.django_fields.ShortUUIDField(
+                        alphabet=None,
+                        editable=False,
+                        length=22,
+                        max_length=22,
+                        prefix="",
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created at"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+                (
+                    "periodicity",
+                    models.CharField(
+                        choices=[
+                            ("daily", "Daily"),
+                            ("weekly", "Weekly"),
+                            ("monthly", "Monthly"),
+                            ("yearly", "Yearly"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("period_start", models.DateField()),
+                ("days", models.PositiveIntegerField(default=0)),
+                ("delayed_days", models.PositiveIntegerField(default=0)),
+                ("extra_days", models.PositiveIntegerField(default=0)),
+                ("absent_days", models.PositiveIntegerField(default=0)),
+                ("worked_seconds", models.FloatField(default=0)),
+                ("delay_seconds", models.FloatField(default=0)),
+                ("extra_seconds", models.FloatField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attendance_rollups",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-period_start"],
+                "indexes": [
+                    models.Index(
+                        fields=["periodicity", "period_start", "-worked_seconds"],
+                        name="rollup_period_worked_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "periodicity", "period_start"),
+                        name="unique_user_period_rollup",
+                    )
+                ],
+            },
+        ),
+    ]
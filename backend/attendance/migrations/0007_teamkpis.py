@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:52
+
+from django.db import migrations, models
+
+CREATE_TEAM_KPIS = """
+CREATE MATERIALIZED VIEW attendance_teamkpis AS
+SELECT
+    members.team_id || ':' || rollups.periodicity || ':' || rollups.period_start AS id,
+    members.team_id,
+    rollups.periodicity,
+    rollups.period_start,
+    SUM(rollups.days) AS days,
+    SUM(rollups.delayed_days) AS delayed_days,
+    SUM(rollups.extra_days) AS extra_days,
+    SUM(rollups.absent_days) AS absent_days,
+    SUM(rollups.worked_seconds) AS worked_seconds,
+    SUM(rollups.delay_seconds) AS delay_seconds,
+    SUM(rollups.extra_seconds) AS extra_seconds
+FROM teams_team_members AS members
+JOIN attendance_attendancerollup AS rollups ON rollups.user_id = members.user_id
+GROUP BY members.team_id, rollups.periodicity, rollups.period_start;
+
+-- Required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX attendance_teamkpis_team_period_uniq
+    ON attendance_teamkpis (team_id, periodicity, period_start);
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("attendance", "0006_attendancerollup"),
+        ("teams", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            CREATE_TEAM_KPIS,
+            reverse_sql="DROP MATERIALIZED VIEW attendance_teamkpis;",
+        ),
+        migrations.CreateModel(
+            name="TeamKPIs",
+            fields=[
+                (
+                    "id",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                (
+                    "periodicity",
+                    models.CharField(
+                        choices=[
+                            ("daily", "Daily"),
+                            ("weekly", "Weekly"),
+                            ("monthly", "Monthly"),
+                            ("yearly", "Yearly"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("period_start", models.DateField()),
+                ("days", models.PositiveIntegerField()),
+                ("delayed_days", models.PositiveIntegerField()),
+                ("extra_days", models.PositiveIntegerField()),
+                ("absent_days", models.PositiveIntegerField()),
+                ("worked_seconds", models.FloatField()),
+                ("delay_seconds", models.FloatField()),
+                ("extra_seconds", models.FloatField()),
+            ],
+            options={
+                "db_table": "attendance_teamkpis",
+                "managed": False,
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:09
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.datetime
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("attendance", "0008_reportjob"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="attendance",
+            name="check_in_seconds",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.functions.comparison.Cast(
+                    django.db.models.functions.datetime.Extract(
+                        django.db.models.functions.datetime.TruncTime("check_in"),
+                        "epoch",
+                    ),
+                    models.FloatField(),
+                ),
+                help_text="Seconds from midnight (UTC) to the check-in, if any.",
+                output_field=models.FloatField(),
+            ),
+        ),
+        migrations.AddField(
+            model_name="attendance",
+            name="worked_seconds",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.functions.comparison.Coalesce(
+                    django.db.models.functions.comparison.Cast(
+                        django.db.models.functions.datetime.Extract(
+                            models.ExpressionWrapper(
+                                django.db.models.expressions.CombinedExpression(
+                                    models.F("check_out"), "-", models.F("check_in")
+                                ),
+                                output_field=models.DurationField(),
+                            ),
+                            "epoch",
+                        ),
+                        models.FloatField(),
+                    ),
+                    models.Value(0.0),
+                ),
+                help_text="Seconds between check-in and check-out (0 if missing).",
+                output_field=models.FloatField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="attendance",
+            index=models.Index(
+                fields=["day", "-worked_seconds"], name="attendance_day_worked_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="attendance",
+            index=models.Index(
+                fields=["day", "check_in_seconds"], name="attendance_day_check_in_idx"
+            ),
+        ),
+    ]
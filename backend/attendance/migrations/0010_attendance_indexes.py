@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:13
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("attendance", "0009_attendance_stored_seconds"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="attendance",
+            name="unique_user_day_attendance",
+        ),
+        migrations.AddIndex(
+            model_name="attendance",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=["day"], name="attendance_day_brin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="attendance",
+            index=models.Index(
+                condition=models.Q(
+                    ("check_in__isnull", False), ("check_out__isnull", True)
+                ),
+                fields=["user", "day"],
+                name="attendance_open_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="attendance",
+            index=models.Index(
+                condition=models.Q(("check_in__isnull", True), ("is_excused", False)),
+                fields=["day", "user"],
+                name="attendance_absent_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="attendance",
+            constraint=models.UniqueConstraint(
+                fields=("user", "day"),
+                include=(
+                    "check_in",
+                    "check_out",
+                    "is_excused",
+                    "worked_seconds",
+                    "check_in_seconds",
+                ),
+                name="unique_user_day_attendance",
+            ),
+        ),
+    ]
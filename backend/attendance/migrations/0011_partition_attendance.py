@@ -0,0 +1,112 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:02
+
+from django.db import migrations
+
+# Columns written on insert (worked_seconds and check_in_seconds are generated)
+COLUMNS = "id, created_at, updated_at, user_id, day, check_in, check_out, is_excused, excuse_reason"
+
+# Replaces the {old} table by the {new} one: the rows are copied, then the
+# indexes and constraints of the old table are recreated with their names.
+# The primary key of a partitioned table must contain the partition key, so
+# it is (id, day) on the partitioned table, (id) otherwise.
+REPLACE_TABLE = """
+DO $$
+DECLARE
+    item record;
+BEGIN
+    INSERT INTO {new} ({columns}) SELECT {columns} FROM {old};
+
+    CREATE TEMP TABLE attendance_definitions AS
+        SELECT conname AS name, pg_get_constraintdef(oid) AS definition,
+            TRUE AS is_constraint
+        FROM pg_constraint
+        WHERE conrelid = '{old}'::regclass AND contype IN ('f', 'u')
+        UNION ALL
+        SELECT indexname, indexdef, FALSE
+        FROM pg_indexes
+        WHERE tablename = '{old}' AND indexname NOT IN (
+            SELECT conname FROM pg_constraint WHERE conrelid = '{old}'::regclass
+        );
+
+    DROP TABLE {old};
+    ALTER TABLE {new} RENAME TO attendance_attendance;
+    ALTER TABLE attendance_attendance
+        ADD CONSTRAINT attendance_attendance_pkey PRIMARY KEY ({primary_key});
+
+    FOR item IN SELECT * FROM attendance_definitions LOOP
+        IF item.is_constraint THEN
+            EXECUTE format(
+                'ALTER TABLE attendance_attendance ADD CONSTRAINT %I %s',
+                item.name, item.definition
+            );
+        ELSE
+            EXECUTE replace(item.definition, '{old}', 'attendance_attendance');
+        END IF;
+    END LOOP;
+    DROP TABLE attendance_definitions;
+END $$;
+"""
+
+PARTITION_ATTENDANCE = """
+ALTER TABLE attendance_attendance RENAME TO attendance_attendance_unpartitioned;
+
+CREATE TABLE attendance_attendance_partitioned (
+    LIKE attendance_attendance_unpartitioned INCLUDING DEFAULTS INCLUDING GENERATED
+) PARTITION BY RANGE (day);
+
+-- Monthly partitions from the first attendance to three months ahead (the
+-- next ones are created by the create_attendance_partitions task), and a
+-- default partition for the days out of them.
+DO $$
+DECLARE
+    month date;
+BEGIN
+    FOR month IN
+        SELECT generate_series(
+            date_trunc('month', COALESCE(MIN(day), CURRENT_DATE)),
+            date_trunc('month', CURRENT_DATE) + interval '3 months',
+            interval '1 month'
+        )::date
+        FROM attendance_attendance_unpartitioned
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF attendance_attendance_partitioned '
+            'FOR VALUES FROM (%L) TO (%L)',
+            'attendance_attendance_' || to_char(month, '"y"YYYY"m"MM'),
+            month,
+            (month + interval '1 month')::date
+        );
+    END LOOP;
+END $$;
+
+CREATE TABLE attendance_attendance_default
+    PARTITION OF attendance_attendance_partitioned DEFAULT;
+""" + REPLACE_TABLE.format(
+    old="attendance_attendance_unpartitioned",
+    new="attendance_attendance_partitioned",
+    columns=COLUMNS,
+    primary_key="id, day",
+)
+
+UNPARTITION_ATTENDANCE = """
+ALTER TABLE attendance_attendance RENAME TO attendance_attendance_partitioned;
+
+CREATE TABLE attendance_attendance_unpartitioned (
+    LIKE attendance_attendance_partitioned INCLUDING DEFAULTS INCLUDING GENERATED
+);
+""" + REPLACE_TABLE.format(
+    old="attendance_attendance_partitioned",
+    new="attendance_attendance_unpartitioned",
+    columns=COLUMNS,
+    primary_key="id",
+)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("attendance", "0010_attendance_indexes"),
+    ]
+
+    operations = [
+        migrations.RunSQL(PARTITION_ATTENDANCE, reverse_sql=UNPARTITION_ATTENDANCE),
+    ]
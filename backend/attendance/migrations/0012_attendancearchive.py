@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:40
+
+import shortuuid.django_fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("attendance", "0011_partition_attendance"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AttendanceArchive",
+            fields=[
+                (
+                    "id",
+                    shortuuid.django_fields.ShortUUIDField(
+                        alphabet=None,
+                        editable=False,
+                        length=22,
+                        max_length=22,
+                        prefix="",
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created at"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+                ("month", models.DateField(unique=True)),
+                ("rows", models.PositiveIntegerField(default=0)),
+                ("data", models.BinaryField()),
+            ],
+            options={
+                "verbose_name": "Attendance archive",
+                "verbose_name_plural": "Attendance archives",
+                "ordering": ["month"],
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import connection, models
 from django.utils.translation import gettext_lazy as _
 
 from users.models import BaseModel, User
@@ -7,56 +8,58 @@ from users.models import BaseModel, User
 from django.db import models
 from django.db.models import (
     F,
+    Q,
     Case,
+    Count,
+    Sum,
     When,
     Value,
     ExpressionWrapper,
     FloatField,
     CharField,
 )
-from django.db.models.functions import Extract, TruncDate
+from django.db.models.functions import Cast, Coalesce, Extract, TruncTime
+
+from attendance.constants import (
+    AttendanceStatusChoices,
+    PeriodicityChoices,
+    ReportKindChoices,
+    ReportStatusChoices,
+)
+
+
+def expected_work_seconds() -> int:
+    return (settings.CHECK_OUT_HOUR - settings.CHECK_IN_HOUR) * 3600
+
+
+# Conditions on the stored columns rather than on the derived delay and
+# extra seconds (which depend on settings), so they can use the indexes.
+# These definitions, and those of the generated columns, are repeated in
+# Python for the archived attendances (attendance.utils.archive) and in NumPy
+# for the snapshots (attendance.utils.snapshots): test_archive and
+# test_snapshots check that they give the same totals as rollup_totals.
+def is_delayed_q() -> Q:
+    return Q(check_in_seconds__gt=settings.CHECK_IN_HOUR * 3600)
 
-from attendance.constants import AttendanceStatusChoices
+
+def has_extra_time_q() -> Q:
+    return Q(worked_seconds__gt=expected_work_seconds())
 
 
 class AttendanceQuerySet(models.QuerySet):
     def with_worked_seconds(self):
         """
-        Annotates each record with worked_seconds (in seconds),
-        safely handling null or missing check-in/out.
+        worked_seconds (in seconds, 0 without check-in or check-out) is
+        stored on each record (generated column), kept for compatibility.
         """
-        return self.annotate(
-            worked_seconds=Case(
-                When(
-                    check_in__isnull=False,
-                    check_out__isnull=False,
-                    then=ExpressionWrapper(
-                        # EXTRACT(epoch FROM interval) returns seconds as float
-                        models.functions.Extract(
-                            ExpressionWrapper(
-                                F("check_out") - F("check_in"),
-                                output_field=models.DurationField(),
-                            ),
-                            "epoch",
-                        ),
-                        output_field=FloatField(),
-                    ),
-                ),
-                default=Value(0.0),
-                output_field=FloatField(),
-            )
-        )
+        return self
 
     def with_extra_seconds(self):
         """
         Annotates each record with extra_seconds (in seconds)
         """
-        expected_work_seconds = (
-            settings.CHECK_OUT_HOUR - settings.CHECK_IN_HOUR
-        ) * 3600
-
         return self.with_worked_seconds().annotate(
-            extra_seconds=F("worked_seconds") - Value(expected_work_seconds)
+            extra_seconds=F("worked_seconds") - Value(float(expected_work_seconds()))
         )
 
     def with_delay_seconds(self):
@@ -64,29 +67,30 @@ class AttendanceQuerySet(models.QuerySet):
         Annotates each record with delay_seconds (in seconds),
         calculating delay based on CHECK_IN_HOUR from settings.
         """
-        check_in_hour = settings.CHECK_IN_HOUR
-
         return self.annotate(
-            delay_seconds=Case(
-                When(
-                    check_in__isnull=False,
-                    then=ExpressionWrapper(
-                        Extract(
-                            ExpressionWrapper(
-                                F("check_in") - TruncDate(F("check_in")),
-                                output_field=models.DurationField(),
-                            ),
-                            "epoch",
-                        )
-                        - Value(check_in_hour * 3600),
-                        output_field=FloatField(),
-                    ),
-                ),
-                default=Value(0.0),
+            delay_seconds=Coalesce(
+                F("check_in_seconds") - Value(float(settings.CHECK_IN_HOUR * 3600)),
+                Value(0.0),
                 output_field=FloatField(),
             )
         )
 
+    def delayed(self):
+        """Records checked in after CHECK_IN_HOUR (can use an index)."""
+        return self.filter(is_delayed_q())
+
+    def with_extra_time(self):
+        """Records worked longer than expected (can use an index)."""
+        return self.filter(has_extra_time_q())
+
+    def open(self):
+        """Records checked in but not checked out yet."""
+        return self.filter(check_in__isnull=False, check_out__isnull=True)
+
+    def absent(self):
+        """Records without check-in nor excuse."""
+        return self.filter(check_in__isnull=True, is_excused=False)
+
     def with_status(self):
         """
         Annotates each record with attendance status:
@@ -108,6 +112,36 @@ class AttendanceQuerySet(models.QuerySet):
             )
         )
 
+    def rollup_totals(self, *fields):
+        """
+        Returns the KPI totals of the records grouped by the given fields, in
+        a single query (conditional aggregation): days, delayed_days,
+        extra_days, absent_days, and total_worked_seconds,
+        total_delay_seconds (positive delays only), total_extra_seconds
+        (positive extra time only).
+        """
+        is_delayed = is_delayed_q()
+        has_extra_time = has_extra_time_q()
+
+        return (
+            self.with_extra_seconds()
+            .with_delay_seconds()
+            .with_status()
+            .values(*fields)
+            .annotate(
+                days=Count("id"),
+                delayed_days=Count("id", filter=is_delayed),
+                extra_days=Count("id", filter=has_extra_time),
+                absent_days=Count(
+                    "id", filter=Q(status=AttendanceStatusChoices.ABSENT.value)
+                ),
+                total_worked_seconds=Sum("worked_seconds"),
+                total_delay_seconds=Sum("delay_seconds", filter=is_delayed),
+                total_extra_seconds=Sum("extra_seconds", filter=has_extra_time),
+            )
+            .order_by()
+        )
+
 
 class AttendanceManager(models.Manager):
     def get_queryset(self):
@@ -125,16 +159,183 @@ class AttendanceManager(models.Manager):
     def with_status(self):
         return self.get_queryset().with_status()
 
+    def delayed(self):
+        return self.get_queryset().delayed()
+
+    def open(self):
+        return self.get_queryset().open()
+
+    def absent(self):
+        return self.get_queryset().absent()
+
+    def with_extra_time(self):
+        return self.get_queryset().with_extra_time()
+
+    def record_clock(self, user, day, is_check_in_action: bool, at, allowed=True):
+        """
+        Applies a check-in or check-out for (user, day) in a single statement.
+
+        The row is upserted with INSERT ... ON CONFLICT (user, day) DO UPDATE,
+        the update being guarded by the state of the row (no check-in yet for
+        a check-in, a check-in but no check-out for a check-out) and by
+        `allowed`. When the guard rejects the write, the row that blocked it
+        is returned instead, so callers can tell why without another read.
+
+        Returns the attendance (or None if no row exists) annotated with:
+        - applied: True if the clock has been recorded by this call
+        - created: True if the row was inserted by this call
+        """
+        model = self.model
+        table = model._meta.db_table
+        column = "check_in" if is_check_in_action else "check_out"
+        stamp = at if allowed else None
+
+        if is_check_in_action:
+            guard = f"{table}.check_in IS NULL"
+        else:
+            guard = f"{table}.check_in IS NOT NULL AND {table}.check_out IS NULL"
+
+        sql = f"""
+            WITH upsert AS (
+                INSERT INTO {table}
+                    (id, created_at, updated_at, user_id, day, check_in, is_excused)
+                VALUES (%(id)s, %(at)s, %(at)s, %(user_id)s, %(day)s, %(check_in)s, FALSE)
+                ON CONFLICT (user_id, day) DO UPDATE
+                    SET {column} = %(stamp)s, updated_at = %(at)s
+                    WHERE {guard} AND %(stamp)s::timestamptz IS NOT NULL
+                -- Only an inserted row has the new id (xmax is not available
+                -- on partitioned tables)
+                RETURNING *, (id = %(id)s) AS created
+            )
+            SELECT *, {column} IS NOT NULL AS applied FROM upsert
+            UNION ALL
+            SELECT *, FALSE AS created, FALSE AS applied FROM {table}
+            WHERE user_id = %(user_id)s AND day = %(day)s
+                AND NOT EXISTS (SELECT 1 FROM upsert)
+        """
+        params = {
+            "id": model._meta.pk.get_default(),
+            "at": at,
+            "user_id": user.pk,
+            "day": day,
+            "check_in": stamp if is_check_in_action else None,
+            "stamp": stamp,
+        }
+
+        return next(iter(self.raw(sql, params)), None)
+
+    def bulk_record_clocks(self, events):
+        """
+        Applies many clock events with one multi-row statement per action.
+
+        `events` is an iterable of (user_id, day, is_check_in_action, at).
+        Like record_clock, the first clock of a kind wins: duplicates are
+        collapsed to the earliest one and rows that already hold the clock
+        are left untouched. Check-ins are applied before check-outs, so both
+        can be flushed in the same batch.
+
+        Returns the set of (user_id, day, is_check_in_action) actually applied.
+        """
+        earliest = {}
+        for user_id, day, is_check_in_action, at in events:
+            key = (user_id, day, is_check_in_action)
+            if key not in earliest or at < earliest[key]:
+                earliest[key] = at
+
+        check_ins = [(k[0], k[1], at) for k, at in earliest.items() if k[2]]
+        check_outs = [(k[0], k[1], at) for k, at in earliest.items() if not k[2]]
+
+        table = self.model._meta.db_table
+        applied = set()
+
+        with connection.cursor() as cursor:
+            if check_ins:
+                rows = ", ".join(
+                    ["(%s, %s, %s, %s, %s::date, %s, FALSE)"] * len(check_ins)
+                )
+                params = []
+                for user_id, day, at in check_ins:
+                    params += [
+                        self.model._meta.pk.get_default(),
+                        at,
+                        at,
+                        user_id,
+                        day,
+                        at,
+                    ]
+                cursor.execute(
+                    f"""
+                    INSERT INTO {table}
+                        (id, created_at, updated_at, user_id, day, check_in, is_excused)
+                    VALUES {rows}
+                    ON CONFLICT (user_id, day) DO UPDATE
+                        SET check_in = EXCLUDED.check_in, updated_at = EXCLUDED.updated_at
+                        WHERE {table}.check_in IS NULL
+                    RETURNING user_id, day
+                    """,
+                    params,
+                )
+                applied |= {(user_id, day, True) for user_id, day in cursor.fetchall()}
+
+            if check_outs:
+                rows = ", ".join(["(%s, %s::date, %s::timestamptz)"] * len(check_outs))
+                params = [value for event in check_outs for value in event]
+                cursor.execute(
+                    f"""
+                    UPDATE {table}
+                    SET check_out = clocks.at, updated_at = clocks.at
+                    FROM (VALUES {rows}) AS clocks (user_id, day, at)
+                    WHERE {table}.user_id = clocks.user_id
+                        AND {table}.day = clocks.day
+                        AND {table}.check_in IS NOT NULL
+                        AND {table}.check_out IS NULL
+                    RETURNING {table}.user_id, {table}.day
+                    """,
+                    params,
+                )
+                applied |= {(user_id, day, False) for user_id, day in cursor.fetchall()}
+
+        return applied
+
 
 class Attendance(BaseModel):
     """Model to track user attendance per day."""
 
     class Meta:
         constraints = [
+            # Covering: per-user date ranges are read from the index only
             models.UniqueConstraint(
-                fields=["user", "day"], name="unique_user_day_attendance"
+                fields=["user", "day"],
+                include=[
+                    "check_in",
+                    "check_out",
+                    "is_excused",
+                    "worked_seconds",
+                    "check_in_seconds",
+                ],
+                name="unique_user_day_attendance",
             )
         ]
+        indexes = [
+            # Range scans over days (attendances are inserted day by day)
+            BrinIndex(fields=["day"], name="attendance_day_brin"),
+            models.Index(
+                fields=["user", "day"],
+                condition=Q(check_in__isnull=False, check_out__isnull=True),
+                name="attendance_open_idx",
+            ),
+            models.Index(
+                fields=["day", "user"],
+                condition=Q(check_in__isnull=True, is_excused=False),
+                name="attendance_absent_idx",
+            ),
+            models.Index(
+                fields=["day", "-worked_seconds"], name="attendance_day_worked_idx"
+            ),
+            models.Index(
+                fields=["day", "check_in_seconds"], name="attendance_day_check_in_idx"
+            ),
+        ]
         ordering = ["-day"]
 
     objects = AttendanceManager()
@@ -152,10 +353,49 @@ class Attendance(BaseModel):
         blank=True,
         help_text=_("Reason for excused absence, if applicable."),
     )
+    # Computed by PostgreSQL on write (generated columns)
+    worked_seconds = models.GeneratedField(
+        expression=Coalesce(
+            Cast(
+                Extract(
+                    ExpressionWrapper(
+                        F("check_out") - F("check_in"),
+                        output_field=models.DurationField(),
+                    ),
+                    "epoch",
+                ),
+                FloatField(),
+            ),
+            Value(0.0),
+        ),
+        output_field=FloatField(),
+        db_persist=True,
+        help_text=_("Seconds between check-in and check-out (0 if missing)."),
+    )
+    # Time of the check-in in TIME_ZONE (UTC), as the delays are computed
+    check_in_seconds = models.GeneratedField(
+        expression=Cast(
+            Extract(TruncTime("check_in"), "epoch"),
+            FloatField(),
+        ),
+        output_field=FloatField(),
+        db_persist=True,
+        help_text=_("Seconds from midnight (UTC) to the check-in, if any."),
+    )
 
     def __str__(self):
         return f"{self.user} - {self.day}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # (user_id, day) as loaded, whose rollups are refreshed too when the
+        # attendance is moved to another user or day (see attendance.signals)
+        loaded = dict(zip(field_names, values))
+        if "user_id" in loaded and "day" in loaded:
+            instance._loaded_user_day = (loaded["user_id"], loaded["day"])
+        return instance
+
     @property
     def is_absent(self) -> bool:
         return not self.check_in and not self.check_out
@@ -166,3 +406,163 @@ class Attendance(BaseModel):
             return False
 
         return self.check_in.hour >= settings.CHECK_IN_HOUR
+
+
+class AttendanceRollup(BaseModel):
+    """
+    Totals of the attendances of a user over a day, week, month or year,
+    kept up to date when attendances change (see attendance.utils.rollups).
+    """
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "periodicity", "period_start"],
+                name="unique_user_period_rollup",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["periodicity", "period_start", "-worked_seconds"],
+                name="rollup_period_worked_idx",
+            )
+        ]
+        ordering = ["-period_start"]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="attendance_rollups"
+    )
+    periodicity = models.CharField(max_length=10, choices=PeriodicityChoices)
+    period_start = models.DateField()
+    days = models.PositiveIntegerField(default=0)
+    delayed_days = models.PositiveIntegerField(default=0)
+    extra_days = models.PositiveIntegerField(default=0)
+    absent_days = models.PositiveIntegerField(default=0)
+    worked_seconds = models.FloatField(default=0)
+    delay_seconds = models.FloatField(default=0)
+    extra_seconds = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.user} - {self.periodicity} {self.period_start}"
+
+
+class TeamKPIs(models.Model):
+    """
+    Totals of the attendance rollups of the members of a team, per period.
+    Backed by the attendance_teamkpis materialized view, refreshed by
+    the refresh_team_kpis task.
+    """
+
+    class Meta:
+        managed = False
+        db_table = "attendance_teamkpis"
+
+    id = models.CharField(primary_key=True, max_length=64)
+    team = models.ForeignKey(
+        "teams.Team",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    periodicity = models.CharField(max_length=10, choices=PeriodicityChoices)
+    period_start = models.DateField()
+    days = models.PositiveIntegerField()
+    delayed_days = models.PositiveIntegerField()
+    extra_days = models.PositiveIntegerField()
+    absent_days = models.PositiveIntegerField()
+    worked_seconds = models.FloatField()
+    delay_seconds = models.FloatField()
+    extra_seconds = models.FloatField()
+
+
+class Site(BaseModel):
+    """
+    A place where users are allowed to clock (office, client site...).
+
+    A user may clock at the sites assigned to them or to one of their teams.
+    Users without any assigned site may clock at every active site.
+    """
+
+    class Meta:
+        verbose_name = _("Site")
+        verbose_name_plural = _("Sites")
+        ordering = ["name"]
+
+    name = models.CharField(max_length=150, unique=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    radius = models.PositiveIntegerField(
+        default=150,
+        help_text=_("Authorized radius (in meters) around the site location."),
+    )
+    is_active = models.BooleanField(default=True)
+    users = models.ManyToManyField(User, related_name="allowed_sites", blank=True)
+    teams = models.ManyToManyField(
+        "teams.Team", related_name="allowed_sites", blank=True
+    )
+
+    def __str__(self):
+        return self.name
+
+
+class ReportJob(BaseModel):
+    """
+    A report built in the background by the build_report task (see
+    attendance.utils.reports), then downloaded by its creator.
+    """
+
+    class Meta:
+        verbose_name = _("Report job")
+        verbose_name_plural = _("Report jobs")
+        ordering = ["-created_at"]
+
+    created_by = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="report_jobs"
+    )
+    kind = models.CharField(max_length=20, choices=ReportKindChoices)
+    parameters = models.JSONField(
+        default=dict,
+        help_text=_("Range (start, end) and filters of the report."),
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=ReportStatusChoices,
+        default=ReportStatusChoices.PENDING,
+    )
+    rows_total = models.PositiveIntegerField(null=True, blank=True)
+    rows_written = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to="reports/", null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} report ({self.status})"
+
+    @property
+    def progress(self) -> float:
+        """Percentage of the rows written."""
+        if self.status == ReportStatusChoices.SUCCEEDED:
+            return 100.0
+        if not self.rows_total:
+            return 0.0
+        return round(self.rows_written * 100 / self.rows_total, 2)
+
+
+class AttendanceArchive(BaseModel):
+    """
+    The attendances of a month of a closed year, moved out of the attendance
+    table as zlib-compressed packed rows (see attendance.utils.archive).
+    """
+
+    class Meta:
+        verbose_name = _("Attendance archive")
+        verbose_name_plural = _("Attendance archives")
+        ordering = ["month"]
+
+    month = models.DateField(unique=True)  # first day of the month
+    rows = models.PositiveIntegerField(default=0)
+    data = models.BinaryField()
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} ({self.rows} attendances)"
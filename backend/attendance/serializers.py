@@ -4,10 +4,29 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from rest_framework import serializers
-from attendance.constants import PeriodicityChoices
-from attendance.models import Attendance
-from attendance.utils.base import get_distance_m
-from attendance.utils.kpi_helpers import get_best_performers
+from rest_framework.settings import api_settings
+from attendance.constants import (
+    ClockSyncStatusChoices,
+    GranularityChoices,
+    PeriodicityChoices,
+    ReportKindChoices,
+    RollingUnitChoices,
+)
+from attendance.models import Attendance, ReportJob
+from attendance.utils.clock_stream import publish_clock_event
+from attendance.utils.clock_sync import sync_clock_events
+from attendance.utils.geofencing import get_allowed_site_ids, is_location_allowed
+from attendance.utils import kpi_helpers, leaderboards
+from attendance.utils.kpi_helpers import (
+    format_team_kpis,
+    get_company_today,
+    get_period_range,
+    get_rolling_range,
+)
+from attendance.utils.leaderboards import RANKED_PERIODICITIES
+from attendance.utils.rollups import refresh_rollups
+
+from teams.models import Team
 
 from users.models import User
 from users.serializers import UserUpdateSerializer
@@ -22,10 +41,6 @@ CHECK_IN_END_HOUR = settings.CHECK_IN_END_HOUR
 CHECK_OUT_START_HOUR = settings.CHECK_OUT_START_HOUR
 CHECK_OUT_END_HOUR = settings.CHECK_OUT_END_HOUR
 
-COMPANY_LATITUDE = settings.COMPANY_LATITUDE
-COMPANY_LONGITUDE = settings.COMPANY_LONGITUDE
-ATTENDANCE_LOCATION_RADIUS = settings.ATTENDANCE_LOCATION_RADIUS
-
 
 class AttendanceSerializer(serializers.ModelSerializer):
     class Meta:
@@ -58,85 +73,118 @@ class AttendanceClocksSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "user", "day", "created_at", "check_in", "check_out"]
 
     def validate(self, attrs):
-        user = self.context["request"].user
         now = timezone.localtime()
-        today = now.date()
         current_hour = now.hour
-
-        attendance, creation = Attendance.objects.get_or_create(user=user, day=today)
-
-        if creation:
-            logging.warning(
-                f"A new attendance was just created for user {user.email} on {today} "
-                "— but it should have already existed if the cron job was running properly."
-            )
-
         is_check_in_action = attrs["is_check_in_action"]
 
-        # Determine action validity (hour, order, duplication)
+        # Hour window and location are checked here, but only reported once
+        # the attendance state (order, duplication) has been checked in create()
+        rejection = None
+
         if is_check_in_action:
-            if attendance.check_in:
-                raise serializers.ValidationError(
-                    _("Check-in has already been recorded for today.")
-                )
             if not (CHECK_IN_START_HOUR <= current_hour <= CHECK_IN_END_HOUR):
-                raise serializers.ValidationError(
-                    _(
-                        "Check-in is only allowed between"
-                        f"{CHECK_IN_START_HOUR}:00 and {CHECK_IN_END_HOUR}:00."
-                    )
+                rejection = _(
+                    "Check-in is only allowed between"
+                    f"{CHECK_IN_START_HOUR}:00 and {CHECK_IN_END_HOUR}:00."
                 )
         else:
-            if not attendance.check_in:
-                raise serializers.ValidationError(
-                    _("You must check in before checking out.")
-                )
-            if attendance.check_out:
-                raise serializers.ValidationError(
-                    _("Check-out has already been recorded for today.")
-                )
             if not (CHECK_OUT_START_HOUR <= current_hour <= CHECK_OUT_END_HOUR):
-                raise serializers.ValidationError(
-                    _(
-                        "Check-out is only allowed between "
-                        f"{CHECK_OUT_START_HOUR}:00 and {CHECK_OUT_END_HOUR}:00."
-                    )
+                rejection = _(
+                    "Check-out is only allowed between "
+                    f"{CHECK_OUT_START_HOUR}:00 and {CHECK_OUT_END_HOUR}:00."
                 )
 
         # Validate location if provided
-        if "latitude" in attrs and "longitude" in attrs:
-            distance_to_company = get_distance_m(
-                attrs["latitude"],
-                attrs["longitude"],
-                COMPANY_LATITUDE,
-                COMPANY_LONGITUDE,
-            )
-            if distance_to_company > ATTENDANCE_LOCATION_RADIUS:
-                raise serializers.ValidationError(
-                    _(
-                        "You are too far from the company location to perform this action."
-                    )
+        if not rejection and "latitude" in attrs and "longitude" in attrs:
+            user = self.context["request"].user
+            allowed_site_ids = get_allowed_site_ids([user.pk]).get(user.pk)
+            if not is_location_allowed(
+                attrs["latitude"], attrs["longitude"], allowed_site_ids
+            ):
+                rejection = _(
+                    "You are too far from the company location to perform this action."
                 )
 
-        attrs["attendance"] = attendance
+        attrs["now"] = now
+        attrs["rejection"] = rejection
         return attrs
 
+    def get_rejection_message(self, attendance, is_check_in_action, rejection):
+        """
+        Returns why a clock was not applied, based on the row returned by
+        the upsert (the state of the attendance takes precedence).
+        """
+        if is_check_in_action:
+            if not rejection or (attendance and attendance.check_in):
+                return _("Check-in has already been recorded for today.")
+            return rejection
+
+        if attendance is None or not attendance.check_in:
+            return _("You must check in before checking out.")
+        if not rejection or attendance.check_out:
+            return _("Check-out has already been recorded for today.")
+        return rejection
+
     def create(self, validated_data):
-        attendance = validated_data["attendance"]
+        user = self.context["request"].user
+        now = validated_data["now"]
         is_check_in_action = validated_data["is_check_in_action"]
+        rejection = validated_data["rejection"]
+
+        attendance = Attendance.objects.record_clock(
+            user,
+            now.date(),
+            is_check_in_action,
+            at=now,
+            allowed=rejection is None,
+        )
+
+        if attendance is not None and attendance.created:
+            logging.warning(
+                f"A new attendance was just created for user {user.email} on {now.date()} "
+                "— but it should have already existed if the cron job was running properly."
+            )
+
+        if attendance is None or not attendance.applied:
+            raise serializers.ValidationError(
+                {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        self.get_rejection_message(
+                            attendance, is_check_in_action, rejection
+                        )
+                    ]
+                }
+            )
+
+        refresh_rollups([(user.pk, now.date())])
 
         if is_check_in_action:
-            attendance.check_in = timezone.now()
             message = _("Check-in time successfully recorded.")
         else:
-            attendance.check_out = timezone.now()
             message = _("Check-out time successfully recorded.")
 
-        attendance.save()
         self.context["message"] = message
         self.context["is_check_in_action"] = is_check_in_action
         return attendance
 
+    def publish(self):
+        """
+        Stream ingestion mode: appends the clock to the clock stream instead of
+        writing it. Only the hour window and location can be rejected here, the
+        attendance state is checked when the stream is persisted.
+        """
+        user = self.context["request"].user
+        now = self.validated_data["now"]
+        is_check_in_action = self.validated_data["is_check_in_action"]
+        rejection = self.validated_data["rejection"]
+
+        if rejection:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [rejection]}
+            )
+
+        return publish_clock_event(user.pk, now.date(), is_check_in_action, now)
+
     def to_representation(self, instance):
         """
         Customizes the response to include the success message
@@ -150,11 +198,137 @@ class AttendanceClocksSerializer(serializers.ModelSerializer):
         }
 
 
-class BestPerformersSerializer(serializers.Serializer):
+class ClockEventSerializer(serializers.Serializer):
+    """
+    A clock recorded offline by a kiosk or the mobile app.
+    """
+
+    client_id = serializers.CharField(
+        required=False,
+        max_length=64,
+        help_text=_("Identifier of the event on the device, echoed in the results."),
+    )
+    user_id = serializers.CharField(max_length=22)
+    is_check_in_action = serializers.BooleanField(
+        help_text="True for check-in, False for check-out",
+    )
+    timestamp = serializers.DateTimeField()
+    latitude = serializers.FloatField(required=False)
+    longitude = serializers.FloatField(required=False)
+
+
+class AttendanceClocksSyncSerializer(serializers.Serializer):
+    """
+    Serializer used to replay a batch of offline clocks.
+    Returns one result per event, in input order:
+       {"index": <int>, "client_id": <str>, "status": <ClockSyncStatusChoices>}
+    """
+
+    events = ClockEventSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.ATTENDANCE_CLOCK_SYNC_MAX_EVENTS,
+    )
+
+    def create(self, validated_data):
+        events = validated_data["events"]
+        statuses = sync_clock_events(self.context["request"].user, events)
+
+        return {
+            "applied": statuses.count(ClockSyncStatusChoices.APPLIED),
+            "results": [
+                {
+                    "index": index,
+                    "client_id": event.get("client_id"),
+                    "status": status,
+                }
+                for index, (event, status) in enumerate(zip(events, statuses))
+            ],
+        }
+
+
+class KPIRangeSerializer(serializers.Serializer):
+    """
+    Validates the time range of the KPI endpoints, resolved to `start` and
+    `end` dates (in the company timezone) from either:
+    - start, and end (default: today)
+    - last and unit: rolling window ending today (e.g. last 30 business days)
+    - periodicity: current day/week/month/year (default)
+    `periodicity` is None for start/end and rolling ranges.
+    """
+
+    MAX_DAYS = 5 * 366
+
+    periodicity = serializers.ChoiceField(
+        choices=PeriodicityChoices,
+        default=PeriodicityChoices.MONTHLY.value,
+        required=False,
+        help_text=_("Current period over which to compute the KPIs."),
+    )
+    start = serializers.DateField(
+        required=False, help_text=_("First day of the range.")
+    )
+    end = serializers.DateField(
+        required=False, help_text=_("Last day of the range (default: today).")
+    )
+    last = serializers.IntegerField(
+        min_value=1,
+        max_value=366,
+        required=False,
+        help_text=_("Size of the rolling window ending today."),
+    )
+    unit = serializers.ChoiceField(
+        choices=RollingUnitChoices,
+        default=RollingUnitChoices.DAYS.value,
+        required=False,
+        help_text=_("Unit of the rolling window."),
+    )
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        explicit = "start" in attrs or "end" in attrs
+
+        if explicit and "last" in attrs:
+            raise serializers.ValidationError(
+                _("Provide either start/end or last."), code="invalid"
+            )
+
+        if explicit:
+            if "start" not in attrs:
+                raise serializers.ValidationError(
+                    {"start": _("This field is required with end.")}, code="required"
+                )
+            attrs.setdefault("end", get_company_today())
+            if attrs["start"] > attrs["end"]:
+                raise serializers.ValidationError(
+                    {"end": _("End must not be before start.")}, code="invalid"
+                )
+            if (attrs["end"] - attrs["start"]).days >= self.MAX_DAYS:
+                raise serializers.ValidationError(
+                    {
+                        "start": _("Ranges are limited to %(days)d days.")
+                        % {"days": self.MAX_DAYS}
+                    },
+                    code="max_value",
+                )
+            attrs["periodicity"] = None
+        elif "last" in attrs:
+            attrs["start"], attrs["end"] = get_rolling_range(
+                attrs["last"], attrs["unit"]
+            )
+            attrs["periodicity"] = None
+        else:
+            attrs["start"], attrs["end"] = get_period_range(attrs["periodicity"])
+
+        return attrs
+
+
+class BestPerformersSerializer(KPIRangeSerializer):
     """
     Serializer that handles:
-    1. Input validation of query parameters (periodicity and count)
-    2. Fetching top performers using get_best_performers()
+    1. Input validation of query parameters (range and count)
+    2. Fetching top performers (of the "team" in context, if any) using
+       get_best_performers(), from the leaderboards for current periods
     3. Formatting the output in a consistent structure:
        {
            "user": <serialized user>,
@@ -162,12 +336,6 @@ class BestPerformersSerializer(serializers.Serializer):
        }
     """
 
-    periodicity = serializers.ChoiceField(
-        choices=PeriodicityChoices,
-        default=PeriodicityChoices.MONTHLY.value,
-        required=False,
-        help_text=_("Time period over which to aggregate worked hours."),
-    )
     count = serializers.IntegerField(
         default=3,
         min_value=1,
@@ -180,17 +348,198 @@ class BestPerformersSerializer(serializers.Serializer):
     total_worked_seconds = serializers.FloatField(read_only=True)
 
     def to_representation(self, instance=None):
-        periodicity = self.validated_data.get(
-            "periodicity", PeriodicityChoices.MONTHLY.value
-        )
+        periodicity = self.validated_data["periodicity"]
         count = self.validated_data.get("count", 3)
+        team = self.context.get("team")
 
-        performers = get_best_performers(periodicity, count)
+        if periodicity in RANKED_PERIODICITIES:
+            performers = leaderboards.get_best_performers(periodicity, count, team)
+        else:
+            performers = kpi_helpers.get_best_performers(
+                self.validated_data["start"], self.validated_data["end"], count, team
+            )
+        users = User.objects.prefetch_related("groups").in_bulk(
+            [p["user"] for p in performers]
+        )
 
         return [
             {
                 "total_worked_seconds": float(p["total_worked_seconds"]),
-                "user": UserUpdateSerializer(User.objects.get(id=p["user"])).data,
+                "user": UserUpdateSerializer(users[p["user"]]).data,
             }
             for p in performers
+            if p["user"] in users
         ]
+
+
+class WorkHoursSerializer(KPIRangeSerializer):
+    """Validates the query parameters of the work hours endpoint."""
+
+    periodicity = serializers.ChoiceField(
+        choices=PeriodicityChoices,
+        default=PeriodicityChoices.WEEKLY.value,
+        required=False,
+        help_text=_("Current period of the series."),
+    )
+    granularity = serializers.ChoiceField(
+        choices=GranularityChoices,
+        default=GranularityChoices.DAY.value,
+        required=False,
+        help_text=_("Time span summed in each point of the series."),
+    )
+
+
+class RankingSerializer(KPIRangeSerializer):
+    """
+    Validates the query parameters of the ranking endpoints: range and
+    optional team.
+    """
+
+    team_id = serializers.PrimaryKeyRelatedField(
+        queryset=Team.objects.all(),
+        source="team",
+        required=False,
+        help_text=_("Rank within this team instead of company-wide."),
+    )
+
+
+class UsersKPIsSerializer(KPIRangeSerializer):
+    """
+    Validates the query parameters of the batch KPIs endpoint: either a
+    comma-separated list of user ids or a team id (its members), and a
+    range. Resolves them to the list of `user_ids`.
+    """
+
+    MAX_USERS = 500
+
+    user_ids = serializers.CharField(
+        required=False,
+        help_text=_("Comma-separated ids of the users."),
+    )
+    team_id = serializers.CharField(
+        required=False,
+        help_text=_("Id of the team whose members KPIs are returned."),
+    )
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        user_ids = attrs.get("user_ids")
+        team_id = attrs.get("team_id")
+
+        if bool(user_ids) == bool(team_id):
+            raise serializers.ValidationError(
+                _("Provide either user_ids or team_id."), code="invalid"
+            )
+
+        if team_id:
+            attrs["user_ids"] = list(
+                Team.members.through.objects.filter(team_id=team_id)
+                .order_by("user_id")
+                .values_list("user_id", flat=True)
+            )
+            if not attrs["user_ids"] and not Team.objects.filter(id=team_id).exists():
+                raise serializers.ValidationError(
+                    {"team_id": _("Team not found.")}, code="not_found"
+                )
+            return attrs
+
+        # Deduplicated, in the requested order
+        attrs["user_ids"] = list(
+            dict.fromkeys(
+                user_id.strip() for user_id in user_ids.split(",") if user_id.strip()
+            )
+        )
+        if len(attrs["user_ids"]) > self.MAX_USERS:
+            raise serializers.ValidationError(
+                {
+                    "user_ids": _("At most %(count)d users per request.")
+                    % {"count": self.MAX_USERS}
+                },
+                code="max_length",
+            )
+        return attrs
+
+
+class AttendanceExportSerializer(KPIRangeSerializer):
+    """
+    Validates the query parameters of the attendance export: range (default:
+    current month) and optional user or team.
+    """
+
+    user_id = serializers.PrimaryKeyRelatedField(
+        queryset=User.objects.all(),
+        source="user",
+        required=False,
+        help_text=_("Only export the attendances of this user."),
+    )
+    team_id = serializers.PrimaryKeyRelatedField(
+        queryset=Team.objects.all(),
+        source="team",
+        required=False,
+        help_text=_("Only export the attendances of the members of this team."),
+    )
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    """Status of a report job, polled until it is finished."""
+
+    progress = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ReportJob
+        fields = [
+            "id",
+            "kind",
+            "parameters",
+            "status",
+            "progress",
+            "rows_total",
+            "rows_written",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
+
+
+class ReportJobCreateSerializer(AttendanceExportSerializer):
+    """
+    Validates a report request: kind, range and filters of the attendance
+    export. Creates the pending job.
+    """
+
+    kind = serializers.ChoiceField(
+        choices=ReportKindChoices,
+        default=ReportKindChoices.ATTENDANCE.value,
+        help_text=_("Kind of report to build."),
+    )
+
+    def create(self, validated_data):
+        parameters = {
+            "start": validated_data["start"].isoformat(),
+            "end": validated_data["end"].isoformat(),
+        }
+        if validated_data.get("user"):
+            parameters["user_id"] = validated_data["user"].id
+        if validated_data.get("team"):
+            parameters["team_id"] = validated_data["team"].id
+
+        return ReportJob.objects.create(
+            created_by_id=self.context["request"].user.pk,
+            kind=validated_data["kind"],
+            parameters=parameters,
+        )
+
+    def to_representation(self, instance):
+        return ReportJobSerializer(instance, context=self.context).data
+
+
+class TeamKPIsSerializer(serializers.BaseSerializer):
+    """
+    Read-only representation of a team annotated by annotate_team_kpis(),
+    in the format of compute_team_kpis().
+    """
+
+    def to_representation(self, instance):
+        return format_team_kpis(instance, instance.members_count, instance)
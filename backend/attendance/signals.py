@@ -0,0 +1,52 @@
+# attendance/signals.py
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from attendance.models import Attendance, Site
+from attendance.tasks import refresh_team_kpis
+from attendance.utils.geofencing import invalidate_site_index
+from attendance.utils.kpi_cache import invalidate_team_kpis
+from attendance.utils.leaderboards import refresh_team_leaderboards
+from attendance.utils.rollups import refresh_rollups
+
+
+@receiver([post_save, post_delete], sender=Site)
+def rebuild_site_index(sender, **kwargs):
+    invalidate_site_index()
+
+
+@receiver([post_save, post_delete], sender=Attendance)
+def refresh_attendance_rollups(sender, instance, **kwargs):
+    """
+    Attendances edited or excused through the API or the admin. The pair
+    the attendance was loaded with is refreshed too, in case it was moved.
+    """
+    user_day = (instance.user_id, instance.day)
+    refresh_rollups({user_day, getattr(instance, "_loaded_user_day", user_day)})
+    instance._loaded_user_day = user_day
+
+
+@receiver(m2m_changed, sender="teams.Team_members")
+def refresh_team_kpis_on_membership_change(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        transaction.on_commit(invalidate_team_kpis)
+        transaction.on_commit(refresh_team_kpis.delay)
+
+
+@receiver(m2m_changed, sender="teams.Team_members")
+def refresh_team_leaderboards_on_membership_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+
+    if not reverse:
+        team_ids = [instance.pk]
+    elif pk_set is not None:
+        team_ids = list(pk_set)
+    else:
+        # user.teams.clear()
+        team_ids = list(instance.teams.values_list("id", flat=True))
+
+    transaction.on_commit(lambda: refresh_team_leaderboards(team_ids))
@@ -1,11 +1,16 @@
 # attendance/tasks.py
 import logging
+
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
-from .models import Attendance
 
 from users.models import User
 
+from .models import Attendance
+from .utils import archive, clock_stream, partitions, reports, rollups, snapshots
+from .utils.kpi_helpers import get_company_today, get_snapshot_until
+
 logger = logging.getLogger(__name__)
 
 
@@ -35,6 +40,7 @@ def create_daily_attendance_records(self):
     ]
 
     Attendance.objects.bulk_create(to_create)
+    rollups.refresh_rollups((attendance.user_id, today) for attendance in to_create)
 
     created_count = len(to_create)
     if created_count:
@@ -43,3 +49,90 @@ def create_daily_attendance_records(self):
         logging.warning(f"Attendance records already existed for all users on {today}")
 
     return f"Attendance task finished: {created_count} created"
+
+
+@shared_task(bind=True)
+def persist_clock_events(self):
+    """
+    Persist the clock events buffered in the clock stream (stream ingestion mode).
+    """
+
+    persisted = clock_stream.persist_clock_events()
+    if persisted:
+        logging.info(f"Persisted {persisted} clock events")
+
+    return f"Clock events persisted: {persisted}"
+
+
+@shared_task(bind=True)
+def refresh_team_kpis(self):
+    """
+    Refresh the team KPIs materialized view (scheduled, and after team
+    membership changes).
+    """
+
+    rollups.refresh_team_kpis()
+
+    return "Team KPIs refreshed"
+
+
+@shared_task(bind=True)
+def build_report(self, job_id):
+    """
+    Build the file of a report job (see attendance.utils.reports).
+    """
+
+    status = reports.build_report(job_id)
+
+    return f"Report job {job_id}: {status}"
+
+
+@shared_task(bind=True)
+def export_attendance_snapshots(self):
+    """
+    Append the attendances of the newly closed days to the columnar
+    snapshots (see attendance.utils.snapshots), or rebuild them when
+    snapshotted days changed.
+    """
+
+    if not snapshots.get_snapshot_dir():
+        return "Attendance snapshots are disabled"
+
+    if snapshots.get_changed_months(snapshots.read_manifest()):
+        exported = snapshots.rebuild_snapshots(get_snapshot_until())
+    else:
+        exported = snapshots.export_snapshots(get_snapshot_until())
+    if exported:
+        logging.info(f"Exported {exported} attendances to the snapshots")
+
+    return f"Attendance snapshots exported: {exported}"
+
+
+@shared_task(bind=True)
+def create_attendance_partitions(self):
+    """
+    Create the monthly partitions of the attendance table for the current
+    month and the ATTENDANCE_PARTITIONS_AHEAD next ones.
+    """
+
+    created = partitions.create_partitions(
+        get_company_today(), settings.ATTENDANCE_PARTITIONS_AHEAD + 1
+    )
+    if created:
+        logging.info(f"Created attendance partitions: {', '.join(created)}")
+
+    return f"Attendance partitions created: {len(created)}"
+
+
+@shared_task(bind=True)
+def archive_attendance(self):
+    """
+    Move the attendances of the years before the hot window
+    (ATTENDANCE_HOT_YEARS) to the attendance archive.
+    """
+
+    archived = archive.archive_attendance(archive.get_hot_start())
+    if archived:
+        logging.info(f"Archived {archived} attendances")
+
+    return f"Attendances archived: {archived}"
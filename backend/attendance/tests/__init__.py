@@ -0,0 +1 @@
+from .base import clock as clock
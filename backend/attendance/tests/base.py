@@ -0,0 +1,26 @@
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+from attendance.models import Attendance
+
+
+def clock(user, day, check_in=None, check_out=None, **fields):
+    """Creates the attendance of a user on a day, at the given UTC hours."""
+
+    def at(hour):
+        return datetime(
+            day.year,
+            day.month,
+            day.day,
+            int(hour),
+            int(hour % 1 * 60),
+            tzinfo=dt_timezone.utc,
+        )
+
+    return Attendance.objects.create(
+        user=user,
+        day=day,
+        check_in=at(check_in) if check_in is not None else None,
+        check_out=at(check_out) if check_out is not None else None,
+        **fields,
+    )
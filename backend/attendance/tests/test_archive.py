@@ -0,0 +1,177 @@
+import shutil
+import tempfile
+from datetime import date, datetime
+from datetime import timezone as dt_timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from freezegun import freeze_time
+
+from attendance.models import Attendance, AttendanceArchive, AttendanceRollup
+from attendance.tasks import archive_attendance
+from attendance.tests import clock
+from attendance.utils import archive, snapshots
+from attendance.utils.exports import get_export_rows
+from attendance.utils.partitions import create_partitions, get_partitions
+from attendance.utils.rollups import rebuild_rollups
+from users.models import User
+
+
+def get_rollups():
+    return {
+        (r.user_id, r.periodicity, r.period_start): (
+            r.days,
+            r.delayed_days,
+            r.extra_days,
+            r.absent_days,
+            r.worked_seconds,
+            r.delay_seconds,
+            r.extra_seconds,
+        )
+        for r in AttendanceRollup.objects.all()
+    }
+
+
+# Hot window from 2025-01-01: the week of 2024-12-30 straddles the archive
+@freeze_time("2025-10-21 21:00:00")
+@override_settings(ATTENDANCE_HOT_YEARS=1)
+class AttendanceArchiveTests(TestCase):
+    """Tests for the archival of the attendances of the closed years."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com", password="pass", is_active=True
+        )
+        self.other = User.objects.create_user(
+            email="other@example.com", password="pass", is_active=True
+        )
+        create_partitions(date(2024, 12, 1), 2)
+        clock(self.user, date(2024, 6, 3), 8.5, 18)
+        clock(self.other, date(2024, 12, 30), 9.5, 17)
+        clock(self.user, date(2024, 12, 31), is_excused=True, excuse_reason="Sick")
+        clock(self.user, date(2025, 1, 2), 9, 19)
+
+    def test_closed_years_are_archived(self):
+        """Attendances before the hot window are moved to monthly archives"""
+
+        self.assertEqual(archive_attendance.apply().get(), "Attendances archived: 3")
+        self.assertEqual(archive_attendance.apply().get(), "Attendances archived: 0")
+
+        self.assertEqual(
+            list(Attendance.objects.values_list("day", flat=True)), [date(2025, 1, 2)]
+        )
+        self.assertEqual(
+            list(AttendanceArchive.objects.values_list("month", "rows")),
+            [(date(2024, 6, 1), 1), (date(2024, 12, 1), 2)],
+        )
+        self.assertNotIn("attendance_attendance_y2024m12", get_partitions())
+        self.assertIn("attendance_attendance_y2025m01", get_partitions())
+
+    def test_late_attendances_are_merged(self):
+        """Attendances written in an archived month join its archive"""
+
+        archive_attendance.apply()
+        clock(self.user, date(2024, 12, 2), 9, 17)
+
+        self.assertEqual(archive_attendance.apply().get(), "Attendances archived: 1")
+        self.assertEqual(AttendanceArchive.objects.get(month=date(2024, 12, 1)).rows, 3)
+        self.assertFalse(Attendance.objects.filter(day__year=2024).exists())
+
+    def test_rollups_are_kept(self):
+        """Archival, later changes and rebuilds keep the archived totals"""
+
+        rollups = get_rollups()
+        archive_attendance.apply()
+        self.assertEqual(get_rollups(), rollups)
+
+        # The week of 2024-12-30 also counts its archived attendances
+        attendance = Attendance.objects.get(day=date(2025, 1, 2))
+        attendance.check_out = datetime(2025, 1, 2, 18, tzinfo=dt_timezone.utc)
+        attendance.save()
+        rollups = get_rollups()
+        weekly = AttendanceRollup.objects.get(
+            user=self.user, periodicity="weekly", period_start=date(2024, 12, 30)
+        )
+        self.assertEqual((weekly.days, weekly.absent_days), (2, 0))
+        self.assertEqual(weekly.worked_seconds, 32400)
+
+        rebuild_rollups()
+        self.assertEqual(get_rollups(), rollups)
+
+    def test_archived_totals_match_the_rollup_totals(self):
+        """Archived attendances are counted with the definitions of the SQL"""
+
+        month = date(2024, 6, 1)
+        clock(self.user, date(2024, 6, 4), 9.25, 19.5)
+        clock(self.user, date(2024, 6, 5), 10)
+        clock(self.user, date(2024, 6, 6), is_excused=True, excuse_reason="Sick")
+        clock(self.user, date(2024, 6, 7))
+        clock(self.other, date(2024, 6, 3), 9, 18)
+        Attendance.objects.create(
+            user=self.other,
+            day=date(2024, 6, 4),
+            check_in=datetime(2024, 6, 4, 9, 0, 0, 500000, tzinfo=dt_timezone.utc),
+            check_out=datetime(2024, 6, 4, 18, 0, 1, tzinfo=dt_timezone.utc),
+        )
+        expected = {
+            (row.pop("user_id"), "monthly", month): {
+                field.removeprefix("total_"): value for field, value in row.items()
+            }
+            for row in Attendance.objects.filter(
+                day__range=(month, date(2024, 6, 30))
+            ).rollup_totals("user_id")
+        }
+
+        archive.archive_month(month)
+
+        self.assertEqual(archive.get_archived_totals(expected), expected)
+
+    def test_export_reads_through_the_archive(self):
+        """Exports reaching the archived years return the same rows"""
+
+        rows = list(get_export_rows(date(2024, 6, 1), date(2025, 1, 31)))
+        user_rows = list(
+            get_export_rows(date(2024, 12, 1), date(2025, 1, 31), user=self.other)
+        )
+        archive_attendance.apply()
+
+        self.assertEqual(
+            list(get_export_rows(date(2024, 6, 1), date(2025, 1, 31))), rows
+        )
+        self.assertEqual(
+            list(
+                get_export_rows(date(2024, 12, 1), date(2025, 1, 31), user=self.other)
+            ),
+            user_rows,
+        )
+        self.assertEqual(len(rows), 4)
+
+    def test_snapshots_read_through_the_archive(self):
+        """Snapshots rebuilt after the archival still cover the archived days"""
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(ATTENDANCE_SNAPSHOT_DIR=directory):
+            archive_attendance.apply()
+            self.assertEqual(snapshots.rebuild_snapshots(date(2025, 6, 30)), 4)
+
+            totals = snapshots.compute_totals(date(2024, 1, 1), date(2024, 12, 31))
+
+        self.assertEqual(totals[self.user.id]["days"], 2)
+        self.assertEqual(totals[self.user.id]["worked_seconds"], 34200)
+        self.assertEqual(totals[self.other.id]["delay_seconds"], 1800)
+
+    def test_restore(self):
+        """Archived attendances can be moved back to the attendance table"""
+
+        attendances = list(Attendance.objects.order_by("day").values())
+        rollups = get_rollups()
+        archive_attendance.apply()
+
+        call_command("archive_attendance", restore=2024, stdout=StringIO())
+
+        self.assertEqual(list(Attendance.objects.order_by("day").values()), attendances)
+        self.assertFalse(AttendanceArchive.objects.exists())
+        self.assertIn("attendance_attendance_y2024m12", get_partitions())
+        self.assertEqual(get_rollups(), rollups)
@@ -0,0 +1,32 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from freezegun import freeze_time
+
+from attendance.management.commands.seed_clock_benchmark import get_benchmark_users
+from attendance.models import Attendance
+
+
+@freeze_time("2025-10-21 06:00:00")
+class SeedClockBenchmarkTests(TestCase):
+    """Tests for the seed_clock_benchmark management command."""
+
+    fixtures = ["groups.json"]
+
+    def test_seeds_users_with_todays_attendances(self):
+        """Users are created once and their rows are reset on each run"""
+
+        call_command("seed_clock_benchmark", users=5, stdout=StringIO())
+        Attendance.objects.update(check_in=timezone.now())
+
+        call_command("seed_clock_benchmark", users=5, stdout=StringIO())
+
+        self.assertEqual(get_benchmark_users().count(), 5)
+        attendances = Attendance.objects.filter(
+            user__in=get_benchmark_users(), day=timezone.localdate()
+        )
+        self.assertEqual(attendances.count(), 5)
+        self.assertFalse(attendances.filter(check_in__isnull=False).exists())
+        self.assertTrue(all(user.is_employee for user in get_benchmark_users()))
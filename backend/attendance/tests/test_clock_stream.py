@@ -0,0 +1,113 @@
+from unittest import mock
+
+from django.conf import settings
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from freezegun import freeze_time
+from rest_framework import status
+
+from attendance.models import Attendance
+from attendance.tasks import persist_clock_events
+from attendance.utils import clock_stream
+from users.tests import BaseTestCase
+
+VALID_CLOCK_IN_TIME = f"2025-10-21 {settings.CHECK_IN_START_HOUR}:00:00"
+VALID_CLOCK_OUT_TIME = f"2025-10-21 {settings.CHECK_OUT_START_HOUR}:00:00"
+
+
+@override_settings(
+    ATTENDANCE_CLOCK_INGESTION="stream", ATTENDANCE_CLOCK_STREAM_URL="memory://"
+)
+class AttendanceClockStreamTests(BaseTestCase):
+    """
+    Test suite for the stream ingestion mode of AttendanceClocksView.
+    """
+
+    def setUp(self):
+        super().setUp()
+        clock_stream._streams.clear()
+        self.clocks_url = reverse("clocks")
+
+    @freeze_time(VALID_CLOCK_IN_TIME)
+    def test_check_in_is_accepted_then_persisted(self):
+        """A check-in is buffered by the view and written by the consumer"""
+
+        self.client.force_authenticate(user=self.employee)
+        response = self.client.post(self.clocks_url, {"is_check_in_action": True})
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertIn("event_id", response.json())
+        self.assertFalse(
+            Attendance.objects.filter(
+                user=self.employee, check_in__isnull=False
+            ).exists()
+        )
+
+        result = persist_clock_events()
+
+        self.assertIn("Clock events persisted: 1", result)
+        attendance = Attendance.objects.get(
+            user=self.employee, day=timezone.now().date()
+        )
+        self.assertEqual(attendance.check_in, timezone.now())
+        self.assertEqual(len(clock_stream.get_clock_stream()), 0)
+
+    @freeze_time(VALID_CLOCK_IN_TIME)
+    def test_check_in_outside_of_company_is_rejected_synchronously(self):
+        """Location is still validated before the clock is accepted"""
+
+        self.client.force_authenticate(user=self.employee)
+        response = self.client.post(
+            self.clocks_url,
+            {"is_check_in_action": True, "latitude": 48.8566, "longitude": 2.3522},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(clock_stream.get_clock_stream()), 0)
+
+    def test_batch_keeps_first_clock_and_applies_check_out_after_check_in(self):
+        """Duplicates are collapsed and a check-in/check-out pair is applied"""
+
+        with freeze_time(VALID_CLOCK_IN_TIME):
+            first = timezone.now()
+            self.client.force_authenticate(user=self.employee)
+            self.client.post(self.clocks_url, {"is_check_in_action": True})
+        with freeze_time(f"2025-10-21 {settings.CHECK_IN_START_HOUR}:30:00"):
+            self.client.post(self.clocks_url, {"is_check_in_action": True})
+        with freeze_time(VALID_CLOCK_OUT_TIME):
+            last = timezone.now()
+            self.client.post(self.clocks_url, {"is_check_in_action": False})
+            today = timezone.localdate()
+
+        persist_clock_events()
+
+        attendance = Attendance.objects.get(user=self.employee, day=today)
+        self.assertEqual(attendance.check_in, first)
+        self.assertEqual(attendance.check_out, last)
+
+    @freeze_time(VALID_CLOCK_IN_TIME)
+    def test_failing_batch_is_rolled_back_then_dead_lettered(self):
+        """A batch failing after its write is kept, then moved aside for good"""
+
+        self.client.force_authenticate(user=self.employee)
+        self.client.post(self.clocks_url, {"is_check_in_action": True})
+        stream = clock_stream.get_clock_stream()
+
+        with mock.patch(
+            "attendance.utils.clock_stream.refresh_rollups",
+            side_effect=RuntimeError("Redis is down"),
+        ):
+            for _ in range(settings.ATTENDANCE_CLOCK_STREAM_MAX_DELIVERIES):
+                with self.assertRaises(RuntimeError):
+                    clock_stream.persist_clock_events()
+
+                self.assertFalse(
+                    Attendance.objects.filter(check_in__isnull=False).exists()
+                )
+                self.assertEqual(len(stream), 1)
+
+            self.assertEqual(clock_stream.persist_clock_events(), 0)
+
+        self.assertEqual(len(stream), 0)
+        self.assertEqual(len(stream.dead_letters), 1)
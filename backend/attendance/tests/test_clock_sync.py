@@ -0,0 +1,225 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+from freezegun import freeze_time
+from rest_framework import status
+
+from attendance.constants import ClockSyncStatusChoices
+from attendance.models import Attendance
+from users.models import User
+from users.tests import BaseTestCase
+
+CHECK_IN_TIME = f"2025-10-21T0{settings.CHECK_IN_START_HOUR}:30:00Z"
+CHECK_OUT_TIME = f"2025-10-21T{settings.CHECK_OUT_START_HOUR}:30:00Z"
+
+
+@freeze_time("2025-10-21 21:00:00")
+class AttendanceClocksSyncTests(BaseTestCase):
+    """
+    Test suite for AttendanceClocksSyncView.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.sync_url = reverse("clocks_sync")
+
+    def _statuses(self, response):
+        return [result["status"] for result in response.json()["results"]]
+
+    def test_manager_can_sync_clocks_of_several_users(self):
+        """A batch of clocks of several users is applied in one request"""
+
+        self.client.force_authenticate(user=self.manager)
+        events = [
+            {
+                "client_id": "out-1",
+                "user_id": self.employee.id,
+                "is_check_in_action": False,
+                "timestamp": CHECK_OUT_TIME,
+            },
+            {
+                "client_id": "in-1",
+                "user_id": self.employee.id,
+                "is_check_in_action": True,
+                "timestamp": CHECK_IN_TIME,
+            },
+            {
+                "client_id": "in-2",
+                "user_id": self.manager.id,
+                "is_check_in_action": True,
+                "timestamp": CHECK_IN_TIME,
+            },
+        ]
+
+        response = self.client.post(self.sync_url, {"events": events}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["applied"], 3)
+        self.assertEqual(
+            [result["client_id"] for result in response.json()["results"]],
+            ["out-1", "in-1", "in-2"],
+        )
+
+        attendance = Attendance.objects.get(user=self.employee)
+        self.assertIsNotNone(attendance.check_in)
+        self.assertIsNotNone(attendance.check_out)
+        self.assertTrue(
+            Attendance.objects.filter(
+                user=self.manager, check_in__isnull=False
+            ).exists()
+        )
+
+    def test_invalid_events_get_their_own_status(self):
+        """Each rejected event is reported without blocking the others"""
+
+        Attendance.objects.create(
+            user=self.admin,
+            day=timezone.now().date(),
+            check_in=timezone.now() - timedelta(hours=12),
+        )
+        self.client.force_authenticate(user=self.manager)
+        events = [
+            # Second check-in of the batch for the same day
+            {"user_id": self.employee.id, "is_check_in_action": True},
+            {"user_id": self.employee.id, "is_check_in_action": True},
+            # Already checked in
+            {"user_id": self.admin.id, "is_check_in_action": True},
+            # Check-out without check-in
+            {"user_id": self.manager.id, "is_check_in_action": False},
+            {"user_id": "unknown", "is_check_in_action": True},
+            {
+                "user_id": self.manager.id,
+                "is_check_in_action": True,
+                "latitude": 48.8566,
+                "longitude": 2.3522,
+            },
+        ]
+        for event in events:
+            if event["is_check_in_action"]:
+                event["timestamp"] = CHECK_IN_TIME
+            else:
+                event["timestamp"] = CHECK_OUT_TIME
+
+        response = self.client.post(self.sync_url, {"events": events}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self._statuses(response),
+            [
+                ClockSyncStatusChoices.APPLIED,
+                ClockSyncStatusChoices.DUPLICATE,
+                ClockSyncStatusChoices.DUPLICATE,
+                ClockSyncStatusChoices.NO_CHECK_IN,
+                ClockSyncStatusChoices.UNKNOWN_USER,
+                ClockSyncStatusChoices.TOO_FAR,
+            ],
+        )
+
+    def test_out_of_hours_and_future_events_are_rejected(self):
+        """Hour windows and timestamps are validated per event"""
+
+        self.client.force_authenticate(user=self.employee)
+        events = [
+            {
+                "user_id": self.employee.id,
+                "is_check_in_action": True,
+                "timestamp": CHECK_OUT_TIME,
+            },
+            {
+                "user_id": self.employee.id,
+                "is_check_in_action": True,
+                "timestamp": "2025-10-22T08:00:00Z",
+            },
+        ]
+
+        response = self.client.post(self.sync_url, {"events": events}, format="json")
+
+        self.assertEqual(
+            self._statuses(response),
+            [ClockSyncStatusChoices.OUT_OF_HOURS, ClockSyncStatusChoices.FUTURE],
+        )
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_too_old_events_are_rejected(self):
+        """Events older than ATTENDANCE_CLOCK_SYNC_MAX_AGE are not replayed"""
+
+        self.client.force_authenticate(user=self.employee)
+        max_age = timedelta(seconds=settings.ATTENDANCE_CLOCK_SYNC_MAX_AGE)
+        events = [
+            {
+                "user_id": self.employee.id,
+                "is_check_in_action": True,
+                "timestamp": (timezone.now() - max_age - timedelta(minutes=1)),
+            },
+            {
+                "user_id": self.employee.id,
+                "is_check_in_action": True,
+                "timestamp": CHECK_IN_TIME,
+            },
+        ]
+
+        response = self.client.post(self.sync_url, {"events": events}, format="json")
+
+        self.assertEqual(
+            self._statuses(response),
+            [ClockSyncStatusChoices.TOO_OLD, ClockSyncStatusChoices.APPLIED],
+        )
+        self.assertEqual(Attendance.objects.count(), 1)
+
+    def test_employee_cannot_sync_clocks_of_other_users(self):
+        """Employees can only sync their own clocks"""
+
+        self.client.force_authenticate(user=self.employee)
+        events = [
+            {
+                "user_id": self.manager.id,
+                "is_check_in_action": True,
+                "timestamp": CHECK_IN_TIME,
+            },
+            {
+                "user_id": self.employee.id,
+                "is_check_in_action": True,
+                "timestamp": CHECK_IN_TIME,
+            },
+        ]
+
+        response = self.client.post(self.sync_url, {"events": events}, format="json")
+
+        self.assertEqual(
+            self._statuses(response),
+            [ClockSyncStatusChoices.FORBIDDEN, ClockSyncStatusChoices.APPLIED],
+        )
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        """A batch costs the same number of queries whatever its size"""
+
+        users = [
+            User.objects.create_user(
+                email=f"user{i}@example.com", password="pass", is_active=True
+            )
+            for i in range(20)
+        ]
+        self.client.force_authenticate(user=self.admin)
+
+        def sync(batch):
+            events = [
+                {
+                    "user_id": user.id,
+                    "is_check_in_action": True,
+                    "timestamp": CHECK_IN_TIME,
+                }
+                for user in batch
+            ]
+            return self.client.post(self.sync_url, {"events": events}, format="json")
+
+        # Warm up the admin roles and the site index
+        sync(users[:1])
+
+        with self.assertNumQueries(10):
+            sync(users[1:2])
+        with self.assertNumQueries(10):
+            response = sync(users[2:])
+
+        self.assertEqual(response.json()["applied"], 18)
@@ -1,4 +1,8 @@
+import threading
+
 from django.conf import settings
+from django.db import connection
+from django.test import TransactionTestCase
 from django.utils import timezone
 from django.urls import reverse
 
@@ -7,6 +11,7 @@ from freezegun import freeze_time
 from attendance.models import Attendance
 from rest_framework import status
 
+from users.models import User
 from users.tests import BaseTestCase
 
 CHECK_IN_START_HOUR = settings.CHECK_IN_START_HOUR
@@ -165,5 +170,97 @@ class AttendanceClocksTests(BaseTestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertIn("Check-in time successfully recorded", response.json()["message"])
 
-    # NOTE : add unit tests attempting to clock in and clock out in invalid time range
-    # NOTE : add unit tests attempting to clock in and clock out to fare from the company location
+    @freeze_time(f"2025-10-21 {CHECK_OUT_START_HOUR}:00:00")
+    def test_user_cannot_check_in_outside_allowed_hours(self):
+        """Check-in is rejected outside of the check-in window"""
+
+        self.client.force_authenticate(user=self.employee)
+        response = self.client.post(self.clocks_url, {"is_check_in_action": True})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Check-in is only allowed between", str(response.data))
+        attendance = Attendance.objects.get(
+            user=self.employee, day=timezone.now().date()
+        )
+        self.assertIsNone(attendance.check_in)
+
+    @freeze_time(VALID_CLOCK_IN_TIME)
+    def test_user_cannot_check_out_outside_allowed_hours(self):
+        """Check-out is rejected outside of the check-out window"""
+
+        Attendance.objects.create(
+            user=self.employee, day=timezone.now().date(), check_in=timezone.now()
+        )
+
+        self.client.force_authenticate(user=self.employee)
+        response = self.client.post(self.clocks_url, {"is_check_in_action": False})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Check-out is only allowed between", str(response.data))
+
+    @freeze_time(VALID_CLOCK_IN_TIME)
+    def test_user_cannot_check_in_too_far_from_company(self):
+        """Check-in is rejected when the user is outside of the company radius"""
+
+        self.client.force_authenticate(user=self.employee)
+        response = self.client.post(
+            self.clocks_url,
+            {"is_check_in_action": True, "latitude": 48.8566, "longitude": 2.3522},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("too far from the company location", str(response.data))
+
+
+class AttendanceRecordClockTests(TransactionTestCase):
+    """
+    Test suite for Attendance.objects.record_clock under concurrent writes.
+    """
+
+    def setUp(self):
+        self.employee = User.objects.create_user(
+            email="employee@example.com", password="password123", is_active=True
+        )
+        self.now = timezone.now()
+
+    def _clock_concurrently(self, is_check_in_action, workers=8):
+        barrier = threading.Barrier(workers)
+        results = []
+
+        def clock():
+            try:
+                barrier.wait()
+                attendance = Attendance.objects.record_clock(
+                    self.employee, self.now.date(), is_check_in_action, at=self.now
+                )
+                results.append(bool(attendance and attendance.applied))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=clock) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def test_concurrent_duplicate_check_ins_apply_once(self):
+        """Only one of several simultaneous check-ins is recorded"""
+
+        results = self._clock_concurrently(is_check_in_action=True)
+
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(Attendance.objects.filter(user=self.employee).count(), 1)
+
+    def test_concurrent_duplicate_check_outs_apply_once(self):
+        """Only one of several simultaneous check-outs is recorded"""
+
+        Attendance.objects.create(
+            user=self.employee, day=self.now.date(), check_in=self.now
+        )
+
+        results = self._clock_concurrently(is_check_in_action=False)
+
+        self.assertEqual(results.count(True), 1)
+        self.assertIsNotNone(Attendance.objects.get(user=self.employee).check_out)
@@ -0,0 +1,87 @@
+import csv
+from datetime import date, datetime
+from datetime import timezone as dt_timezone
+from io import StringIO
+
+from django.urls import reverse
+from freezegun import freeze_time
+from rest_framework import status
+
+from attendance.models import Attendance
+from teams.models import Team
+from users.tests import BaseTestCase
+
+
+def read_csv(response):
+    content = b"".join(response.streaming_content).decode()
+    return list(csv.DictReader(StringIO(content)))
+
+
+@freeze_time("2025-10-21 21:00:00")
+class AttendanceExportTests(BaseTestCase):
+    """Tests for the streaming CSV export of the attendances."""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("attendance_export")
+        Attendance.objects.create(
+            user=self.employee,
+            day=date(2025, 10, 20),
+            check_in=datetime(2025, 10, 20, 9, 30, tzinfo=dt_timezone.utc),
+            check_out=datetime(2025, 10, 20, 19, tzinfo=dt_timezone.utc),
+        )
+        Attendance.objects.create(user=self.manager, day=date(2025, 10, 21))
+        Attendance.objects.create(user=self.employee, day=date(2025, 9, 30))
+
+    def test_export_streams_the_month(self):
+        """Attendances of the current month are streamed with their KPIs"""
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn(
+            'filename="attendance_2025-10-01_2025-10-21.csv"',
+            response["Content-Disposition"],
+        )
+
+        rows = read_csv(response)
+        self.assertEqual(
+            [(row["email"], row["day"], row["status"]) for row in rows],
+            [
+                ("employee@example.com", "2025-10-20", "present"),
+                ("manager@example.com", "2025-10-21", "absent"),
+            ],
+        )
+        self.assertEqual(float(rows[0]["worked_seconds"]), 34200)
+        self.assertEqual(float(rows[0]["extra_seconds"]), 1800)
+        self.assertEqual(float(rows[0]["delay_seconds"]), 1800)
+
+    def test_export_filters(self):
+        """Exports can be restricted to a range, a user or a team"""
+
+        team = Team.objects.create(name="Team A")
+        team.members.add(self.manager)
+        self.client.force_authenticate(user=self.admin)
+
+        rows = read_csv(
+            self.client.get(self.url, {"start": "2025-09-01", "end": "2025-09-30"})
+        )
+        self.assertEqual([row["day"] for row in rows], ["2025-09-30"])
+
+        rows = read_csv(
+            self.client.get(self.url, {"user_id": self.employee.id, "last": 30})
+        )
+        self.assertEqual([row["day"] for row in rows], ["2025-09-30", "2025-10-20"])
+
+        rows = read_csv(self.client.get(self.url, {"team_id": team.id}))
+        self.assertEqual([row["email"] for row in rows], ["manager@example.com"])
+
+    def test_export_is_restricted_to_company_admins(self):
+        """Employees cannot export attendances"""
+
+        self.client.force_authenticate(user=self.employee)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
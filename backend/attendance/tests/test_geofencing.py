@@ -0,0 +1,249 @@
+import random
+from unittest import mock
+
+import numpy as np
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from freezegun import freeze_time
+from rest_framework import status
+
+from attendance.models import Site
+from attendance.utils.base import (
+    get_distance_m,
+    get_distance_matrix_m,
+    get_distances_m,
+    get_nearest_sites,
+)
+from attendance.utils.geofencing import (
+    IndexedSite,
+    SiteIndex,
+    are_locations_allowed,
+    get_allowed_site_ids,
+    get_site_index,
+    invalidate_site_index,
+    is_location_allowed,
+)
+from teams.models import Team
+from users.tests import BaseTestCase
+
+COTONOU = (6.366132646225389, 2.429160219575613)
+PORTO_NOVO = (6.496857, 2.628852)
+PARIS = (48.8566, 2.3522)
+
+
+class DistancesTests(TestCase):
+    """Tests for the vectorized haversine helpers."""
+
+    def setUp(self):
+        generator = random.Random(42)
+        self.points = [
+            (generator.uniform(-90, 90), generator.uniform(-180, 180))
+            for _ in range(200)
+        ] + [(0, 0), (0, 2.5), (6.3, 0)]
+        self.sites = [COTONOU, PORTO_NOVO, PARIS, (0, 0)]
+
+    def test_distance_matrix_matches_scalar_function(self):
+        """Each cell of the matrix is the distance of get_distance_m"""
+
+        matrix = get_distance_matrix_m(self.points, self.sites)
+        expected = np.array(
+            [
+                [get_distance_m(*point, *site) for site in self.sites]
+                for point in self.points
+            ]
+        )
+
+        self.assertEqual(matrix.shape, (len(self.points), len(self.sites)))
+        self.assertTrue(np.array_equal(matrix, expected))
+
+    def test_distances_match_scalar_function_exactly(self):
+        """Random pairs of points get the distances of get_distance_m exactly"""
+
+        generator = np.random.default_rng(42)
+        lat1, lat2 = generator.uniform(-90, 90, (2, 5000))
+        lon1, lon2 = generator.uniform(-180, 180, (2, 5000))
+
+        expected = [
+            get_distance_m(*coordinates) for coordinates in zip(lat1, lon1, lat2, lon2)
+        ]
+
+        self.assertTrue(
+            np.array_equal(get_distances_m(lat1, lon1, lat2, lon2), expected)
+        )
+
+    def test_distances_broadcast_scalars(self):
+        """Scalars are broadcast against arrays"""
+
+        distances = get_distances_m([COTONOU[0], 0], [COTONOU[1], 0], *PORTO_NOVO)
+
+        self.assertEqual(distances[0], get_distance_m(*COTONOU, *PORTO_NOVO))
+        self.assertEqual(distances[1], 0)
+
+    def test_nearest_sites_honours_radii_and_mask(self):
+        """The nearest site is searched among eligible sites only"""
+
+        points = [COTONOU, PORTO_NOVO, PARIS]
+        sites = [COTONOU, PORTO_NOVO]
+
+        indices, _ = get_nearest_sites(points, sites, radii=[150, 150])
+        self.assertEqual(indices.tolist(), [0, 1, -1])
+
+        mask = [[False, True], [True, True], [True, True]]
+        indices, distances = get_nearest_sites(
+            points, sites, radii=[150, 150], mask=mask
+        )
+        self.assertEqual(indices.tolist(), [-1, 1, -1])
+        self.assertEqual(distances[0], np.inf)
+
+
+class SiteIndexTests(TestCase):
+    """Tests for the in-memory grid index of sites."""
+
+    def setUp(self):
+        self.cotonou = IndexedSite("cotonou", "Cotonou", *COTONOU, 150)
+        self.porto_novo = IndexedSite("porto-novo", "Porto-Novo", *PORTO_NOVO, 500)
+        self.index = SiteIndex([self.cotonou, self.porto_novo])
+
+    def test_lookup_only_returns_nearby_candidates(self):
+        """Sites far away from the point are not candidates"""
+
+        self.assertEqual(self.index.candidates(*COTONOU), [self.cotonou])
+        self.assertEqual(self.index.candidates(*PARIS), [])
+
+    def test_locate_checks_site_radius(self):
+        """A point is located only within the radius of a site"""
+
+        self.assertEqual(self.index.locate(*COTONOU), self.cotonou)
+        # ~250 m north of Cotonou site: in its cell, out of its radius
+        self.assertIsNone(self.index.locate(COTONOU[0] + 0.00225, COTONOU[1]))
+        # ~250 m north of Porto-Novo site: within its radius
+        self.assertEqual(
+            self.index.locate(PORTO_NOVO[0] + 0.00225, PORTO_NOVO[1]),
+            self.porto_novo,
+        )
+
+    def test_site_covering_several_cells_is_found_from_each(self):
+        """A site is indexed in every cell its radius overlaps"""
+
+        large = IndexedSite("large", "Large", *COTONOU, 5000)
+        index = SiteIndex([large])
+
+        self.assertEqual(index.locate(COTONOU[0] + 0.04, COTONOU[1]), large)
+        self.assertEqual(index.locate(COTONOU[0], COTONOU[1] - 0.04), large)
+        self.assertIsNone(index.locate(COTONOU[0] + 0.05, COTONOU[1]))
+
+    def test_locate_restricted_to_allowed_sites(self):
+        """Sites outside of the allowed ones are ignored"""
+
+        self.assertIsNone(self.index.locate(*COTONOU, allowed_site_ids={"porto-novo"}))
+
+    def test_locate_many_matches_locate(self):
+        """The vectorized lookup gives the same sites as the scalar one"""
+
+        points = [COTONOU, PORTO_NOVO, PARIS, (COTONOU[0] + 0.00225, COTONOU[1])]
+        allowed = [None, {"cotonou"}, None, None]
+
+        self.assertEqual(
+            self.index.locate_many(points, allowed),
+            [self.index.locate(*point, a) for point, a in zip(points, allowed)],
+        )
+
+    def test_locate_many_only_measures_grid_candidates(self):
+        """Distances are computed to the sites of the cell of each point only"""
+
+        far_sites = [
+            IndexedSite(f"far-{i}", f"Far {i}", PARIS[0] + i / 10, PARIS[1], 150)
+            for i in range(50)
+        ]
+        index = SiteIndex([self.cotonou, self.porto_novo, *far_sites])
+
+        with mock.patch(
+            "attendance.utils.geofencing.get_distances_m", wraps=get_distances_m
+        ) as distances:
+            located = index.locate_many([COTONOU, PORTO_NOVO, (0.0, 0.0)])
+
+        self.assertEqual(located[:2], [self.cotonou, self.porto_novo])
+        self.assertIsNotNone(located[2])  # missing coordinates
+        self.assertEqual(len(distances.call_args.args[0]), 2 + len(index))
+
+
+class GeofencingTests(BaseTestCase):
+    """Tests for multi-site geofencing of clocks."""
+
+    def setUp(self):
+        super().setUp()
+        self.cotonou = Site.objects.create(
+            name="Cotonou", latitude=COTONOU[0], longitude=COTONOU[1]
+        )
+        self.porto_novo = Site.objects.create(
+            name="Porto-Novo", latitude=PORTO_NOVO[0], longitude=PORTO_NOVO[1]
+        )
+
+    def tearDown(self):
+        # Sites are rolled back without signals: drop them from the index
+        invalidate_site_index()
+
+    def test_index_is_rebuilt_when_sites_change(self):
+        """Saving or deleting a site invalidates the index"""
+
+        self.assertEqual(len(get_site_index()), 2)
+
+        paris = Site.objects.create(name="Paris", latitude=PARIS[0], longitude=PARIS[1])
+        self.assertTrue(is_location_allowed(*PARIS))
+
+        paris.delete()
+        self.assertFalse(is_location_allowed(*PARIS))
+
+    def test_users_are_restricted_to_their_sites_and_team_sites(self):
+        """Allowed sites come from the user and from their teams"""
+
+        team = Team.objects.create(name="Porto-Novo team")
+        team.members.add(self.employee)
+        self.porto_novo.teams.add(team)
+        self.cotonou.users.add(self.manager)
+
+        allowed = get_allowed_site_ids(
+            [self.employee.id, self.manager.id, self.admin.id]
+        )
+
+        self.assertEqual(allowed[self.employee.id], {self.porto_novo.id})
+        self.assertEqual(allowed[self.manager.id], {self.cotonou.id})
+        self.assertNotIn(self.admin.id, allowed)
+
+    @freeze_time(f"2025-10-21 {settings.CHECK_IN_START_HOUR}:00:00")
+    def test_user_can_only_clock_at_an_allowed_site(self):
+        """A clock at a site the user is not assigned to is rejected"""
+
+        self.porto_novo.users.add(self.employee)
+        self.client.force_authenticate(user=self.employee)
+
+        response = self.client.post(
+            reverse("clocks"),
+            {
+                "is_check_in_action": True,
+                "latitude": COTONOU[0],
+                "longitude": COTONOU[1],
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(
+            reverse("clocks"),
+            {
+                "is_check_in_action": True,
+                "latitude": PORTO_NOVO[0],
+                "longitude": PORTO_NOVO[1],
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    @override_settings(COMPANY_LATITUDE=PARIS[0], COMPANY_LONGITUDE=PARIS[1])
+    def test_company_location_is_used_without_sites(self):
+        """Without any site, the company location from the settings applies"""
+
+        Site.objects.all().delete()
+
+        self.assertTrue(is_location_allowed(*PARIS))
+        self.assertFalse(is_location_allowed(*COTONOU))
+        self.assertEqual(are_locations_allowed([PARIS, COTONOU]), [True, False])
@@ -0,0 +1,161 @@
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from attendance.models import Attendance, AttendanceRollup
+from attendance.utils.exports import get_export_queryset
+from attendance.utils.kpi_helpers import compute_user_kpis
+from attendance.utils.rollups import rebuild_rollups, refresh_rollups
+from users.models import User
+
+
+class AttendanceIndexTests(TestCase):
+    """
+    Tests that the attendance queries (rollups, KPIs, exports, open
+    attendances, absences, delays) use their indexes (EXPLAIN). Sequential scans are disabled, as the planner prefers them on
+    small tables.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(email=f"user{i}@example.com", password="pass")
+            for i in range(5)
+        ]
+        attendances = []
+        for offset in range(60):
+            day = date(2025, 8, 1) + timedelta(days=offset)
+            for i, user in enumerate(cls.users):
+                check_in = datetime(
+                    day.year, day.month, day.day, 8 + i % 3, tzinfo=dt_timezone.utc
+                )
+                attendances.append(
+                    Attendance(user=user, day=day, check_in=check_in if i else None)
+                )
+        Attendance.objects.bulk_create(attendances)
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE attendance_attendance")
+
+    def get_index_names(self, cursor, index):
+        # The index of each partition of the table
+        cursor.execute(
+            "SELECT inhrelid::regclass::text FROM pg_inherits "
+            "WHERE inhparent = %s::regclass",
+            [index],
+        )
+        return [index] + [name for (name,) in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset, index):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                names = self.get_index_names(cursor, index)
+            plan = queryset.explain()
+            transaction.set_rollback(True)
+
+        self.assertTrue(any(name in plan for name in names), plan)
+
+    def assertQueriesUseIndex(self, function, model, index=None):
+        """
+        The queries of `function` reading the table of `model` use the index
+        (any index of the table by default).
+        """
+        table = model._meta.db_table
+        plans = []
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                names = self.get_index_names(cursor, index) if index else []
+                with CaptureQueriesContext(connection) as context:
+                    function()
+                for query in context.captured_queries:
+                    if f"FROM {connection.ops.quote_name(table)}" in query["sql"]:
+                        cursor.execute(f"EXPLAIN {query['sql']}")
+                        plans.append("\n".join(row for (row,) in cursor.fetchall()))
+            transaction.set_rollback(True)
+
+        self.assertTrue(plans)
+        for plan in plans:
+            if names:
+                self.assertTrue(any(name in plan for name in names), plan)
+            self.assertNotIn(f"Seq Scan on {table}", plan)
+
+    def test_rollup_refreshes_use_an_index(self):
+        """Rollup refreshes read the attendances of their days from an index"""
+
+        # Either the covering index or one of the (day, ...) indexes,
+        # depending on the statistics of the table
+        self.assertQueriesUseIndex(
+            lambda: refresh_rollups(
+                [(user.id, date(2025, 8, 5)) for user in self.users[:2]]
+            ),
+            Attendance,
+        )
+
+    def test_kpis_use_the_rollup_index(self):
+        """KPIs of a user read the rollups of the periods of the range"""
+
+        rebuild_rollups()
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE attendance_attendancerollup")
+
+        self.assertQueriesUseIndex(
+            lambda: compute_user_kpis(
+                self.users[1], date(2025, 8, 1), date(2025, 9, 15)
+            ),
+            AttendanceRollup,
+        )
+
+    def test_company_exports_use_the_brin_index(self):
+        """Company-wide exports read their range of days from the BRIN index"""
+
+        self.assertUsesIndex(
+            get_export_queryset(date(2025, 8, 1), date(2025, 9, 15)),
+            "attendance_day_brin",
+        )
+
+    def test_user_exports_use_the_covering_index(self):
+        """Exports of a user read their days from the covering index"""
+
+        self.assertUsesIndex(
+            get_export_queryset(
+                date(2025, 8, 1), date(2025, 8, 31), user=self.users[1]
+            ),
+            "unique_user_day_attendance",
+        )
+
+    def test_open_attendances_use_the_partial_index(self):
+        """Open attendances are looked up in their partial index"""
+
+        self.assertUsesIndex(
+            Attendance.objects.open().filter(user=self.users[1]),
+            "attendance_open_idx",
+        )
+
+    def test_absences_use_the_partial_index(self):
+        """Absences of a day are looked up in their partial index"""
+
+        self.assertUsesIndex(
+            Attendance.objects.absent().filter(day=date(2025, 8, 5)),
+            "attendance_absent_idx",
+        )
+
+    def test_day_queries_use_the_stored_seconds_indexes(self):
+        """Delays and worked time of a day range are read from their indexes"""
+
+        days = (date(2025, 8, 1), date(2025, 8, 31))
+
+        self.assertUsesIndex(
+            Attendance.objects.delayed().filter(day__range=days),
+            "attendance_day_check_in_idx",
+        )
+        self.assertUsesIndex(
+            Attendance.objects.filter(day=date(2025, 8, 5)).order_by(
+                "day", "-worked_seconds"
+            )[:3],
+            "attendance_day_worked_idx",
+        )
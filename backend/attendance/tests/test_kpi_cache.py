@@ -0,0 +1,127 @@
+import threading
+import time
+from datetime import date, datetime
+from datetime import timezone as dt_timezone
+
+from django.core.cache import cache
+from django.test import TestCase
+from freezegun import freeze_time
+
+from attendance.models import Attendance
+from attendance.utils.kpi_cache import (
+    get_or_compute,
+    get_team_kpis,
+    get_user_kpis,
+)
+from attendance.utils.kpi_helpers import get_period_range
+from attendance.utils.rollups import refresh_team_kpis
+from teams.models import Team
+from users.models import User
+
+
+@freeze_time("2025-10-21 21:00:00")
+class KPICacheTests(TestCase):
+    """Tests for the KPI result cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="pass", is_active=True
+        )
+        self.other = User.objects.create_user(
+            email="other@example.com", password="pass", is_active=True
+        )
+        Attendance.objects.create(user=self.user, day=date(2025, 10, 1))
+
+    def test_kpis_are_cached(self):
+        """A second read does not touch the database"""
+
+        kpis = get_user_kpis(self.user, *get_period_range("monthly"))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                get_user_kpis(self.user, *get_period_range("monthly")), kpis
+            )
+
+    def test_attendance_change_invalidates_the_user_kpis(self):
+        """Only the KPIs of the user and period of the attendance are invalidated"""
+
+        get_user_kpis(self.user, *get_period_range("monthly"))
+        get_user_kpis(self.other, *get_period_range("monthly"))
+        get_user_kpis(self.user, *get_period_range("yearly"))
+
+        Attendance.objects.create(
+            user=self.user,
+            day=date(2025, 10, 2),
+            check_in=datetime(2025, 10, 2, 9, 30, tzinfo=dt_timezone.utc),
+        )
+
+        kpis = get_user_kpis(self.user, *get_period_range("monthly"))
+        self.assertEqual(kpis["delays"]["hours"], 1800)
+        with self.assertNumQueries(0):
+            get_user_kpis(self.other, *get_period_range("monthly"))
+        get_user_kpis(self.user, *get_period_range("yearly"))
+
+        # Previous year: the cached yearly KPIs are still valid
+        Attendance.objects.create(user=self.user, day=date(2024, 10, 2))
+        with self.assertNumQueries(0):
+            get_user_kpis(self.user, *get_period_range("yearly"))
+
+    def test_user_kpis_are_invalidated_again_on_commit(self):
+        """KPIs computed before the change is committed are not kept"""
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(user=self.user, day=date(2025, 10, 2))
+            get_user_kpis(self.user, *get_period_range("monthly"))
+
+        with self.assertNumQueries(1):
+            get_user_kpis(self.user, *get_period_range("monthly"))
+
+    def test_team_kpis_are_invalidated_on_refresh(self):
+        """Team KPIs are recomputed once the materialized view is refreshed"""
+
+        team = Team.objects.create(name="Team A")
+        team.members.add(self.user)
+        refresh_team_kpis()
+        self.assertEqual(
+            get_team_kpis(team, *get_period_range("monthly"))["absence"]["total"], 1
+        )
+
+        Attendance.objects.create(user=self.user, day=date(2025, 10, 2))
+        refresh_team_kpis()
+
+        self.assertEqual(
+            get_team_kpis(team, *get_period_range("monthly"))["absence"]["total"], 2
+        )
+
+
+class SingleFlightTests(TestCase):
+    """Tests for the collapsing of concurrent cache misses."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_are_computed_once(self):
+        """Concurrent misses on the same key wait for a single computation"""
+
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"value": 42}
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(get_or_compute("kpis:test", [], compute))
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"value": 42}] * 5)
@@ -0,0 +1,677 @@
+from datetime import date, datetime
+from datetime import timezone as dt_timezone
+
+from django.db.models import Count
+from django.test import TestCase
+from django.urls import reverse
+from freezegun import freeze_time
+from rest_framework import status
+
+from attendance.models import Attendance
+from attendance.utils.kpi_helpers import (
+    compute_team_kpis,
+    compute_user_kpis,
+    compute_user_standing,
+    compute_work_hours,
+    decompose_range,
+    get_company_today,
+    get_period_range,
+    get_rolling_range,
+)
+from attendance.utils.rollups import rebuild_rollups, refresh_team_kpis
+from teams.models import Team
+from users.models import User
+from users.tests import BaseTestCase
+
+
+def at(day, hour, minute=0):
+    return datetime(2025, 10, day, hour, minute, tzinfo=dt_timezone.utc)
+
+
+@freeze_time("2025-10-21 21:00:00")
+class ComputeUserKPIsTests(TestCase):
+    """Tests for compute_user_kpis."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com", password="pass", is_active=True
+        )
+        Attendance.objects.bulk_create(
+            [
+                # Late, left early
+                Attendance(
+                    user=self.user,
+                    day=date(2025, 10, 1),
+                    check_in=at(1, 9, 30),
+                    check_out=at(1, 18),
+                ),
+                # Early, two additional hours
+                Attendance(
+                    user=self.user,
+                    day=date(2025, 10, 2),
+                    check_in=at(2, 8),
+                    check_out=at(2, 19),
+                ),
+                Attendance(user=self.user, day=date(2025, 10, 3)),
+                Attendance(user=self.user, day=date(2025, 10, 6), is_excused=True),
+                # Previous month
+                Attendance(user=self.user, day=date(2025, 9, 30)),
+            ]
+        )
+        # bulk_create skips the incremental refresh
+        rebuild_rollups()
+
+    def test_kpis_are_computed_in_a_single_query(self):
+        """All the KPIs come from one rollup lookup"""
+
+        with self.assertNumQueries(1):
+            kpis = compute_user_kpis(self.user, *get_period_range("monthly"))
+
+        self.assertEqual(
+            kpis,
+            {
+                "delays": {"rate": 25.0, "hours": 1800},
+                "additional_hours": {"rate": 25.0, "hours": 7200},
+                "absences": {"total": 1},
+            },
+        )
+
+    def test_kpis_without_attendances(self):
+        """A period without attendances has zero KPIs"""
+
+        kpis = compute_user_kpis(self.user, *get_period_range("weekly"))
+
+        self.assertEqual(
+            kpis,
+            {
+                "delays": {"rate": 0.0, "hours": 0},
+                "additional_hours": {"rate": 0.0, "hours": 0},
+                "absences": {"total": 0},
+            },
+        )
+
+
+@freeze_time("2025-10-21 21:00:00")
+class ComputeTeamKPIsTests(TestCase):
+    """Tests for compute_team_kpis and the team KPIs materialized view."""
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                email=f"user{i}@example.com", password="pass", is_active=True
+            )
+            for i in range(3)
+        ]
+        self.team = Team.objects.create(name="Team A")
+        self.team.members.add(*self.users[:2])
+
+        # Late
+        Attendance.objects.create(
+            user=self.users[0],
+            day=date(2025, 10, 1),
+            check_in=at(1, 9, 30),
+            check_out=at(1, 18, 30),
+        )
+        # Absent
+        Attendance.objects.create(user=self.users[1], day=date(2025, 10, 1))
+        # Not a member
+        Attendance.objects.create(user=self.users[2], day=date(2025, 10, 1))
+
+        refresh_team_kpis()
+
+    def test_team_kpis_are_a_single_lookup(self):
+        """Team KPIs aggregate the members' rollups in one indexed lookup"""
+
+        team = (
+            Team.objects.prefetch_related(None)
+            .annotate(members_count=Count("members"))
+            .get(id=self.team.id)
+        )
+
+        with self.assertNumQueries(1):
+            kpis = compute_team_kpis(team, *get_period_range("monthly"))
+
+        self.assertEqual(
+            kpis,
+            {
+                "team": self.team.id,
+                "team_name": "Team A",
+                "members_count": 2,
+                "delays": {"rate": 50.0, "hours": 1800},
+                "additional_hours": {"rate": 0.0, "hours": 0},
+                "absence": {"total": 1},
+            },
+        )
+
+    def test_membership_change_schedules_a_refresh(self):
+        """The view is refreshed once the membership change is committed"""
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.team.members.add(self.users[2])
+
+        self.assertEqual(len(callbacks), 4)
+
+        refresh_team_kpis()
+        self.assertEqual(
+            compute_team_kpis(self.team, *get_period_range("monthly"))["absence"][
+                "total"
+            ],
+            2,
+        )
+
+
+@freeze_time("2025-10-21 21:00:00")
+class UsersKPIsViewTests(BaseTestCase):
+    """Tests for the batch KPIs endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        self.team = Team.objects.create(name="Team A")
+        self.team.members.add(self.employee, self.manager)
+        Attendance.objects.create(
+            user=self.employee,
+            day=date(2025, 10, 1),
+            check_in=at(1, 9, 30),
+            check_out=at(1, 18),
+        )
+
+    def get_kpis(self, **params):
+        return self.client.get(reverse("users_kpis"), params)
+
+    def test_kpis_of_a_team_in_a_single_lookup(self):
+        """KPIs of all the members come from one rollup lookup"""
+
+        self.client.force_authenticate(user=self.manager)
+        # Roles of the forced user, team members, rollups
+        with self.assertNumQueries(3):
+            response = self.get_kpis(team_id=self.team.id)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        kpis = {row.pop("user"): row for row in response.data}
+        self.assertEqual(set(kpis), {self.employee.id, self.manager.id})
+        self.assertEqual(
+            kpis[self.employee.id]["delays"], {"rate": 100.0, "hours": 1800}
+        )
+        self.assertEqual(kpis[self.manager.id]["delays"], {"rate": 0.0, "hours": 0})
+
+    def test_kpis_of_users_keep_the_requested_order(self):
+        """Users are returned once, in the requested order"""
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.get_kpis(
+            user_ids=f"{self.manager.id},{self.employee.id},{self.manager.id}",
+            periodicity="yearly",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [row["user"] for row in response.data], [self.manager.id, self.employee.id]
+        )
+
+    def test_employee_can_only_request_themselves(self):
+        """The self-or-manager permission applies to every requested user"""
+
+        self.client.force_authenticate(user=self.employee)
+
+        response = self.get_kpis(user_ids=self.employee.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.get_kpis(user_ids=f"{self.employee.id},{self.manager.id}")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.get_kpis(team_id=self.team.id)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_user_ids_or_team_id_is_required(self):
+        """Exactly one of user_ids and team_id must be given"""
+
+        self.client.force_authenticate(user=self.admin)
+
+        self.assertEqual(self.get_kpis().status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.get_kpis(user_ids=self.employee.id, team_id=self.team.id)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.get_kpis(team_id="unknown")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@freeze_time("2025-10-21 21:00:00")
+class TeamsKPIsViewTests(BaseTestCase):
+    """Tests for the company-wide team KPIs leaderboard."""
+
+    def setUp(self):
+        super().setUp()
+        self.late_team = Team.objects.create(name="Late team")
+        self.late_team.members.add(self.employee, self.manager)
+        self.absent_team = Team.objects.create(name="Absent team")
+        # The manager is a member of both teams
+        self.absent_team.members.add(self.manager)
+        self.empty_team = Team.objects.create(name="Empty team")
+
+        Attendance.objects.create(
+            user=self.employee,
+            day=date(2025, 10, 1),
+            check_in=at(1, 9, 30),
+            check_out=at(1, 18, 30),
+        )
+        Attendance.objects.create(user=self.manager, day=date(2025, 10, 1))
+
+        self.client.force_authenticate(user=self.admin)
+
+    def get_kpis(self, **params):
+        return self.client.get(reverse("teams_kpis"), params)
+
+    def test_kpis_of_all_teams_in_one_query(self):
+        """Every team is computed in one grouped query, empty teams included"""
+
+        # Roles of the forced user, page count, page of teams
+        with self.assertNumQueries(3):
+            response = self.get_kpis()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 3)
+        kpis = {row["team_name"]: row for row in response.data["results"]}
+
+        self.assertEqual(kpis["Late team"]["members_count"], 2)
+        self.assertEqual(kpis["Late team"]["delays"], {"rate": 50.0, "hours": 1800})
+        self.assertEqual(kpis["Late team"]["absence"], {"total": 1})
+        self.assertEqual(kpis["Absent team"]["members_count"], 1)
+        self.assertEqual(kpis["Absent team"]["absence"], {"total": 1})
+        self.assertEqual(
+            kpis["Empty team"],
+            {
+                "team": self.empty_team.id,
+                "team_name": "Empty team",
+                "members_count": 0,
+                "delays": {"rate": 0.0, "hours": 0},
+                "additional_hours": {"rate": 0.0, "hours": 0},
+                "absence": {"total": 0},
+            },
+        )
+
+    def test_kpis_match_the_team_endpoint(self):
+        """The leaderboard and the team KPIs agree"""
+
+        refresh_team_kpis()
+        response = self.get_kpis()
+
+        for row in response.data["results"]:
+            team = Team.objects.get(id=row["team"])
+            self.assertEqual(row, compute_team_kpis(team, *get_period_range("monthly")))
+
+    def test_team_endpoint_counts_the_members_with_the_team(self):
+        """The members are counted in the lookup of the team"""
+
+        refresh_team_kpis()
+
+        # Roles of the forced user, team with its members count, totals
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                reverse("team_kpis", args=[self.late_team.id]),
+                {"periodicity": "monthly"},
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["members_count"], 2)
+        self.assertEqual(response.data["absence"], {"total": 1})
+
+    def test_sort_and_paginate(self):
+        """Teams are sortable by KPI and paginated"""
+
+        response = self.get_kpis(ordering="-delay_rate,name", page_size=2)
+        self.assertEqual(
+            [row["team_name"] for row in response.data["results"]],
+            ["Late team", "Absent team"],
+        )
+
+        response = self.get_kpis(ordering="-delay_rate,name", page_size=2, page=2)
+        self.assertEqual(
+            [row["team_name"] for row in response.data["results"]], ["Empty team"]
+        )
+
+        response = self.get_kpis(ordering="-members_count")
+        self.assertEqual(response.data["results"][0]["team_name"], "Late team")
+
+    def test_only_company_admins(self):
+        """Managers cannot compare all the teams"""
+
+        self.client.force_authenticate(user=self.manager)
+        self.assertEqual(self.get_kpis().status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_periodicity(self):
+        """Unknown periodicities are rejected"""
+
+        response = self.get_kpis(periodicity="hourly")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@freeze_time("2025-10-21 21:00:00")
+class UserStandingTests(BaseTestCase):
+    """Tests for the rank and percentile of a user."""
+
+    def setUp(self):
+        super().setUp()
+        self.team = Team.objects.create(name="Team A")
+        self.team.members.add(self.employee, self.manager)
+
+        # Worked 10h, 9h30 and 8h, the employee arrived late
+        Attendance.objects.create(
+            user=self.admin,
+            day=date(2025, 10, 1),
+            check_in=at(1, 8),
+            check_out=at(1, 18),
+        )
+        Attendance.objects.create(
+            user=self.employee,
+            day=date(2025, 10, 1),
+            check_in=at(1, 9, 30),
+            check_out=at(1, 19),
+        )
+        Attendance.objects.create(
+            user=self.manager,
+            day=date(2025, 10, 1),
+            check_in=at(1, 8),
+            check_out=at(1, 16),
+        )
+
+    def test_standing_in_a_single_query(self):
+        """Ranks, percentiles and neighbours come from one window query"""
+
+        with self.assertNumQueries(1):
+            standing = compute_user_standing(
+                self.employee.id, *get_period_range("monthly")
+            )
+
+        self.assertEqual(standing["ranked_users"], 3)
+        self.assertEqual(
+            standing["worked_hours"],
+            {
+                "rank": 2,
+                "percentile": 50.0,
+                "value": 9.5 * 3600,
+                "above": {"user": self.admin.id, "value": 10 * 3600},
+                "below": {"user": self.manager.id, "value": 8 * 3600},
+            },
+        )
+        # Lower delays rank first, on time users share the first rank
+        self.assertEqual(standing["punctuality"]["rank"], 3)
+        self.assertEqual(standing["punctuality"]["percentile"], 0.0)
+        self.assertIsNone(standing["punctuality"]["below"])
+        self.assertEqual(standing["extra_hours"]["rank"], 2)
+
+    def test_team_standing(self):
+        """Team standings only rank the members"""
+
+        standing = compute_user_standing(
+            self.employee.id, *get_period_range("monthly"), self.team
+        )
+
+        self.assertEqual(standing["ranked_users"], 2)
+        self.assertEqual(standing["worked_hours"]["rank"], 1)
+        self.assertEqual(standing["worked_hours"]["percentile"], 100.0)
+        self.assertIsNone(standing["worked_hours"]["above"])
+
+    def test_user_without_attendance(self):
+        """Users without attendance in the period are not ranked"""
+
+        standing = compute_user_standing(self.employee.id, *get_period_range("weekly"))
+
+        self.assertEqual(standing["ranked_users"], 0)
+        self.assertIsNone(standing["worked_hours"]["rank"])
+        self.assertIsNone(standing["worked_hours"]["percentile"])
+
+    def test_standing_endpoint(self):
+        """Employees can only see their own standing"""
+
+        self.client.force_authenticate(user=self.employee)
+
+        response = self.client.get(
+            reverse("user_standing", args=[self.employee.id]),
+            {"team_id": self.team.id},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["team"], self.team.id)
+
+        response = self.client.get(reverse("user_standing", args=[self.manager.id]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@freeze_time("2025-10-21 21:00:00")
+class ComputeWorkHoursTests(TestCase):
+    """Tests for the work hours series."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com", password="pass", is_active=True
+        )
+        Attendance.objects.create(
+            user=self.user,
+            day=date(2025, 10, 20),
+            check_in=at(20, 8),
+            check_out=at(20, 17),
+        )
+        Attendance.objects.create(
+            user=self.user,
+            day=date(2025, 10, 21),
+            check_in=at(21, 8),
+            check_out=at(21, 12),
+        )
+        Attendance.objects.create(
+            user=self.user,
+            day=date(2025, 10, 1),
+            check_in=at(1, 8),
+            check_out=at(1, 18),
+        )
+
+    def test_daily_series_is_gap_filled(self):
+        """Every day of the period has a point, in one query"""
+
+        with self.assertNumQueries(1):
+            series = compute_work_hours(self.user, *get_period_range("monthly"))
+
+        self.assertEqual(len(series["dates"]), 21)
+        self.assertEqual(series["dates"][0], "2025-10-01")
+        self.assertEqual(series["dates"][-1], "2025-10-21")
+        self.assertEqual(series["hours"][0], 10)
+        self.assertEqual(series["hours"][1:19], [0] * 18)
+        self.assertEqual(series["hours"][-2:], [9, 4])
+
+    def test_weekly_buckets(self):
+        """Weeks start on Monday"""
+
+        series = compute_work_hours(self.user, *get_period_range("monthly"), "week")
+
+        self.assertEqual(
+            series["dates"],
+            ["2025-09-29", "2025-10-06", "2025-10-13", "2025-10-20"],
+        )
+        self.assertEqual(series["hours"], [10, 0, 0, 13])
+
+    def test_monthly_buckets_of_a_year(self):
+        """A yearly chart has one point per month"""
+
+        series = compute_work_hours(self.user, *get_period_range("yearly"), "month")
+
+        self.assertEqual(len(series["dates"]), 10)
+        self.assertEqual(series["hours"][-1], 23)
+
+    def test_daily_periodicity(self):
+        """The current day is a valid period"""
+
+        series = compute_work_hours(self.user, *get_period_range("daily"))
+
+        self.assertEqual(series["dates"], ["2025-10-21"])
+        self.assertEqual(series["hours"], [4])
+
+
+@freeze_time("2025-10-21 21:00:00")
+class KPIRangeTests(BaseTestCase):
+    """Tests for the custom ranges and rolling windows of the KPIs."""
+
+    def test_range_is_decomposed_into_rollup_periods(self):
+        """Full months and weeks are read from their rollups, edges per day"""
+
+        self.assertEqual(
+            decompose_range(date(2025, 1, 30), date(2025, 3, 4)),
+            [
+                ("daily", date(2025, 1, 30)),
+                ("daily", date(2025, 1, 31)),
+                ("monthly", date(2025, 2, 1)),
+                ("daily", date(2025, 3, 1)),
+                ("daily", date(2025, 3, 2)),
+                ("daily", date(2025, 3, 3)),
+                ("daily", date(2025, 3, 4)),
+            ],
+        )
+        self.assertEqual(
+            decompose_range(date(2025, 6, 9), date(2025, 6, 22)),
+            [("weekly", date(2025, 6, 9)), ("weekly", date(2025, 6, 16))],
+        )
+
+    def test_range_ending_today_covers_the_current_periods(self):
+        """Current periods are read from their rollups"""
+
+        self.assertEqual(
+            decompose_range(*get_period_range("yearly")),
+            [("yearly", date(2025, 1, 1))],
+        )
+        self.assertEqual(
+            decompose_range(date(2025, 10, 13), date(2025, 10, 21)),
+            [("weekly", date(2025, 10, 13)), ("weekly", date(2025, 10, 20))],
+        )
+
+    def test_rolling_ranges(self):
+        """Rolling windows end today"""
+
+        self.assertEqual(
+            get_rolling_range(5, "business_days"),
+            (date(2025, 10, 15), date(2025, 10, 21)),
+        )
+        self.assertEqual(
+            get_rolling_range(30, "days"), (date(2025, 9, 22), date(2025, 10, 21))
+        )
+        self.assertEqual(
+            get_rolling_range(2, "weeks"), (date(2025, 10, 8), date(2025, 10, 21))
+        )
+
+    @freeze_time("2025-10-21 23:30:00")
+    def test_days_end_in_the_company_timezone(self):
+        """Africa/Porto-Novo is one hour ahead of UTC"""
+
+        self.assertEqual(get_company_today(), date(2025, 10, 22))
+        self.assertEqual(get_period_range("daily"), (date(2025, 10, 22),) * 2)
+
+    def test_kpis_of_a_custom_range(self):
+        """A range spanning two months sums their rollups in one query"""
+
+        Attendance.objects.create(
+            user=self.employee,
+            day=date(2025, 9, 30),
+            check_in=at(1, 9, 30).replace(month=9, day=30),
+        )
+        Attendance.objects.create(user=self.employee, day=date(2025, 10, 1))
+        Attendance.objects.create(user=self.employee, day=date(2025, 10, 2))
+
+        with self.assertNumQueries(1):
+            kpis = compute_user_kpis(
+                self.employee, date(2025, 9, 30), date(2025, 10, 1)
+            )
+
+        self.assertEqual(kpis["delays"], {"rate": 50.0, "hours": 1800})
+        self.assertEqual(kpis["absences"], {"total": 1})
+
+    def test_endpoints_accept_ranges(self):
+        """KPI endpoints take start/end or a rolling window"""
+
+        Attendance.objects.create(user=self.employee, day=date(2025, 10, 20))
+        self.client.force_authenticate(user=self.admin)
+        url = reverse("user_kpis", args=[self.employee.id])
+
+        response = self.client.get(url, {"last": 30, "unit": "business_days"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["absences"], {"total": 1})
+
+        response = self.client.get(url, {"start": "2025-09-01", "end": "2025-09-30"})
+        self.assertEqual(response.data["absences"], {"total": 0})
+
+        response = self.client.get(
+            reverse("best_performers"), {"start": "2025-10-20", "count": 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]["user"]["id"], self.employee.id)
+
+    def test_invalid_ranges(self):
+        """Inverted, mixed or incomplete ranges are rejected"""
+
+        self.client.force_authenticate(user=self.admin)
+        url = reverse("user_kpis", args=[self.employee.id])
+
+        for params in (
+            {"start": "2025-10-02", "end": "2025-10-01"},
+            {"start": "2025-10-01", "last": 5},
+            {"end": "2025-10-01"},
+            {"last": 0},
+            {"start": "2015-01-01"},
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+class AttendanceStoredSecondsTests(TestCase):
+    """Tests for the worked and check-in seconds stored on the attendances."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com", password="pass", is_active=True
+        )
+
+    def test_seconds_are_stored_on_write(self):
+        """Worked and check-in seconds follow the clocks"""
+
+        attendance = Attendance.objects.create(
+            user=self.user, day=date(2025, 10, 1), check_in=at(1, 9, 30)
+        )
+        self.assertEqual(attendance.worked_seconds, 0)
+        self.assertEqual(attendance.check_in_seconds, 9.5 * 3600)
+
+        Attendance.objects.filter(pk=attendance.pk).update(check_out=at(1, 19))
+        attendance.refresh_from_db()
+        self.assertEqual(attendance.worked_seconds, 9.5 * 3600)
+
+        absent = Attendance.objects.create(user=self.user, day=date(2025, 10, 2))
+        self.assertEqual(absent.worked_seconds, 0)
+        self.assertIsNone(absent.check_in_seconds)
+
+    def test_filters_use_the_stored_columns(self):
+        """Delay and extra time filters compare the indexed columns"""
+
+        Attendance.objects.create(
+            user=self.user,
+            day=date(2025, 10, 1),
+            check_in=at(1, 9, 30),
+            check_out=at(1, 19),
+        )
+        Attendance.objects.create(
+            user=self.user,
+            day=date(2025, 10, 2),
+            check_in=at(2, 8, 45),
+            check_out=at(2, 17),
+        )
+
+        delayed = Attendance.objects.delayed()
+        self.assertEqual(
+            list(delayed.values_list("day", flat=True)), [date(2025, 10, 1)]
+        )
+        self.assertNotIn("EXTRACT", str(delayed.query))
+        self.assertEqual(
+            list(Attendance.objects.with_extra_time().values_list("day", flat=True)),
+            [date(2025, 10, 1)],
+        )
+        self.assertEqual(
+            list(
+                Attendance.objects.with_extra_seconds()
+                .with_delay_seconds()
+                .order_by("day")
+                .values_list("extra_seconds", "delay_seconds")
+            ),
+            [(1800.0, 1800.0), (-2700.0, -900.0)],
+        )
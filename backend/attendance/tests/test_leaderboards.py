@@ -0,0 +1,177 @@
+from datetime import date, datetime
+from datetime import timezone as dt_timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.urls import reverse
+from freezegun import freeze_time
+from rest_framework import status
+
+from attendance.models import Attendance
+from attendance.tasks import refresh_team_kpis
+from attendance.utils.leaderboards import get_best_performers, get_leaderboards
+from teams.models import Team
+from users.tests import BaseTestCase
+
+
+def worked(user, day, hours):
+    return Attendance.objects.create(
+        user=user,
+        day=day,
+        check_in=datetime(day.year, day.month, day.day, 8, tzinfo=dt_timezone.utc),
+        check_out=datetime(
+            day.year, day.month, day.day, 8 + hours, tzinfo=dt_timezone.utc
+        ),
+    )
+
+
+@freeze_time("2025-10-21 21:00:00")
+class LeaderboardTests(BaseTestCase):
+    """Tests for the best performers leaderboards."""
+
+    def setUp(self):
+        super().setUp()
+        get_leaderboards().clear()
+        self.team = Team.objects.create(name="Team A")
+        self.team.members.add(self.employee, self.manager)
+
+        # Leaderboards are written once the changes are committed
+        with self.captureOnCommitCallbacks(execute=True):
+            worked(self.employee, date(2025, 10, 20), 9)
+            worked(self.manager, date(2025, 10, 20), 10)
+            worked(self.admin, date(2025, 10, 20), 11)
+
+    def test_clock_out_updates_the_leaderboards(self):
+        """Company and team leaderboards follow the worked seconds"""
+
+        self.assertEqual(
+            [p["user"] for p in get_best_performers("monthly")],
+            [self.admin.id, self.manager.id, self.employee.id],
+        )
+        self.assertEqual(
+            [p["user"] for p in get_best_performers("weekly", team=self.team)],
+            [self.manager.id, self.employee.id],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            worked(self.employee, date(2025, 10, 21), 9)
+
+        self.assertEqual(
+            get_best_performers("monthly", 1),
+            [{"user": self.employee.id, "total_worked_seconds": 18 * 3600}],
+        )
+        self.assertEqual(
+            get_best_performers("monthly", 1, team=self.team)[0]["user"],
+            self.employee.id,
+        )
+
+    def test_deleted_attendance_leaves_the_leaderboards(self):
+        """Users without attendance in the period are not ranked"""
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.get(user=self.admin).delete()
+
+        self.assertNotIn(
+            self.admin.id, [p["user"] for p in get_best_performers("monthly", 10)]
+        )
+
+    def test_rolled_back_changes_are_not_ranked(self):
+        """Leaderboards only follow committed changes"""
+
+        with (
+            self.captureOnCommitCallbacks(execute=True),
+            self.assertRaises(DatabaseError),
+            transaction.atomic(),
+        ):
+            worked(self.employee, date(2025, 10, 21), 9)
+            raise DatabaseError
+
+        self.assertEqual(
+            get_best_performers("monthly", 1, team=self.team),
+            [{"user": self.manager.id, "total_worked_seconds": 10 * 3600}],
+        )
+
+    def test_membership_change_updates_the_team_leaderboards(self):
+        """Team leaderboards of the current periods follow the members"""
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.team.members.remove(self.manager)
+            self.admin.teams.add(self.team)
+        # Without the Celery refresh of the team KPIs
+        for callback in callbacks:
+            if callback != refresh_team_kpis.delay:
+                callback()
+
+        self.assertEqual(
+            [p["user"] for p in get_best_performers("monthly", team=self.team)],
+            [self.admin.id, self.employee.id],
+        )
+
+    def test_rebuild_from_attendances(self):
+        """The rebuild command reconstructs the leaderboards"""
+
+        expected = get_best_performers("yearly", 10, team=self.team)
+        get_leaderboards().clear()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("rebuild_leaderboards", stdout=StringIO())
+
+        self.assertEqual(get_best_performers("yearly", 10, team=self.team), expected)
+        self.assertEqual(len(get_best_performers("weekly", 10)), 3)
+
+    def test_best_performers_endpoint(self):
+        """Performers are hydrated in a single query"""
+
+        self.client.force_authenticate(user=self.admin)
+
+        # Roles of the forced user, performers, their groups
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("best_performers"), {"count": 3})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [p["user"]["id"] for p in response.data],
+            [self.admin.id, self.manager.id, self.employee.id],
+        )
+        self.assertEqual(response.data[0]["total_worked_seconds"], 11 * 3600)
+
+    def test_team_best_performers_endpoint(self):
+        """Team best performers are restricted to the members"""
+
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.get(
+            reverse("team_best_performers", args=[self.team.id]), {"count": 1}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p["user"]["id"] for p in response.data], [self.manager.id])
+
+    def test_rank_endpoint(self):
+        """Users get their rank, company-wide or within a team"""
+
+        self.client.force_authenticate(user=self.employee)
+
+        response = self.client.get(reverse("best_performer_rank"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {
+                "user": self.employee.id,
+                "rank": 3,
+                "total_worked_seconds": 9 * 3600,
+                "ranked_users": 3,
+            },
+        )
+
+        response = self.client.get(
+            reverse("best_performer_rank"), {"team_id": self.team.id}
+        )
+        self.assertEqual(response.data["rank"], 2)
+        self.assertEqual(response.data["ranked_users"], 2)
+
+        Attendance.objects.filter(user=self.employee).delete()
+        get_leaderboards().clear()
+        response = self.client.get(reverse("best_performer_rank"))
+        self.assertIsNone(response.data["rank"])
@@ -0,0 +1,78 @@
+from datetime import date
+
+from django.db import connection
+from django.test import TestCase
+from freezegun import freeze_time
+
+from attendance.models import Attendance
+from attendance.tasks import create_attendance_partitions
+from attendance.utils.partitions import create_partitions, get_partitions
+from users.models import User
+
+
+def get_partition(attendance):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT tableoid::regclass::text FROM attendance_attendance WHERE id = %s",
+            [attendance.id],
+        )
+        return cursor.fetchone()[0]
+
+
+class AttendancePartitionTests(TestCase):
+    """Tests for the monthly partitioning of the attendance table."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com", password="pass", is_active=True
+        )
+
+    def test_partitions_are_created_ahead(self):
+        """The task creates the current and next months partitions, once"""
+
+        with freeze_time("2025-11-21 21:00:00"):
+            self.assertEqual(
+                create_attendance_partitions.apply().get(),
+                "Attendance partitions created: 4",
+            )
+            self.assertEqual(
+                create_attendance_partitions.apply().get(),
+                "Attendance partitions created: 0",
+            )
+
+        self.assertTrue(
+            {
+                "attendance_attendance_y2025m11",
+                "attendance_attendance_y2025m12",
+                "attendance_attendance_y2026m01",
+                "attendance_attendance_y2026m02",
+            }
+            <= set(get_partitions())
+        )
+
+    def test_default_partition_rows_are_moved(self):
+        """Attendances stored before their partition existed are moved to it"""
+
+        attendance = Attendance.objects.create(
+            user=self.user, day=date(2025, 10, 1), is_excused=True
+        )
+        self.assertEqual(get_partition(attendance), "attendance_attendance_default")
+
+        create_partitions(date(2025, 10, 15), 1)
+
+        self.assertEqual(get_partition(attendance), "attendance_attendance_y2025m10")
+        attendance.refresh_from_db()
+        self.assertTrue(attendance.is_excused)
+
+    def test_period_queries_are_pruned(self):
+        """Day-bounded queries only scan the partitions of their months"""
+
+        create_partitions(date(2025, 9, 1), 2)
+
+        plan = Attendance.objects.filter(
+            day__range=(date(2025, 10, 1), date(2025, 10, 31))
+        ).explain()
+
+        self.assertIn("attendance_attendance_y2025m10", plan)
+        self.assertNotIn("attendance_attendance_y2025m09", plan)
+        self.assertNotIn("attendance_attendance_default", plan)
@@ -0,0 +1,163 @@
+import csv
+import shutil
+import tempfile
+from datetime import date
+from itertools import islice
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.test import override_settings
+from django.urls import reverse
+from freezegun import freeze_time
+from rest_framework import status
+
+from attendance.models import Attendance, ReportJob
+from attendance.utils.exports import iter_rows
+from attendance.utils.reports import build_report, get_timesheet_queryset
+from teams.models import Team
+from users.constants import UserGroupChoices
+from users.models import User
+from users.tests import BaseTestCase
+from users.tokens import RoleRefreshToken
+
+
+@freeze_time("2025-10-21 21:00:00")
+@override_settings(ATTENDANCE_EXPORT_CHUNK_SIZE=2)
+class ReportJobTests(BaseTestCase):
+    """Tests for the report jobs built in the background."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        for day in range(13, 18):
+            Attendance.objects.create(user=self.employee, day=date(2025, 10, day))
+        self.client.force_authenticate(user=self.admin)
+
+    def request_report(self, **data):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse("reports"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(len(callbacks), 1)
+        return ReportJob.objects.get(id=response.data["id"])
+
+    def test_report_is_built_then_downloaded(self):
+        """A report is enqueued, built by chunks then downloaded"""
+
+        job = self.request_report(start="2025-10-01", end="2025-10-31")
+        self.assertEqual(job.status, "pending")
+        self.assertEqual(job.parameters, {"start": "2025-10-01", "end": "2025-10-31"})
+
+        self.assertEqual(build_report(job.id), "succeeded")
+
+        response = self.client.get(reverse("report", args=[job.id]))
+        self.assertEqual(response.data["status"], "succeeded")
+        self.assertEqual(response.data["rows_total"], 5)
+        self.assertEqual(response.data["rows_written"], 5)
+        self.assertEqual(response.data["progress"], 100.0)
+
+        response = self.client.get(reverse("report_download", args=[job.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(
+            csv.DictReader(b"".join(response.streaming_content).decode().splitlines())
+        )
+        self.assertEqual([row["day"] for row in rows][:2], ["2025-10-13", "2025-10-14"])
+        self.assertEqual(len(rows), 5)
+
+    def test_team_timesheets(self):
+        """Timesheets have a row per team, month and member"""
+
+        team = Team.objects.create(name="Team A")
+        team.members.add(self.employee)
+
+        job = self.request_report(kind="team_timesheets", start="2025-10-21")
+        build_report(job.id)
+        job.refresh_from_db()
+
+        with job.file.open("r") as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(
+            [(row["team"], row["month"], row["email"], row["days"]) for row in rows],
+            [("Team A", "2025-10-01", "employee@example.com", "5")],
+        )
+
+    def test_team_timesheets_of_a_member_of_two_teams(self):
+        """A team timesheet only has the rows of that team"""
+
+        team = Team.objects.create(name="Team A")
+        other = Team.objects.create(name="Team B")
+        self.employee.teams.add(team, other)
+
+        queryset = get_timesheet_queryset(
+            date(2025, 10, 1), date(2025, 10, 31), team=team
+        )
+
+        self.assertEqual(
+            list(queryset.values_list("user__teams__name", "user__email", "days")),
+            [("Team A", "employee@example.com", 5)],
+        )
+
+    def test_cancelled_job_stops_after_its_chunk(self):
+        """A cancellation is noticed after the current chunk"""
+
+        job = self.request_report()
+
+        def cancelled_after_first_chunk(queryset, columns):
+            rows = iter_rows(queryset, columns)
+            yield from islice(rows, 2)
+            self.client.post(reverse("report_cancel", args=[job.id]))
+            yield from rows
+
+        with mock.patch(
+            "attendance.utils.reports.iter_rows", cancelled_after_first_chunk
+        ):
+            self.assertEqual(build_report(job.id), "cancelled")
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "cancelled")
+        self.assertEqual(job.rows_written, 2)
+        self.assertFalse(job.file)
+
+        response = self.client.get(reverse("report_download", args=[job.id]))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        response = self.client.post(reverse("report_cancel", args=[job.id]))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_jobs_are_private(self):
+        """Jobs are only visible to their creator, who must be a company admin"""
+
+        job = self.request_report()
+
+        self.client.force_authenticate(user=self.manager)
+        response = self.client.get(reverse("report", args=[job.id]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        other_admin = User.objects.create_user(
+            email="other.admin@example.com", password="pass", is_active=True
+        )
+        other_admin.groups.add(Group.objects.get(name=UserGroupChoices.COMPANY_ADMIN))
+        self.client.force_authenticate(user=other_admin)
+        response = self.client.get(reverse("report", args=[job.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_jobs_with_a_login_token(self):
+        """Jobs are requested and polled with the access token of the login"""
+
+        token = RoleRefreshToken.for_user(self.admin).access_token
+        self.client.force_authenticate(user=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        job = self.request_report(start="2025-10-01", end="2025-10-31")
+        self.assertEqual(job.created_by, self.admin)
+
+        response = self.client.get(reverse("report", args=[job.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "pending")
+
+        response = self.client.post(reverse("report_cancel", args=[job.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "cancelled")
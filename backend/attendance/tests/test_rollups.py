@@ -0,0 +1,180 @@
+from datetime import date, datetime
+from datetime import timezone as dt_timezone
+
+from django.urls import reverse
+from freezegun import freeze_time
+from rest_framework import status
+
+from attendance.constants import PeriodicityChoices
+from attendance.models import Attendance, AttendanceRollup
+from attendance.utils.kpi_helpers import get_period_bounds
+from attendance.utils.rollups import rebuild_rollups, refresh_rollups
+from users.tests import BaseTestCase
+
+
+def get_rollups(user):
+    return {
+        rollup.periodicity: rollup
+        for rollup in AttendanceRollup.objects.filter(user=user)
+    }
+
+
+@freeze_time("2025-10-21 09:30:00")
+class AttendanceRollupTests(BaseTestCase):
+    """Tests for the incremental maintenance of the attendance rollups."""
+
+    def test_clock_updates_rollups(self):
+        """A check-in refreshes the rollups of its day, week, month and year"""
+
+        self.client.force_authenticate(user=self.employee)
+        response = self.client.post(
+            reverse("clocks"), {"is_check_in_action": True}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        rollups = get_rollups(self.employee)
+        self.assertEqual(
+            {p: r.period_start for p, r in rollups.items()},
+            {
+                PeriodicityChoices.DAILY: date(2025, 10, 21),
+                PeriodicityChoices.WEEKLY: date(2025, 10, 20),
+                PeriodicityChoices.MONTHLY: date(2025, 10, 1),
+                PeriodicityChoices.YEARLY: date(2025, 1, 1),
+            },
+        )
+        for rollup in rollups.values():
+            self.assertEqual(rollup.days, 1)
+            self.assertEqual(rollup.delayed_days, 1)
+            self.assertEqual(rollup.delay_seconds, 1800)
+            self.assertEqual(rollup.absent_days, 0)
+
+    def test_excuse_updates_rollups(self):
+        """Excusing an absence is reflected in the rollups"""
+
+        attendance = Attendance.objects.create(
+            user=self.employee, day=date(2025, 10, 20)
+        )
+        self.assertEqual(get_rollups(self.employee)["monthly"].absent_days, 1)
+
+        attendance.is_excused = True
+        attendance.excuse_reason = "Sick leave"
+        attendance.save()
+
+        self.assertEqual(get_rollups(self.employee)["monthly"].absent_days, 0)
+        self.assertEqual(get_rollups(self.employee)["monthly"].days, 1)
+
+    def test_deleted_attendance_removes_empty_rollups(self):
+        """Periods left without attendances have no rollup"""
+
+        Attendance.objects.create(user=self.employee, day=date(2025, 10, 20))
+        attendance = Attendance.objects.create(
+            user=self.employee, day=date(2025, 9, 30)
+        )
+
+        attendance.delete()
+
+        rollups = AttendanceRollup.objects.filter(user=self.employee)
+        self.assertFalse(rollups.filter(period_start=date(2025, 9, 1)).exists())
+        self.assertEqual(rollups.get(periodicity="yearly").days, 1)
+        # Monday 2025-09-29 to Sunday 2025-10-05
+        self.assertFalse(rollups.filter(period_start=date(2025, 9, 29)).exists())
+
+    def test_moved_attendance_updates_both_rollups(self):
+        """Moving an attendance to another day or user updates both rollups"""
+
+        Attendance.objects.create(user=self.employee, day=date(2025, 9, 30))
+
+        attendance = Attendance.objects.get(user=self.employee)
+        attendance.day = date(2025, 10, 20)
+        attendance.save()
+
+        rollups = AttendanceRollup.objects.filter(user=self.employee)
+        self.assertEqual(
+            sorted(rollups.values_list("periodicity", "period_start", "days")),
+            [
+                (PeriodicityChoices.DAILY, date(2025, 10, 20), 1),
+                (PeriodicityChoices.MONTHLY, date(2025, 10, 1), 1),
+                (PeriodicityChoices.WEEKLY, date(2025, 10, 20), 1),
+                (PeriodicityChoices.YEARLY, date(2025, 1, 1), 1),
+            ],
+        )
+
+        attendance.user = self.manager
+        attendance.save()
+
+        self.assertFalse(AttendanceRollup.objects.filter(user=self.employee).exists())
+        self.assertEqual(get_rollups(self.manager)["monthly"].days, 1)
+
+    def test_refresh_costs_five_queries(self):
+        """Only the changed days are read, then the rollups are upserted"""
+
+        Attendance.objects.bulk_create(
+            [
+                Attendance(user=user, day=date(2025, 10, 21))
+                for user in (self.employee, self.manager)
+            ]
+        )
+
+        # Lock, totals of the days, their daily rollups, upsert, team
+        # memberships for the leaderboards
+        with self.assertNumQueries(5):
+            refresh_rollups(
+                [
+                    (self.employee.id, date(2025, 10, 21)),
+                    (self.manager.id, date(2025, 10, 21)),
+                ]
+            )
+
+        self.assertEqual(AttendanceRollup.objects.count(), 8)
+
+    def test_refresh_applies_the_changes_of_the_day(self):
+        """Other days of the periods are not read again"""
+
+        Attendance.objects.create(user=self.employee, day=date(2025, 10, 20))
+        # Written without the signals: not counted until refreshed
+        Attendance.objects.bulk_create(
+            [Attendance(user=self.employee, day=date(2025, 10, 14))]
+        )
+        Attendance.objects.filter(day=date(2025, 10, 20)).update(
+            check_in=datetime(2025, 10, 20, 9, 30, tzinfo=dt_timezone.utc)
+        )
+
+        refresh_rollups([(self.employee.id, date(2025, 10, 20))])
+
+        monthly = get_rollups(self.employee)["monthly"]
+        self.assertEqual((monthly.days, monthly.absent_days), (1, 0))
+        self.assertEqual(monthly.delay_seconds, 1800)
+
+    def test_rebuild_matches_incremental_rollups(self):
+        """A rebuild recomputes the same rollups"""
+
+        for day in (date(2025, 10, 1), date(2025, 10, 20), date(2024, 12, 31)):
+            Attendance.objects.create(user=self.employee, day=day)
+        incremental = sorted(
+            AttendanceRollup.objects.values_list("periodicity", "period_start", "days")
+        )
+
+        self.assertEqual(rebuild_rollups(), len(incremental))
+        self.assertEqual(
+            sorted(
+                AttendanceRollup.objects.values_list(
+                    "periodicity", "period_start", "days"
+                )
+            ),
+            incremental,
+        )
+
+    def test_period_bounds(self):
+        """Weeks start on Monday, months and years on their first day"""
+
+        day = date(2024, 2, 14)
+        self.assertEqual(get_period_bounds("daily", day), (day, day))
+        self.assertEqual(
+            get_period_bounds("weekly", day), (date(2024, 2, 12), date(2024, 2, 18))
+        )
+        self.assertEqual(
+            get_period_bounds("monthly", day), (date(2024, 2, 1), date(2024, 2, 29))
+        )
+        self.assertEqual(
+            get_period_bounds("yearly", day), (date(2024, 1, 1), date(2024, 12, 31))
+        )
@@ -0,0 +1,176 @@
+import os
+import shutil
+import tempfile
+from datetime import date
+
+from django.test import TestCase, override_settings
+from freezegun import freeze_time
+
+from attendance.models import Attendance
+from attendance.tasks import export_attendance_snapshots
+from attendance.tests import clock
+from attendance.utils import snapshots
+from attendance.utils.kpi_helpers import (
+    compute_user_kpis,
+    compute_users_kpis,
+    get_best_performers,
+    get_snapshot_until,
+)
+from users.models import User
+
+
+@freeze_time("2025-10-21 21:00:00")
+class AttendanceSnapshotTests(TestCase):
+    """Tests for the columnar snapshots of the closed days."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        enabled = override_settings(ATTENDANCE_SNAPSHOT_DIR=self.directory)
+        enabled.enable()
+        self.addCleanup(enabled.disable)
+
+        self.user = User.objects.create_user(
+            email="user@example.com", password="pass", is_active=True
+        )
+        self.other = User.objects.create_user(
+            email="other@example.com", password="pass", is_active=True
+        )
+        clock(self.user, date(2025, 8, 4), 9.5, 19)
+        clock(self.user, date(2025, 8, 5), 8.75, 17)
+        clock(self.user, date(2025, 8, 6))
+        clock(self.user, date(2025, 8, 7), is_excused=True)
+        clock(self.other, date(2025, 8, 4), 9, 20)
+        clock(self.other, date(2025, 8, 5), 10)
+
+    def test_closed_days_are_exported(self):
+        """Days closed for ATTENDANCE_SNAPSHOT_CLOSED_AFTER_DAYS are exported"""
+
+        self.assertEqual(get_snapshot_until(), date(2025, 9, 6))
+        self.assertEqual(
+            export_attendance_snapshots.apply().get(),
+            "Attendance snapshots exported: 6",
+        )
+
+        manifest = snapshots.read_manifest()
+        self.assertEqual(manifest["closed_until"], "2025-09-06")
+        self.assertEqual(len(manifest["segments"]), 1)
+        self.assertEqual(
+            sorted(
+                os.listdir(
+                    os.path.join(self.directory, "segments", manifest["segments"][0])
+                )
+            ),
+            ["check_in.npy", "check_out.npy", "day.npy", "is_excused.npy", "user.npy"],
+        )
+
+    def test_snapshots_are_append_only(self):
+        """New closed days are appended as a new segment"""
+
+        snapshots.export_snapshots(date(2025, 8, 4))
+        users = snapshots.read_manifest()["users"]
+
+        self.assertEqual(snapshots.export_snapshots(date(2025, 8, 31)), 4)
+        self.assertEqual(snapshots.export_snapshots(date(2025, 8, 31)), 0)
+
+        manifest = snapshots.read_manifest()
+        self.assertEqual(manifest["users"], users)
+        self.assertEqual(
+            [name.rsplit("_", 1)[0] for name in manifest["segments"]],
+            ["2025-08-04_2025-08-04", "2025-08-05_2025-08-31"],
+        )
+
+    def test_kpis_match_the_rollups(self):
+        """KPIs of closed ranges are computed from the snapshots, without queries"""
+
+        start, end = date(2025, 8, 1), date(2025, 8, 31)
+        expected = compute_users_kpis([self.user.id, self.other.id], start, end)
+        expected_best = get_best_performers(start, end, count=2)
+        snapshots.export_snapshots(date(2025, 9, 6))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                {"user": self.user.id, **compute_user_kpis(self.user, start, end)},
+                expected[0],
+            )
+            self.assertEqual(
+                compute_users_kpis([self.user.id, self.other.id], start, end),
+                expected,
+            )
+            self.assertEqual(get_best_performers(start, end, count=2), expected_best)
+
+        # Ranges that are not closed yet are computed from the rollups
+        with self.assertNumQueries(1):
+            compute_user_kpis(self.user, start, date(2025, 10, 21))
+
+    def test_rebuild_reflects_corrections(self):
+        """Corrections of snapshotted days are exported by a rebuild"""
+
+        start, end = date(2025, 8, 1), date(2025, 8, 31)
+        snapshots.export_snapshots(date(2025, 9, 6))
+
+        Attendance.objects.filter(user=self.user, day=date(2025, 8, 6)).update(
+            is_excused=True
+        )
+        self.assertEqual(
+            compute_user_kpis(self.user, start, end)["absences"], {"total": 1}
+        )
+
+        snapshots.rebuild_snapshots(date(2025, 9, 6))
+        self.assertEqual(
+            compute_user_kpis(self.user, start, end)["absences"], {"total": 0}
+        )
+        self.assertEqual(len(snapshots.read_manifest()["segments"]), 1)
+
+    def test_changed_months_are_not_served_until_rebuilt(self):
+        """Months of changed snapshotted days are computed from the rollups"""
+
+        start, end = date(2025, 8, 1), date(2025, 8, 31)
+        snapshots.export_snapshots(date(2025, 9, 6))
+
+        attendance = Attendance.objects.get(user=self.user, day=date(2025, 8, 6))
+        attendance.is_excused = True
+        attendance.save()
+
+        self.assertIsNone(snapshots.get_snapshot(start, end))
+        self.assertIsNotNone(snapshots.get_snapshot(date(2025, 9, 1), date(2025, 9, 6)))
+        self.assertEqual(
+            compute_user_kpis(self.user, start, end)["absences"], {"total": 0}
+        )
+
+        # The next export rebuilds the snapshots
+        self.assertEqual(
+            export_attendance_snapshots.apply().get(),
+            "Attendance snapshots exported: 6",
+        )
+        self.assertIsNotNone(snapshots.get_snapshot(start, end))
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                compute_user_kpis(self.user, start, end)["absences"], {"total": 0}
+            )
+
+    def test_rebuild_keeps_the_previous_generation(self):
+        """Segments are removed one rebuild after being replaced"""
+
+        snapshots.export_snapshots(date(2025, 8, 4))
+        snapshots.export_snapshots(date(2025, 8, 31))
+        first = snapshots.read_manifest()["segments"]
+
+        snapshots.rebuild_snapshots(date(2025, 8, 31))
+        second = snapshots.read_manifest()["segments"]
+        segments_dir = os.path.join(self.directory, "segments")
+        self.assertEqual(sorted(os.listdir(segments_dir)), sorted(first + second))
+
+        snapshots.rebuild_snapshots(date(2025, 8, 31))
+        third = snapshots.read_manifest()["segments"]
+        self.assertEqual(sorted(os.listdir(segments_dir)), sorted(second + third))
+
+    @override_settings(ATTENDANCE_SNAPSHOT_DIR="")
+    def test_snapshots_can_be_disabled(self):
+        """Without ATTENDANCE_SNAPSHOT_DIR, KPIs are computed from the rollups"""
+
+        self.assertEqual(
+            export_attendance_snapshots.apply().get(),
+            "Attendance snapshots are disabled",
+        )
+        self.assertIsNone(snapshots.get_snapshot(date(2025, 8, 1), date(2025, 8, 31)))
@@ -2,11 +2,21 @@ from django.urls import path
 from rest_framework.routers import DefaultRouter
 from .views import (
     AttendanceClocksView,
+    AttendanceClocksSyncView,
     AttendanceViewSet,
+    AttendanceExportView,
+    ReportJobCreateView,
+    ReportJobView,
+    ReportJobCancelView,
+    ReportJobDownloadView,
     UserKPIsView,
+    UsersKPIsView,
     UserWorkHoursView,
+    UserStandingView,
     BestPerformersView,
+    BestPerformerRankView,
     TeamKPIsView,
+    TeamsKPIsView,
     TeamBestPerformersView,
 )
 
@@ -17,14 +27,43 @@ urlpatterns = [
     # NOTE : do not expose attendance CRUD endpoints
     # path("", include(router.urls)),
     path("clocks/", AttendanceClocksView.as_view(), name="clocks"),
+    path("clocks/sync/", AttendanceClocksSyncView.as_view(), name="clocks_sync"),
+    path(
+        "attendance/export/", AttendanceExportView.as_view(), name="attendance_export"
+    ),
+    # Reports
+    path("reports/", ReportJobCreateView.as_view(), name="reports"),
+    path("reports/<str:job_id>/", ReportJobView.as_view(), name="report"),
+    path(
+        "reports/<str:job_id>/cancel/",
+        ReportJobCancelView.as_view(),
+        name="report_cancel",
+    ),
+    path(
+        "reports/<str:job_id>/download/",
+        ReportJobDownloadView.as_view(),
+        name="report_download",
+    ),
     # KPIS
+    path("kpis/users/", UsersKPIsView.as_view(), name="users_kpis"),
     path("kpis/users/<str:user_id>/", UserKPIsView.as_view(), name="user_kpis"),
     path(
         "kpis/workhours/<str:user_id>/",
         UserWorkHoursView.as_view(),
         name="user_workhours",
     ),
+    path(
+        "kpis/standing/<str:user_id>/",
+        UserStandingView.as_view(),
+        name="user_standing",
+    ),
     path("kpis/best-performers/", BestPerformersView.as_view(), name="best_performers"),
+    path(
+        "kpis/best-performers/me/",
+        BestPerformerRankView.as_view(),
+        name="best_performer_rank",
+    ),
+    path("kpis/teams/", TeamsKPIsView.as_view(), name="teams_kpis"),
     path("kpis/teams/<str:team_id>/", TeamKPIsView.as_view(), name="team_kpis"),
     path(
         "kpis/teams/<str:team_id>/best-performers/",
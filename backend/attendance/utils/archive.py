@@ -0,0 +1,290 @@
+# attendance/utils/archive.py
+import json
+import zlib
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Min
+
+from attendance.constants import AttendanceStatusChoices
+from attendance.models import Attendance, AttendanceArchive, expected_work_seconds
+from attendance.utils.kpi_helpers import get_company_today, get_period_bounds
+from attendance.utils.partitions import (
+    INSERT_COLUMNS,
+    add_months,
+    create_partitions,
+    get_partition_name,
+)
+
+# Fields of the packed rows, in the order of the INSERT_COLUMNS of the table
+ARCHIVE_FIELDS = [
+    "id",
+    "created_at",
+    "updated_at",
+    "user_id",
+    "day",
+    "check_in",
+    "check_out",
+    "is_excused",
+    "excuse_reason",
+]
+DATETIME_FIELDS = ("created_at", "updated_at", "check_in", "check_out")
+USER_INDEX = ARCHIVE_FIELDS.index("user_id")
+DAY_INDEX = ARCHIVE_FIELDS.index("day")
+
+
+def get_hot_start(today=None) -> date:
+    """
+    Returns the first day of the hot window: the attendances of the
+    ATTENDANCE_HOT_YEARS last years (the current one included) stay in the
+    attendance table, the older ones are archived.
+    """
+    today = today or get_company_today()
+    return date(today.year - settings.ATTENDANCE_HOT_YEARS + 1, 1, 1)
+
+
+def get_archived_until():
+    """Returns the last day of the last archived month (None without archives)."""
+    month = AttendanceArchive.objects.aggregate(Max("month"))["month__max"]
+    return add_months(month, 1) - timedelta(days=1) if month else None
+
+
+def pack(rows) -> bytes:
+    """Packs the rows as compressed JSON arrays (without field names)."""
+    data = json.dumps(
+        [list(row) for row in rows],
+        separators=(",", ":"),
+        default=lambda value: value.isoformat(),
+    )
+    return zlib.compress(data.encode(), level=9)
+
+
+def unpack(data) -> list:
+    """Returns the rows of packed data, with their dates and datetimes parsed."""
+    indexes = [ARCHIVE_FIELDS.index(field) for field in DATETIME_FIELDS]
+    rows = json.loads(zlib.decompress(data))
+    for row in rows:
+        for index in indexes:
+            if row[index] is not None:
+                row[index] = datetime.fromisoformat(row[index])
+        row[DAY_INDEX] = date.fromisoformat(row[DAY_INDEX])
+    return [tuple(row) for row in rows]
+
+
+def _to_attendance(row) -> Attendance:
+    # Unsaved attendance, with the values of the generated columns (same
+    # expressions as the Attendance model)
+    attendance = Attendance(**dict(zip(ARCHIVE_FIELDS, row)))
+    check_in, check_out = attendance.check_in, attendance.check_out
+    attendance.worked_seconds = (
+        (check_out - check_in).total_seconds() if check_in and check_out else 0.0
+    )
+    attendance.check_in_seconds = None
+    if check_in:
+        time = check_in.astimezone(dt_timezone.utc).time()
+        attendance.check_in_seconds = (
+            time.hour * 3600 + time.minute * 60 + time.second + time.microsecond / 1e6
+        )
+    return attendance
+
+
+def get_kpis(attendance: Attendance) -> dict:
+    """
+    Returns the status, worked_seconds, extra_seconds and delay_seconds of
+    an archived attendance, as annotated by AttendanceQuerySet.
+    """
+    if attendance.is_excused:
+        status = AttendanceStatusChoices.EXCUSED.value
+    elif attendance.check_in:
+        status = AttendanceStatusChoices.PRESENT.value
+    else:
+        status = AttendanceStatusChoices.ABSENT.value
+
+    delay_seconds = 0.0
+    if attendance.check_in_seconds is not None:
+        delay_seconds = attendance.check_in_seconds - settings.CHECK_IN_HOUR * 3600
+
+    return {
+        "status": status,
+        "worked_seconds": attendance.worked_seconds,
+        "extra_seconds": attendance.worked_seconds - expected_work_seconds(),
+        "delay_seconds": delay_seconds,
+    }
+
+
+def iter_archived(start, end, user_ids=None):
+    """
+    Yields the archived attendances from `start` to `end` (of the given
+    users) month by month, as lists of unsaved attendances ordered by day
+    and user. Only one month is decompressed at a time.
+    """
+    archives = AttendanceArchive.objects.filter(
+        month__range=(start.replace(day=1), end)
+    ).order_by("month")
+
+    for archive in archives.iterator(chunk_size=1):
+        yield [
+            _to_attendance(row)
+            for row in unpack(archive.data)
+            if start <= row[DAY_INDEX] <= end
+            and (user_ids is None or row[USER_INDEX] in user_ids)
+        ]
+
+
+def get_archived_totals(periods) -> dict:
+    """
+    Returns {(user_id, periodicity, period_start): totals} of the archived
+    attendances of the given (user_id, periodicity, period_start) periods,
+    the totals having the fields of the rollups and the definitions of
+    AttendanceQuerySet.rollup_totals.
+    """
+    archived_until = get_archived_until()
+    periods = {
+        period for period in periods if archived_until and period[2] <= archived_until
+    }
+    if not periods:
+        return {}
+
+    start = min(period_start for _, _, period_start in periods)
+    end = min(
+        archived_until,
+        max(get_period_bounds(periodicity, day)[1] for _, periodicity, day in periods),
+    )
+    periodicities = {periodicity for _, periodicity, _ in periods}
+
+    totals = {}
+    for attendances in iter_archived(
+        start, end, {user_id for user_id, _, _ in periods}
+    ):
+        for attendance in attendances:
+            kpis = get_kpis(attendance)
+            is_delayed = kpis["delay_seconds"] > 0
+            has_extra_time = kpis["extra_seconds"] > 0
+
+            for periodicity in periodicities:
+                key = (
+                    attendance.user_id,
+                    periodicity,
+                    get_period_bounds(periodicity, attendance.day)[0],
+                )
+                if key not in periods:
+                    continue
+
+                total = totals.setdefault(
+                    key,
+                    {
+                        "days": 0,
+                        "delayed_days": 0,
+                        "extra_days": 0,
+                        "absent_days": 0,
+                        "worked_seconds": 0.0,
+                        "delay_seconds": 0.0,
+                        "extra_seconds": 0.0,
+                    },
+                )
+                total["days"] += 1
+                total["delayed_days"] += is_delayed
+                total["extra_days"] += has_extra_time
+                total["absent_days"] += (
+                    kpis["status"] == AttendanceStatusChoices.ABSENT.value
+                )
+                total["worked_seconds"] += kpis["worked_seconds"]
+                if is_delayed:
+                    total["delay_seconds"] += kpis["delay_seconds"]
+                if has_extra_time:
+                    total["extra_seconds"] += kpis["extra_seconds"]
+
+    return totals
+
+
+def archive_month(month: date) -> int:
+    """
+    Moves the attendances of the month from the attendance table to its
+    archive (merged with the already archived ones), then drops the
+    partition of the month. Returns the number of attendances moved.
+
+    The attendances are deleted with SQL, without the post_delete signals:
+    the rollups of the archived attendances are kept.
+    """
+    table = Attendance._meta.db_table
+    bounds = [month, add_months(month, 1) - timedelta(days=1)]
+
+    with transaction.atomic():
+        rows = list(
+            Attendance.objects.filter(day__range=bounds)
+            .order_by("day", "user_id")
+            .values_list(*ARCHIVE_FIELDS)
+        )
+        moved = len(rows)
+        if rows:
+            archive, created = (
+                AttendanceArchive.objects.select_for_update().get_or_create(
+                    month=month, defaults={"data": b""}
+                )
+            )
+            if not created:
+                rows = sorted(
+                    [*unpack(archive.data), *rows],
+                    key=lambda row: (row[DAY_INDEX], row[USER_INDEX]),
+                )
+            archive.data = pack(rows)
+            archive.rows = len(rows)
+            archive.save()
+
+        # Runs the pending (deferred) foreign key checks, which would
+        # prevent dropping the partition
+        connection.check_constraints()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {get_partition_name(month)}")
+            # Attendances of the month stored in the default partition
+            cursor.execute(f"DELETE FROM {table} WHERE day BETWEEN %s AND %s", bounds)
+
+    return moved
+
+
+def archive_attendance(before: date) -> int:
+    """
+    Archives the attendances of the months before `before` (see
+    archive_month). Returns the number of attendances archived.
+    """
+    first_day = Attendance.objects.filter(day__lt=before).aggregate(Min("day"))[
+        "day__min"
+    ]
+    if first_day is None:
+        return 0
+
+    archived = 0
+    month = first_day.replace(day=1)
+    while month < before:
+        archived += archive_month(month)
+        month = add_months(month, 1)
+    return archived
+
+
+def restore_attendance(start, end) -> int:
+    """
+    Moves the archived attendances of the months from `start` to `end` back
+    to the attendance table (their rollups are unchanged). Returns the
+    number of attendances restored.
+    """
+    table = Attendance._meta.db_table
+    placeholders = ", ".join(["%s"] * len(ARCHIVE_FIELDS))
+    restored = 0
+
+    archives = AttendanceArchive.objects.filter(
+        month__range=(start.replace(day=1), end)
+    ).order_by("month")
+    for archive in archives:
+        with transaction.atomic():
+            create_partitions(archive.month, 1)
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT INTO {table} ({INSERT_COLUMNS}) VALUES ({placeholders})",
+                    unpack(archive.data),
+                )
+            archive.delete()
+        restored += archive.rows
+
+    return restored
@@ -1,22 +1,94 @@
-import math
+import numpy as np
+
+EARTH_RADIUS_M = 6371000
 
 
 def get_distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculates the Haversine distance between two points on the Earth."""
+    """
+    Calculates the Haversine distance between two points on the Earth.
+
+    Computed by get_distances_m, so that batch and single validations give
+    the same distances to the last bit (NumPy's arctan2 differs from
+    math.atan2 in the last bit, which can flip a radius comparison).
+    """
 
     if not (lat1 and lon1 and lat2 and lon2):
         return 0
 
-    R = 6371000  # Earth radius on meters
+    return float(get_distances_m(lat1, lon1, lat2, lon2))
+
+
+def get_distances_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Vectorized get_distance_m: the arguments are arrays (or scalars) of
+    coordinates, broadcast against each other with NumPy rules.
+
+    Distances are 0 whenever one of the coordinates is missing (0).
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(
+        *(np.asarray(values, dtype=np.float64) for values in (lat1, lon1, lat2, lon2))
+    )
+
+    R = EARTH_RADIUS_M  # Earth radius on meters
 
     # Convert degrees in radians
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    d_phi = math.radians(lat2 - lat1)
-    d_lambda = math.radians(lon2 - lon1)
-
-    # Apply Haversine formula
-    a = (
-        math.sin(d_phi / 2) ** 2
-        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    d_phi = np.radians(lat2 - lat1)
+    d_lambda = np.radians(lon2 - lon1)
+
+    # Apply Haversine formula (np.square: ** 2 is pow() on NumPy scalars,
+    # which can differ in the last bit)
+    a = np.square(np.sin(d_phi / 2)) + np.cos(phi1) * np.cos(phi2) * np.square(
+        np.sin(d_lambda / 2)
+    )
+    distances = R * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    # Same short-circuit as get_distance_m (falsy coordinates)
+    missing = (lat1 == 0) | (lon1 == 0) | (lat2 == 0) | (lon2 == 0)
+    return np.where(missing, 0.0, distances)
+
+
+def get_distance_matrix_m(points, sites) -> np.ndarray:
+    """
+    Returns the (len(points), len(sites)) matrix of distances between
+    `points` and `sites`, both sequences of (latitude, longitude).
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    sites = np.asarray(sites, dtype=np.float64).reshape(-1, 2)
+
+    return get_distances_m(
+        points[:, 0, np.newaxis],
+        points[:, 1, np.newaxis],
+        sites[np.newaxis, :, 0],
+        sites[np.newaxis, :, 1],
     )
-    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def get_nearest_sites(points, sites, radii=None, mask=None):
+    """
+    Returns (indices, distances): for each point, the index of its nearest
+    site and the distance to it.
+
+    - radii: radius of each site, sites farther than their radius are ignored
+    - mask: boolean (len(points), len(sites)) matrix of the sites to consider
+
+    Points without any eligible site get the index -1 and an infinite distance.
+    """
+    distances = get_distance_matrix_m(points, sites)
+
+    eligible = np.ones(distances.shape, dtype=bool)
+    if radii is not None:
+        eligible &= distances <= np.asarray(radii, dtype=np.float64)[np.newaxis, :]
+    if mask is not None:
+        eligible &= np.asarray(mask, dtype=bool)
+
+    distances = np.where(eligible, distances, np.inf)
+    if not distances.shape[1]:
+        return (
+            np.full(distances.shape[0], -1),
+            np.full(distances.shape[0], np.inf),
+        )
+
+    indices = distances.argmin(axis=1)
+    nearest = distances[np.arange(len(indices)), indices]
+    return np.where(np.isinf(nearest), -1, indices), nearest
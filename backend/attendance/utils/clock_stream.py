@@ -0,0 +1,230 @@
+# attendance/utils/clock_stream.py
+import logging
+import os
+import socket
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from itertools import count
+
+from django.conf import settings
+from django.db import transaction
+
+from attendance.models import Attendance
+from attendance.utils.rollups import refresh_rollups
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_GROUP = "attendance-persisters"
+# Entries delivered to a consumer that did not ack them within this delay
+# (crashed worker) are claimed by the next consumer.
+CLAIM_MIN_IDLE_MS = 60_000
+
+
+def get_dead_letter_name(name: str) -> str:
+    """
+    Name of the stream receiving the entries delivered more than
+    ATTENDANCE_CLOCK_STREAM_MAX_DELIVERIES times (failing batches).
+    """
+    return f"{name}:dead"
+
+
+class MemoryClockStream:
+    """In-process stream, used by tests and local development."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._deliveries = {}
+        self.dead_letters = OrderedDict()
+        self._ids = count(1)
+        self._lock = threading.Lock()
+
+    def append(self, fields: dict) -> str:
+        with self._lock:
+            entry_id = f"{next(self._ids)}-0"
+            self._entries[entry_id] = dict(fields)
+            return entry_id
+
+    def read(self, batch_size: int):
+        with self._lock:
+            for entry_id in list(self._entries):
+                if (
+                    self._deliveries.get(entry_id, 0)
+                    >= settings.ATTENDANCE_CLOCK_STREAM_MAX_DELIVERIES
+                ):
+                    self.dead_letters[entry_id] = self._entries.pop(entry_id)
+
+            entries = list(self._entries.items())[:batch_size]
+            for entry_id, _ in entries:
+                self._deliveries[entry_id] = self._deliveries.get(entry_id, 0) + 1
+            return entries
+
+    def ack(self, entry_ids):
+        with self._lock:
+            for entry_id in entry_ids:
+                self._entries.pop(entry_id, None)
+                self._deliveries.pop(entry_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisClockStream:
+    """Redis stream read through a consumer group (at-least-once delivery)."""
+
+    def __init__(self, url: str, name: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.name = name
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._group_ready = False
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+
+        import redis
+
+        try:
+            self.client.xgroup_create(self.name, CONSUMER_GROUP, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    def append(self, fields: dict) -> str:
+        return self.client.xadd(self.name, fields)
+
+    def _dead_letter(self, batch_size: int):
+        # Pending entries delivered too many times are moved to the
+        # dead-letter stream instead of being claimed again
+        pending = self.client.xpending_range(
+            self.name,
+            CONSUMER_GROUP,
+            min="-",
+            max="+",
+            count=batch_size,
+            idle=CLAIM_MIN_IDLE_MS,
+        )
+        entry_ids = [
+            entry["message_id"]
+            for entry in pending
+            if entry["times_delivered"]
+            >= settings.ATTENDANCE_CLOCK_STREAM_MAX_DELIVERIES
+        ]
+        if not entry_ids:
+            return
+
+        pipeline = self.client.pipeline()
+        for entry_id in entry_ids:
+            for _, fields in self.client.xrange(self.name, entry_id, entry_id):
+                pipeline.xadd(get_dead_letter_name(self.name), fields)
+        pipeline.xack(self.name, CONSUMER_GROUP, *entry_ids)
+        pipeline.xdel(self.name, *entry_ids)
+        pipeline.execute()
+        logger.error(
+            f"{len(entry_ids)} clock events moved to "
+            f"{get_dead_letter_name(self.name)} after repeated failures"
+        )
+
+    def read(self, batch_size: int):
+        self._ensure_group()
+        self._dead_letter(batch_size)
+
+        _, entries, *_ = self.client.xautoclaim(
+            self.name,
+            CONSUMER_GROUP,
+            self.consumer,
+            min_idle_time=CLAIM_MIN_IDLE_MS,
+            count=batch_size,
+        )
+        if len(entries) < batch_size:
+            for _, new_entries in self.client.xreadgroup(
+                CONSUMER_GROUP,
+                self.consumer,
+                {self.name: ">"},
+                count=batch_size - len(entries),
+            ):
+                entries += new_entries
+
+        return entries
+
+    def ack(self, entry_ids):
+        if not entry_ids:
+            return
+
+        pipeline = self.client.pipeline()
+        pipeline.xack(self.name, CONSUMER_GROUP, *entry_ids)
+        pipeline.xdel(self.name, *entry_ids)
+        pipeline.execute()
+
+    def __len__(self):
+        return self.client.xlen(self.name)
+
+
+_streams = {}
+
+
+def get_clock_stream():
+    """Returns the clock stream configured by ATTENDANCE_CLOCK_STREAM_URL."""
+    url = settings.ATTENDANCE_CLOCK_STREAM_URL
+    name = settings.ATTENDANCE_CLOCK_STREAM_NAME
+
+    if (url, name) not in _streams:
+        if url.startswith("memory://"):
+            _streams[(url, name)] = MemoryClockStream()
+        else:
+            _streams[(url, name)] = RedisClockStream(url, name)
+
+    return _streams[(url, name)]
+
+
+def publish_clock_event(user_id, day: date, is_check_in_action: bool, at: datetime):
+    """Appends a validated clock to the stream and returns its entry id."""
+    return get_clock_stream().append(
+        {
+            "user_id": str(user_id),
+            "day": day.isoformat(),
+            "is_check_in_action": "1" if is_check_in_action else "0",
+            "at": at.isoformat(),
+        }
+    )
+
+
+def _decode_event(fields: dict):
+    return (
+        fields["user_id"],
+        date.fromisoformat(fields["day"]),
+        fields["is_check_in_action"] == "1",
+        datetime.fromisoformat(fields["at"]),
+    )
+
+
+def persist_clock_events(batch_size: int | None = None) -> int:
+    """
+    Drains the clock stream into Attendance, one batch at a time.
+
+    The attendances and their rollups of a batch are written in a single
+    transaction, and the entries are acknowledged once it is committed: a
+    batch failing after its write is rolled back and delivered again.
+    """
+    stream = get_clock_stream()
+    batch_size = batch_size or settings.ATTENDANCE_CLOCK_STREAM_BATCH_SIZE
+    persisted = 0
+
+    while True:
+        entries = stream.read(batch_size)
+        if not entries:
+            return persisted
+
+        events = [_decode_event(fields) for _, fields in entries]
+        with transaction.atomic():
+            applied = Attendance.objects.bulk_record_clocks(events)
+            refresh_rollups((user_id, day) for user_id, day, _ in applied)
+        stream.ack([entry_id for entry_id, _ in entries])
+
+        persisted += len(entries)
+        ignored = len({event[:3] for event in events} - applied)
+        if ignored:
+            logger.info(f"{ignored} clock events ignored (already recorded)")
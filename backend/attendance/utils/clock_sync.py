@@ -0,0 +1,144 @@
+# attendance/utils/clock_sync.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from attendance.constants import ClockSyncStatusChoices as Status
+from attendance.models import Attendance
+from attendance.utils.geofencing import are_locations_allowed, get_allowed_site_ids
+from attendance.utils.rollups import refresh_rollups
+from users.models import User
+
+
+def _check_event(event, local_at, now):
+    """
+    Returns the status of an event that can be decided on its own
+    (hour window, timestamp not in the future nor older than
+    ATTENDANCE_CLOCK_SYNC_MAX_AGE), or None.
+    """
+    if event["timestamp"] > now:
+        return Status.FUTURE
+    if now - event["timestamp"] > timedelta(
+        seconds=settings.ATTENDANCE_CLOCK_SYNC_MAX_AGE
+    ):
+        return Status.TOO_OLD
+
+    if event["is_check_in_action"]:
+        start, end = settings.CHECK_IN_START_HOUR, settings.CHECK_IN_END_HOUR
+    else:
+        start, end = settings.CHECK_OUT_START_HOUR, settings.CHECK_OUT_END_HOUR
+    if not (start <= local_at.hour <= end):
+        return Status.OUT_OF_HOURS
+
+    return None
+
+
+def sync_clock_events(actor, events):
+    """
+    Validates and applies a batch of offline clock events in one transaction.
+
+    Each event is a dict with user_id, is_check_in_action, timestamp and
+    optionally latitude/longitude. Events are validated with the rules of
+    AttendanceClocksSerializer (locations with a single distance matrix
+    against the sites), replayed in timestamp order against the
+    current attendance rows (read once), then written with
+    Attendance.objects.bulk_record_clocks.
+
+    Returns the list of statuses (ClockSyncStatusChoices), in input order.
+    """
+    now = timezone.now()
+    statuses = [None] * len(events)
+    local_ats = [timezone.localtime(event["timestamp"]) for event in events]
+
+    user_ids = {str(event["user_id"]) for event in events}
+    active_user_ids = set(
+        User.objects.filter(id__in=user_ids, is_active=True).values_list(
+            "id", flat=True
+        )
+    )
+    allowed_site_ids = get_allowed_site_ids(active_user_ids)
+    can_clock_for_others = actor.is_manager_or_company_admin
+
+    for i, event in enumerate(events):
+        user_id = str(event["user_id"])
+        if user_id != str(actor.pk) and not can_clock_for_others:
+            statuses[i] = Status.FORBIDDEN
+        elif user_id not in active_user_ids:
+            statuses[i] = Status.UNKNOWN_USER
+        else:
+            statuses[i] = _check_event(event, local_ats[i], now)
+
+    # Geofence all the located events in one vectorized pass
+    located = [
+        i
+        for i, event in enumerate(events)
+        if statuses[i] is None
+        and event.get("latitude") is not None
+        and event.get("longitude") is not None
+    ]
+    if located:
+        allowed = are_locations_allowed(
+            [(events[i]["latitude"], events[i]["longitude"]) for i in located],
+            [allowed_site_ids.get(str(events[i]["user_id"])) for i in located],
+        )
+        for i, is_allowed in zip(located, allowed):
+            if not is_allowed:
+                statuses[i] = Status.TOO_FAR
+
+    candidates = sorted(
+        (i for i, status in enumerate(statuses) if status is None),
+        key=lambda i: events[i]["timestamp"],
+    )
+    if not candidates:
+        return statuses
+
+    with transaction.atomic():
+        # Lock the rows of the batch so that concurrent clocks wait for us
+        states = {
+            (a.user_id, a.day): [a.check_in, a.check_out]
+            for a in Attendance.objects.select_for_update().filter(
+                user_id__in={str(events[i]["user_id"]) for i in candidates},
+                day__in={local_ats[i].date() for i in candidates},
+            )
+        }
+
+        to_apply = []
+        for i in candidates:
+            event = events[i]
+            key = (str(event["user_id"]), local_ats[i].date())
+            check_in, check_out = states.setdefault(key, [None, None])
+
+            if event["is_check_in_action"]:
+                if check_in:
+                    statuses[i] = Status.DUPLICATE
+                    continue
+                states[key][0] = event["timestamp"]
+            else:
+                if not check_in:
+                    statuses[i] = Status.NO_CHECK_IN
+                    continue
+                if check_out:
+                    statuses[i] = Status.DUPLICATE
+                    continue
+                if event["timestamp"] < check_in:
+                    statuses[i] = Status.OUT_OF_ORDER
+                    continue
+                states[key][1] = event["timestamp"]
+
+            to_apply.append((i, key))
+
+        applied = Attendance.objects.bulk_record_clocks(
+            (*key, events[i]["is_check_in_action"], events[i]["timestamp"])
+            for i, key in to_apply
+        )
+        refresh_rollups((user_id, day) for user_id, day, _ in applied)
+
+    for i, key in to_apply:
+        if (*key, events[i]["is_check_in_action"]) in applied:
+            statuses[i] = Status.APPLIED
+        else:
+            statuses[i] = Status.DUPLICATE
+
+    return statuses
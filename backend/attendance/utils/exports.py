@@ -0,0 +1,115 @@
+# attendance/utils/exports.py
+import csv
+
+from django.conf import settings
+
+from attendance.models import Attendance
+from attendance.utils import archive
+from users.models import User
+
+# (header, queryset field) of the exported columns
+EXPORT_COLUMNS = [
+    ("user_id", "user_id"),
+    ("email", "user__email"),
+    ("day", "day"),
+    ("status", "status"),
+    ("check_in", "check_in"),
+    ("check_out", "check_out"),
+    ("is_excused", "is_excused"),
+    ("worked_seconds", "worked_seconds"),
+    ("extra_seconds", "extra_seconds"),
+    ("delay_seconds", "delay_seconds"),
+]
+
+
+class Echo:
+    """File-like object returning what is written, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def get_export_queryset(start, end, user=None, team=None):
+    """
+    Returns the attendances between `start` and `end` (of the user or the
+    members of the team, if given), annotated with the exported KPIs.
+    """
+    queryset = (
+        Attendance.objects.with_extra_seconds()
+        .with_delay_seconds()
+        .with_status()
+        .filter(day__range=(start, end))
+    )
+    if user is not None:
+        queryset = queryset.filter(user=user)
+    if team is not None:
+        queryset = queryset.filter(user__teams=team)
+
+    return queryset.order_by("day", "user__email")
+
+
+def iter_rows(queryset, columns):
+    """
+    Returns an iterator over the values of the columns of the queryset.
+
+    Rows are fetched by chunks of ATTENDANCE_EXPORT_CHUNK_SIZE through a
+    server-side cursor, so memory does not grow with the size of the export.
+    """
+    return queryset.values_list(*(field for _, field in columns)).iterator(
+        chunk_size=settings.ATTENDANCE_EXPORT_CHUNK_SIZE
+    )
+
+
+def get_archived_export_rows(start, end, user=None, team=None):
+    """
+    Yields the export rows of the archived attendances between `start` and
+    `end` (see attendance.utils.archive), ordered as get_export_queryset.
+    Nothing is read when the range is within the hot window.
+    """
+    if start >= archive.get_hot_start():
+        return
+
+    users = User.objects.all()
+    if user is not None:
+        users = users.filter(pk=getattr(user, "pk", user))
+    if team is not None:
+        users = users.filter(teams=team)
+    emails = dict(users.values_list("id", "email"))
+
+    for attendances in archive.iter_archived(start, end, set(emails)):
+        rows = []
+        for attendance in attendances:
+            kpis = archive.get_kpis(attendance)
+            rows.append(
+                (
+                    attendance.user_id,
+                    emails[attendance.user_id],
+                    attendance.day,
+                    kpis["status"],
+                    attendance.check_in,
+                    attendance.check_out,
+                    attendance.is_excused,
+                    kpis["worked_seconds"],
+                    kpis["extra_seconds"],
+                    kpis["delay_seconds"],
+                )
+            )
+        rows.sort(key=lambda row: (row[2], row[1]))
+        yield from rows
+
+
+def get_export_rows(start, end, user=None, team=None):
+    """
+    Returns an iterator over the export rows (see get_export_queryset),
+    preceded by the archived ones when the range reaches the archived years.
+    """
+    yield from get_archived_export_rows(start, end, user, team)
+    yield from iter_rows(get_export_queryset(start, end, user, team), EXPORT_COLUMNS)
+
+
+def stream_csv(rows, columns=EXPORT_COLUMNS):
+    """Yields the CSV lines of the header then of each row."""
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, _ in columns])
+    for row in rows:
+        yield writer.writerow(row)
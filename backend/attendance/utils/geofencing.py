@@ -0,0 +1,235 @@
+# attendance/utils/geofencing.py
+import math
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+import numpy as np
+from django.conf import settings
+
+from attendance.models import Site
+from attendance.utils.base import get_distance_m, get_distances_m
+
+METERS_PER_DEGREE = 111_320
+# Grid cell size, ~1.1 km of latitude: a site of a few hundred meters radius
+# covers 1 to 4 cells, so a lookup only checks the handful of sites around.
+CELL_DEGREES = 0.01
+
+IndexedSite = namedtuple(
+    "IndexedSite", ["id", "name", "latitude", "longitude", "radius"]
+)
+
+
+def _cell(degrees: float) -> int:
+    return math.floor(degrees / CELL_DEGREES)
+
+
+class SiteIndex:
+    """
+    In-memory grid index of the active sites.
+    Each site is stored in every cell its radius overlaps.
+    """
+
+    def __init__(self, sites):
+        self.sites = list(sites)
+        self.cells = defaultdict(list)
+        # Position of each site in the coordinates and radii arrays
+        self.positions = {site.id: i for i, site in enumerate(self.sites)}
+        self.coordinates = np.array(
+            [(site.latitude, site.longitude) for site in self.sites], dtype=np.float64
+        ).reshape(-1, 2)
+        self.radii = np.array([site.radius for site in self.sites], dtype=np.float64)
+
+        for site in self.sites:
+            lat_span = site.radius / METERS_PER_DEGREE
+            lon_span = site.radius / (
+                METERS_PER_DEGREE * max(math.cos(math.radians(site.latitude)), 0.01)
+            )
+            for i in range(
+                _cell(site.latitude - lat_span), _cell(site.latitude + lat_span) + 1
+            ):
+                for j in range(
+                    _cell(site.longitude - lon_span),
+                    _cell(site.longitude + lon_span) + 1,
+                ):
+                    self.cells[(i, j)].append(site)
+
+    def __len__(self):
+        return len(self.sites)
+
+    def candidates(self, latitude: float, longitude: float):
+        return self.cells.get((_cell(latitude), _cell(longitude)), [])
+
+    def locate(self, latitude: float, longitude: float, allowed_site_ids=None):
+        """
+        Returns the nearest site (among allowed_site_ids, if given) whose
+        radius contains the point, or None.
+        """
+        nearest, nearest_distance = None, None
+
+        for site in self.candidates(latitude, longitude):
+            if allowed_site_ids is not None and site.id not in allowed_site_ids:
+                continue
+
+            distance = get_distance_m(
+                latitude, longitude, site.latitude, site.longitude
+            )
+            if distance <= site.radius and (
+                nearest is None or distance < nearest_distance
+            ):
+                nearest, nearest_distance = site, distance
+
+        return nearest
+
+    def locate_many(self, points, allowed_site_ids=None):
+        """
+        Vectorized locate() for a batch of (latitude, longitude) points: the
+        candidates of each point are gathered from the grid, then all the
+        (point, candidate) distances are computed at once.
+        `allowed_site_ids` is a list with the allowed site ids (or None) of
+        each point. Returns the located site (or None) of each point.
+        """
+        located = [None] * len(points)
+        if not self.sites or not len(points):
+            return located
+
+        point_indices, site_indices = [], []
+        for i, (latitude, longitude) in enumerate(points):
+            allowed = allowed_site_ids[i] if allowed_site_ids is not None else None
+            # Missing (zero) coordinates are at distance 0 of every site
+            candidates = (
+                self.candidates(latitude, longitude)
+                if latitude and longitude
+                else self.sites
+            )
+            for site in candidates:
+                if allowed is None or site.id in allowed:
+                    point_indices.append(i)
+                    site_indices.append(self.positions[site.id])
+        if not point_indices:
+            return located
+
+        point_indices = np.array(point_indices)
+        site_indices = np.array(site_indices)
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        distances = get_distances_m(
+            points[point_indices, 0],
+            points[point_indices, 1],
+            self.coordinates[site_indices, 0],
+            self.coordinates[site_indices, 1],
+        )
+
+        # Nearest site within its radius of each point (first of the pairs
+        # sorted by point then distance)
+        within = distances <= self.radii[site_indices]
+        point_indices = point_indices[within]
+        site_indices = site_indices[within]
+        order = np.lexsort((distances[within], point_indices))
+        located_points, first = np.unique(point_indices[order], return_index=True)
+        for i, site_index in zip(located_points, site_indices[order][first]):
+            located[i] = self.sites[site_index]
+        return located
+
+
+_index = None
+_index_built_at = 0
+_index_lock = threading.Lock()
+
+
+def get_site_index() -> SiteIndex:
+    """
+    Returns the site index of this process, rebuilt when sites change
+    (see attendance.signals) or after ATTENDANCE_SITE_INDEX_TTL seconds,
+    which bounds staleness in the other processes.
+    """
+    global _index, _index_built_at
+
+    with _index_lock:
+        expired = (
+            time.monotonic() - _index_built_at > settings.ATTENDANCE_SITE_INDEX_TTL
+        )
+        if _index is None or expired:
+            _index = SiteIndex(
+                IndexedSite(*values)
+                for values in Site.objects.filter(is_active=True).values_list(
+                    "id", "name", "latitude", "longitude", "radius"
+                )
+            )
+            _index_built_at = time.monotonic()
+
+        return _index
+
+
+def invalidate_site_index():
+    global _index
+
+    with _index_lock:
+        _index = None
+
+
+def get_allowed_site_ids(user_ids):
+    """
+    Returns {user_id: set of site ids} for the users restricted to some sites,
+    directly or through their teams. Unrestricted users are not in the dict.
+    """
+    if not len(get_site_index()):
+        return {}
+
+    allowed = defaultdict(set)
+
+    for user_id, site_id in Site.users.through.objects.filter(
+        user_id__in=user_ids
+    ).values_list("user_id", "site_id"):
+        allowed[user_id].add(site_id)
+
+    for user_id, site_id in Site.objects.filter(
+        teams__members__in=user_ids
+    ).values_list("teams__members", "id"):
+        allowed[user_id].add(site_id)
+
+    return dict(allowed)
+
+
+def is_location_allowed(latitude, longitude, allowed_site_ids=None) -> bool:
+    """
+    Returns True if the point is within an (allowed) site.
+    Without any site configured, the company location from the settings
+    (COMPANY_LATITUDE/COMPANY_LONGITUDE/ATTENDANCE_LOCATION_RADIUS) is used.
+    """
+    index = get_site_index()
+
+    if not len(index):
+        distance_to_company = get_distance_m(
+            latitude,
+            longitude,
+            settings.COMPANY_LATITUDE,
+            settings.COMPANY_LONGITUDE,
+        )
+        return distance_to_company <= settings.ATTENDANCE_LOCATION_RADIUS
+
+    # get_distance_m ignores missing (zero) coordinates
+    if not (latitude and longitude):
+        return True
+
+    return index.locate(latitude, longitude, allowed_site_ids) is not None
+
+
+def are_locations_allowed(points, allowed_site_ids=None):
+    """
+    Vectorized is_location_allowed for a batch of (latitude, longitude)
+    points. Returns a list of booleans.
+    """
+    index = get_site_index()
+
+    if not len(index):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        distances = get_distances_m(
+            points[:, 0],
+            points[:, 1],
+            settings.COMPANY_LATITUDE,
+            settings.COMPANY_LONGITUDE,
+        )
+        return (distances <= settings.ATTENDANCE_LOCATION_RADIUS).tolist()
+
+    # Missing (zero) coordinates are matched to a site at distance 0
+    return [site is not None for site in index.locate_many(points, allowed_site_ids)]
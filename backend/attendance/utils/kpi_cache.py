@@ -0,0 +1,128 @@
+# attendance/utils/kpi_cache.py
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from attendance.constants import PeriodicityChoices
+from attendance.utils import kpi_helpers
+from attendance.utils.kpi_helpers import decompose_range, get_period_bounds
+
+# Seconds between two reads while waiting for another computation
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+TEAMS_SCOPE = "kpis:scope:teams"
+
+
+def _user_scope(user_id, periodicity: str, period_start) -> str:
+    return f"kpis:scope:user:{user_id}:{periodicity}:{period_start}"
+
+
+def get_or_compute(key: str, scopes, compute):
+    """
+    Returns the cached result of compute() for `key`.
+
+    A result is valid as long as the version tokens of its scopes did not
+    change (see invalidate_user_kpis and invalidate_team_kpis): the
+    tokens read before computing are stored with the result, so a result
+    computed while being invalidated is never served. Tokens expire with
+    the results (KPI_CACHE_TIMEOUT), a missing token invalidates the results
+    stored with a token.
+
+    Concurrent misses on the same key are collapsed: the first one computes
+    the result under a cache lock, the others wait for it (up to
+    KPI_CACHE_LOCK_TIMEOUT seconds, then compute it themselves).
+    """
+    deadline = time.monotonic() + settings.KPI_CACHE_LOCK_TIMEOUT
+    lock = f"{key}:lock"
+
+    while True:
+        values = cache.get_many([key, *scopes])
+        versions = [values.get(scope) for scope in scopes]
+        entry = values.get(key)
+        if entry is not None and entry["versions"] == versions:
+            return entry["data"]
+
+        if cache.add(lock, True, settings.KPI_CACHE_LOCK_TIMEOUT):
+            try:
+                data = compute()
+                cache.set(
+                    key,
+                    {"versions": versions, "data": data},
+                    settings.KPI_CACHE_TIMEOUT,
+                )
+                return data
+            finally:
+                cache.delete(lock)
+
+        if time.monotonic() > deadline:
+            return compute()
+        time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+
+
+def _user_scopes(user_id, start, end):
+    return [
+        _user_scope(user_id, periodicity, period_start)
+        for periodicity, period_start in decompose_range(start, end)
+    ]
+
+
+def get_user_kpis(user, start, end):
+    """Cached compute_user_kpis."""
+    return get_or_compute(
+        f"kpis:user:{user.id}:{start}:{end}",
+        _user_scopes(user.id, start, end),
+        lambda: kpi_helpers.compute_user_kpis(user, start, end),
+    )
+
+
+def get_work_hours(user, start, end, granularity: str):
+    """Cached compute_work_hours."""
+    return get_or_compute(
+        f"kpis:workhours:{user.id}:{granularity}:{start}:{end}",
+        _user_scopes(user.id, start, end),
+        lambda: kpi_helpers.compute_work_hours(user, start, end, granularity),
+    )
+
+
+def get_team_kpis(team, start, end):
+    """Cached compute_team_kpis."""
+    return get_or_compute(
+        f"kpis:team:{team.id}:{start}:{end}",
+        [TEAMS_SCOPE],
+        lambda: kpi_helpers.compute_team_kpis(team, start, end),
+    )
+
+
+def _change_versions(scopes):
+    cache.set_many(
+        {scope: uuid.uuid4().hex for scope in scopes}, settings.KPI_CACHE_TIMEOUT
+    )
+
+
+def invalidate_user_kpis(user_days):
+    """
+    Invalidates the cached KPIs of the users of the periods containing the
+    given (user_id, day) pairs. Done again once the transaction is
+    committed, so that KPIs computed meanwhile (before the change is
+    visible) are not kept.
+    """
+    scopes = set()
+    for user_id, day in user_days:
+        for periodicity in PeriodicityChoices.values:
+            period_start = get_period_bounds(periodicity, day)[0]
+            scopes.add(_user_scope(user_id, periodicity, period_start))
+
+    if scopes:
+        _change_versions(scopes)
+        transaction.on_commit(lambda: _change_versions(scopes))
+
+
+def invalidate_team_kpis():
+    """
+    Invalidates the cached team KPIs, after a refresh of the team KPIs or a
+    team membership change.
+    """
+    cache.set(TEAMS_SCOPE, uuid.uuid4().hex, settings.KPI_CACHE_TIMEOUT)
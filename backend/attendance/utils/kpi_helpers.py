@@ -1,134 +1,488 @@
 # attendance/utils/kpi_helpers.py
+import calendar
+from collections import defaultdict
 from datetime import timedelta
+from functools import reduce
+from operator import or_
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from attendance.constants import PeriodicityChoices, AttendanceStatusChoices
-from attendance.models import Attendance
-from django.db.models import Sum
+from attendance.constants import (
+    GranularityChoices,
+    PeriodicityChoices,
+    RollingUnitChoices,
+)
+from attendance.models import AttendanceRollup, TeamKPIs
+from attendance.utils import snapshots
+from django.db import connection
+from django.db.models import (
+    Count,
+    F,
+    FilteredRelation,
+    FloatField,
+    Q,
+    Sum,
+    Window,
+)
+from django.db.models.functions import (
+    Cast,
+    Coalesce,
+    Lag,
+    Lead,
+    NullIf,
+    PercentRank,
+    Rank,
+)
+
+# Rollup field ranked by each standing metric, and whether higher is better
+STANDING_METRICS = {
+    "worked_hours": ("worked_seconds", True),
+    "punctuality": ("delay_seconds", False),
+    "extra_hours": ("extra_seconds", True),
+}
+
+
+def get_company_today():
+    """Returns the current date in the company timezone."""
+    return timezone.localdate(timezone=ZoneInfo(settings.COMPANY_TIME_ZONE))
+
+
+def get_snapshot_until():
+    """Returns the last closed day, exported to the attendance snapshots."""
+    return get_company_today() - timedelta(
+        days=settings.ATTENDANCE_SNAPSHOT_CLOSED_AFTER_DAYS
+    )
 
 
 def get_period_range(periodicity: str):
     """
-    Returns a tuple (filter_start, filter_end) for the given periodicity.
-    - filter_start: first day of the week/month/year
-    - filter_end: current datetime
+    Returns a tuple (start, end) of dates for the given periodicity.
+    - start: first day of the current day/week/month/year
+    - end: today, in the company timezone
+    """
+    today = get_company_today()
+    return get_period_bounds(periodicity, today)[0], today
+
+
+def get_rolling_range(last: int, unit: str):
+    """
+    Returns a tuple (start, end) of dates covering the `last` days, business
+    days (Monday to Friday) or weeks up to today, in the company timezone.
     """
-    now = timezone.now()
+    today = get_company_today()
+
+    if unit == RollingUnitChoices.DAYS.value:
+        return today - timedelta(days=last - 1), today
+    if unit == RollingUnitChoices.WEEKS.value:
+        return today - timedelta(weeks=last) + timedelta(days=1), today
+    if unit == RollingUnitChoices.BUSINESS_DAYS.value:
+        start, count = today, 0
+        while True:
+            if start.weekday() < 5:
+                count += 1
+                if count == last:
+                    return start, today
+            start -= timedelta(days=1)
+
+    raise ValueError(f"Invalid rolling unit: {unit}")
+
 
+def get_period_bounds(periodicity: str, day):
+    """
+    Returns the (first day, last day) of the day/week/month/year of `day`.
+    Weeks start on Monday.
+    """
+    if periodicity == PeriodicityChoices.DAILY.value:
+        return day, day
     if periodicity == PeriodicityChoices.WEEKLY.value:
-        # ISO weekday: Monday=1, Sunday=7
-        filter_start = now - timedelta(days=now.isoweekday() - 1)
-        filter_start = filter_start.replace(hour=0, minute=0, second=0, microsecond=0)
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if periodicity == PeriodicityChoices.MONTHLY.value:
+        _, last_day = calendar.monthrange(day.year, day.month)
+        return day.replace(day=1), day.replace(day=last_day)
+    if periodicity == PeriodicityChoices.YEARLY.value:
+        return day.replace(month=1, day=1), day.replace(month=12, day=31)
 
-    elif periodicity == PeriodicityChoices.MONTHLY.value:
-        filter_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Invalid periodicity: {periodicity}")
 
-    elif periodicity == PeriodicityChoices.YEARLY.value:
-        filter_start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
 
-    else:
-        raise ValueError("Invalid periodicity (must be weekly, monthly, or yearly)")
+def decompose_range(start, end):
+    """
+    Splits the days from `start` to `end` into the largest periods having a
+    rollup: full years, months and weeks, then single days at the edges.
+    Returns a list of (periodicity, period_start).
 
-    return filter_start, now
+    Attendances are not recorded after today, so a range ending today
+    covers the whole of the current periods starting in it.
+    """
+    covered_until = end
+    if end >= get_company_today():
+        covered_until = get_period_bounds(PeriodicityChoices.YEARLY.value, end)[1]
 
+    periods = []
+    day = start
+    while day <= end:
+        for periodicity in (
+            PeriodicityChoices.YEARLY.value,
+            PeriodicityChoices.MONTHLY.value,
+            PeriodicityChoices.WEEKLY.value,
+            PeriodicityChoices.DAILY.value,
+        ):
+            period_start, period_end = get_period_bounds(periodicity, day)
+            if period_start == day and (
+                period_end <= end
+                or periodicity != PeriodicityChoices.DAILY.value
+                and period_end <= covered_until
+            ):
+                break
+        periods.append((periodicity, day))
+        day = period_end + timedelta(days=1)
 
-def compute_user_kpis(user, periodicity: str):
-    filter_start, filter_end = get_period_range(periodicity)
+    return periods
 
-    attendances = (
-        Attendance.objects.with_extra_seconds()
-        .with_delay_seconds()
-        .with_status()
-        .filter(user=user, day__range=(filter_start, filter_end))
+
+def range_filter(start, end, prefix: str = "") -> Q:
+    """
+    Filter of the rollups (fields prefixed by `prefix`) of the periods
+    decomposing the days from `start` to `end` (see decompose_range).
+    """
+    period_starts = defaultdict(list)
+    for periodicity, period_start in decompose_range(start, end):
+        period_starts[periodicity].append(period_start)
+
+    return reduce(
+        or_,
+        (
+            Q(
+                **{
+                    f"{prefix}periodicity": periodicity,
+                    f"{prefix}period_start__in": starts,
+                }
+            )
+            for periodicity, starts in period_starts.items()
+        ),
     )
 
-    total_days = attendances.count() or 1
-    delays = attendances.filter(delay_seconds__gt=0)
-    additional_hours = attendances.filter(extra_seconds__gt=0)
-    absences = attendances.filter(status=AttendanceStatusChoices.ABSENT.value)
+
+def range_totals(prefix: str = ""):
+    """Sums of the rollup fields (prefixed by `prefix`), 0 without rollups."""
+    return {
+        field: Coalesce(
+            Sum(f"{prefix}{field}"),
+            0,
+            output_field=AttendanceRollup._meta.get_field(field).__class__(),
+        )
+        for field in (
+            "days",
+            "delayed_days",
+            "extra_days",
+            "absent_days",
+            "worked_seconds",
+            "delay_seconds",
+            "extra_seconds",
+        )
+    }
+
+
+def _get_user_kpis(rollup: AttendanceRollup):
+    total_days = rollup.days or 1
 
     return {
         "delays": {
-            "rate": round((delays.count() / total_days) * 100, 2),
-            "hours": delays.aggregate(Sum("delay_seconds"))["delay_seconds__sum"] or 0,
+            "rate": round((rollup.delayed_days / total_days) * 100, 2),
+            "hours": rollup.delay_seconds,
         },
         "additional_hours": {
-            "rate": round((additional_hours.count() / total_days) * 100, 2),
-            "hours": additional_hours.aggregate(Sum("extra_seconds"))[
-                "extra_seconds__sum"
-            ]
-            or 0,
+            "rate": round((rollup.extra_days / total_days) * 100, 2),
+            "hours": rollup.extra_seconds,
         },
         "absences": {
-            "total": absences.count(),
+            "total": rollup.absent_days,
         },
     }
 
 
-def compute_work_hours(user, periodicity: str):
-    filter_start, filter_end = get_period_range(periodicity)
-    attendances = Attendance.objects.with_worked_seconds().filter(
-        user=user, day__range=(filter_start, filter_end)
-    )
+def compute_user_kpis(user, start, end):
+    snapshot = snapshots.get_snapshot(start, end)
+    if snapshot:
+        totals = snapshots.compute_totals(start, end, [user.id], snapshot).get(
+            str(user.id)
+        )
+        return _get_user_kpis(AttendanceRollup(**(totals or {})))
 
-    data = {}
-    for a in attendances:
-        worked_hours = a.worked_seconds / 3600
-        key = a.day.strftime("%Y-%m-%d")
-        data[key] = worked_hours
+    # Totals maintained incrementally (see attendance.utils.rollups)
+    totals = AttendanceRollup.objects.filter(
+        range_filter(start, end), user=user
+    ).aggregate(**range_totals())
 
-    return {"user": user.id, "periodicity": periodicity, "hours_per_day": data}
+    return _get_user_kpis(AttendanceRollup(**totals))
 
 
-def compute_team_kpis(team, periodicity: str):
+def compute_users_kpis(user_ids, start, end):
+    """
+    Returns the KPIs of several users (as compute_user_kpis), as a list of
+    {"user": <user_id>, **kpis} in the order of `user_ids`, from one query
+    grouped by user over their rollups.
     """
-    Aggregate KPIs for all team members combined.
+    snapshot = snapshots.get_snapshot(start, end)
+    if snapshot:
+        totals = {
+            user_id: AttendanceRollup(**row)
+            for user_id, row in snapshots.compute_totals(
+                start, end, user_ids, snapshot
+            ).items()
+        }
+        return [
+            {
+                "user": user_id,
+                **_get_user_kpis(totals.get(str(user_id)) or AttendanceRollup()),
+            }
+            for user_id in user_ids
+        ]
+
+    totals = {
+        row.pop("user_id"): AttendanceRollup(**row)
+        for row in AttendanceRollup.objects.filter(
+            range_filter(start, end), user_id__in=user_ids
+        )
+        .values("user_id")
+        .annotate(**range_totals())
+        .order_by()
+    }
+
+    return [
+        {"user": user_id, **_get_user_kpis(totals.get(user_id) or AttendanceRollup())}
+        for user_id in user_ids
+    ]
+
+
+def compute_work_hours(
+    user, start, end, granularity: str = GranularityChoices.DAY.value
+):
     """
-    filter_start, filter_end = get_period_range(periodicity)
-    attendances = Attendance.objects.filter(user__team=team, day__range=(filter_start, filter_end))
+    Returns the hours worked by the user from `start` to `end`, summed per
+    day/week/month (granularity), as parallel arrays of bucket start dates
+    and hours. Buckets without attendance are filled with 0.
 
-    total_days = attendances.count() or 1
-    delays = attendances.filter(delay_seconds__gt=0)
-    additional_hours = attendances.filter(extra_seconds__gt=0)
-    absences = attendances.filter(status="ABSENT")
+    The daily rollups are bucketed with date_trunc and gaps filled with
+    generate_series in one query.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT bucket::date, COALESCE(SUM(rollup.worked_seconds), 0) / 3600
+            FROM generate_series(
+                date_trunc(%(granularity)s, %(start)s::date),
+                %(end)s::date,
+                ('1 ' || %(granularity)s)::interval
+            ) AS bucket
+            LEFT JOIN {AttendanceRollup._meta.db_table} AS rollup
+                ON rollup.user_id = %(user_id)s
+                AND rollup.periodicity = %(periodicity)s
+                AND rollup.period_start BETWEEN %(start)s AND %(end)s
+                AND date_trunc(%(granularity)s, rollup.period_start) = bucket
+            GROUP BY bucket
+            ORDER BY bucket
+            """,
+            {
+                "granularity": granularity,
+                "start": start,
+                "end": end,
+                "user_id": user.id,
+                "periodicity": PeriodicityChoices.DAILY.value,
+            },
+        )
+        rows = cursor.fetchall()
+
+    return {
+        "user": user.id,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "granularity": granularity,
+        "dates": [bucket.isoformat() for bucket, hours in rows],
+        "hours": [hours for bucket, hours in rows],
+    }
+
+
+def format_team_kpis(team, members_count: int, totals):
+    """
+    Formats the KPIs of a team from the totals of its members (an object
+    with days, delayed_days, extra_days, absent_days, delay_seconds and
+    extra_seconds attributes).
+    """
+    total_days = totals.days or 1
 
     return {
         "team": team.id,
         "team_name": team.name,
-        "members_count": team.members.count(),
+        "members_count": members_count,
         "delays": {
-            "rate": round((delays.count() / total_days) * 100, 2),
-            "hours": delays.aggregate(Sum("delay_seconds"))["delay_seconds__sum"] or 0,
+            "rate": round((totals.delayed_days / total_days) * 100, 2),
+            "hours": totals.delay_seconds,
         },
         "additional_hours": {
-            "rate": round((additional_hours.count() / total_days) * 100, 2),
-            "hours": additional_hours.aggregate(Sum("extra_seconds"))[
-                "extra_seconds__sum"
-            ]
-            or 0,
+            "rate": round((totals.extra_days / total_days) * 100, 2),
+            "hours": totals.extra_seconds,
         },
-        "absence": {"total": absences.count()},
+        "absence": {"total": totals.absent_days},
     }
 
 
-def get_best_performers(periodicity: str, count=3, team=None):
+def compute_team_kpis(team, start, end):
+    """
+    Aggregate KPIs for all team members combined. The members are counted
+    with the team when it is annotated with members_count.
+    """
+    # Team totals from the materialized view (see refresh_team_kpis)
+    totals = TeamKPIs.objects.filter(range_filter(start, end), team=team).aggregate(
+        **range_totals()
+    )
+    members_count = getattr(team, "members_count", None)
+    if members_count is None:
+        members_count = team.members.count()
+
+    return format_team_kpis(team, members_count, TeamKPIs(**totals))
+
+
+def annotate_team_kpis(teams, start, end):
+    """
+    Annotates the teams with the totals of their members' rollups from
+    `start` to `end` (members_count, days, delayed_days, extra_days,
+    absent_days, worked_seconds, delay_seconds, extra_seconds) and the
+    sortable delay_rate and extra_rate, in one query grouped by team.
+
+    Teams without members or attendances get zero totals. A user member of
+    several teams counts in each of them.
+    """
+
+    def rate(field):
+        return Coalesce(
+            Cast(F(field), FloatField()) * 100 / NullIf(F("days"), 0),
+            0.0,
+            output_field=FloatField(),
+        )
+
+    return (
+        teams.select_related(None)
+        .prefetch_related(None)
+        .annotate(
+            range_rollups=FilteredRelation(
+                "members__attendance_rollups",
+                condition=range_filter(
+                    start, end, prefix="members__attendance_rollups__"
+                ),
+            ),
+            # Members have several rollups in ranges of several periods
+            members_count=Count("members", distinct=True),
+            **range_totals(prefix="range_rollups__"),
+        )
+        .annotate(delay_rate=rate("delayed_days"), extra_rate=rate("extra_days"))
+    )
+
+
+def get_best_performers(start, end, count=3, team=None):
     """
-    Returns top performers based on worked hours.
-    If a team is provided, restricts to that team.
+    Returns the `count` users with the most worked seconds from `start` to
+    `end` (in the team, if given), as
+    [{"user": <user_id>, "total_worked_seconds": <float>}, ...].
+
+    Calendar periods are served by the leaderboards
+    (attendance.utils.leaderboards), this sums the rollups of other ranges,
+    or the attendance snapshots of closed ranges.
     """
-    filter_start, filter_end = get_period_range(periodicity)
+    snapshot = snapshots.get_snapshot(start, end)
+    if snapshot:
+        user_ids = None
+        if team:
+            user_ids = team.members.values_list("id", flat=True)
+        return snapshots.get_best_performers(start, end, count, user_ids, snapshot)
 
-    filters = {"day__range": (filter_start, filter_end)}
+    rollups = AttendanceRollup.objects.filter(range_filter(start, end))
     if team:
-        filters["user__team"] = team
+        rollups = rollups.filter(user__teams=team)
 
-    attendances = (
-        Attendance.objects.with_worked_seconds()
-        .filter(**filters)
-        .values("user")
+    return list(
+        rollups.values("user")
         .annotate(total_worked_seconds=Sum("worked_seconds"))
-        .order_by("-total_worked_seconds")[:count]
+        .order_by("-total_worked_seconds", "user")[:count]
     )
 
-    return list(attendances)
+
+def compute_user_standing(user_id, start, end, team=None):
+    """
+    Returns where the user stands among all the users (or the members of
+    the team) from `start` to `end`, for each of STANDING_METRICS: rank
+    (1 for the best), percentile (share of the others ranked below, in %),
+    value, and the users ranked just above and below.
+
+    Computed with window functions over the totals of the users' rollups,
+    in one query returning the user's row only.
+    """
+    rollups = AttendanceRollup.objects.filter(range_filter(start, end))
+    if team:
+        rollups = rollups.filter(user__teams=team)
+    totals = rollups.values("user_id").annotate(
+        **{
+            f"total_{field}": Sum(field)
+            for field, higher_is_better in STANDING_METRICS.values()
+        }
+    )
+
+    annotations = {"ranked_users": Window(Count("user_id"))}
+    for metric, (field, higher_is_better) in STANDING_METRICS.items():
+        total = f"total_{field}"
+        best_first = F(total).desc() if higher_is_better else F(total).asc()
+        # Equal values share a rank, neighbours are ordered by user
+        neighbours = {"order_by": [best_first, F("user_id").asc()]}
+        annotations.update(
+            {
+                f"{metric}_rank": Window(Rank(), order_by=best_first),
+                f"{metric}_percent_rank": Window(PercentRank(), order_by=best_first),
+                f"{metric}_above": Window(Lag("user_id"), **neighbours),
+                f"{metric}_above_value": Window(Lag(total), **neighbours),
+                f"{metric}_below": Window(Lead("user_id"), **neighbours),
+                f"{metric}_below_value": Window(Lead(total), **neighbours),
+            }
+        )
+
+    ranked = totals.annotate(**annotations).order_by()
+    sql, params = ranked.query.sql_with_params()
+    with connection.cursor() as cursor:
+        # Filtered outside of the windows, which rank all the users
+        cursor.execute(
+            f"SELECT * FROM ({sql}) ranked WHERE user_id = %s", [*params, user_id]
+        )
+        row = cursor.fetchone()
+        row = dict(zip([c.name for c in cursor.description], row)) if row else {}
+
+    def neighbour(metric, side):
+        if row.get(f"{metric}_{side}") is None:
+            return None
+        return {
+            "user": row[f"{metric}_{side}"],
+            "value": row[f"{metric}_{side}_value"],
+        }
+
+    standing = {
+        "user": str(user_id),
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "team": team.id if team else None,
+        "ranked_users": row.get("ranked_users", 0),
+    }
+    for metric, (field, higher_is_better) in STANDING_METRICS.items():
+        percent_rank = row.get(f"{metric}_percent_rank")
+        standing[metric] = {
+            "rank": row.get(f"{metric}_rank"),
+            "percentile": (
+                round((1 - percent_rank) * 100, 2) if percent_rank is not None else None
+            ),
+            "value": row.get(f"total_{field}"),
+            "above": neighbour(metric, "above"),
+            "below": neighbour(metric, "below"),
+        }
+
+    return standing
@@ -0,0 +1,217 @@
+# attendance/utils/leaderboards.py
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from attendance.constants import PeriodicityChoices
+from attendance.models import AttendanceRollup
+from attendance.utils.kpi_helpers import get_period_range
+from teams.models import Team
+
+KEY_PREFIX = "leaderboard:"
+
+# Periodicities ranked by worked seconds (daily rollups are not ranked)
+RANKED_PERIODICITIES = [
+    PeriodicityChoices.WEEKLY.value,
+    PeriodicityChoices.MONTHLY.value,
+    PeriodicityChoices.YEARLY.value,
+]
+
+
+def leaderboard_key(periodicity: str, period_start, team_id=None) -> str:
+    if team_id:
+        return f"{KEY_PREFIX}team:{team_id}:{periodicity}:{period_start}"
+    return f"{KEY_PREFIX}{periodicity}:{period_start}"
+
+
+class MemoryLeaderboards:
+    """In-process sorted sets, used by tests and local development."""
+
+    def __init__(self):
+        self._sets = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def update(self, scores: dict, removed: dict | None = None, replace=False):
+        with self._lock:
+            for key, members in scores.items():
+                if replace:
+                    self._sets.pop(key, None)
+                self._sets[key].update(members)
+            for key, members in (removed or {}).items():
+                for member in members:
+                    self._sets[key].pop(member, None)
+
+    def _ranked(self, key):
+        return sorted(
+            self._sets.get(key, {}).items(), key=lambda item: (-item[1], item[0])
+        )
+
+    def top(self, key: str, count: int):
+        with self._lock:
+            return self._ranked(key)[:count]
+
+    def rank(self, key: str, member: str):
+        with self._lock:
+            ranked = self._ranked(key)
+            for rank, (ranked_member, score) in enumerate(ranked):
+                if ranked_member == member:
+                    return rank, score, len(ranked)
+            return None, None, len(ranked)
+
+    def clear(self):
+        with self._lock:
+            self._sets.clear()
+
+
+class RedisLeaderboards:
+    """Redis sorted sets, scored by worked seconds."""
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    def update(self, scores: dict, removed: dict | None = None, replace=False):
+        pipeline = self.client.pipeline()
+        for key, members in scores.items():
+            if replace:
+                pipeline.delete(key)
+            if members:
+                pipeline.zadd(key, members)
+                pipeline.expire(key, settings.ATTENDANCE_LEADERBOARD_TTL)
+        for key, members in (removed or {}).items():
+            if members:
+                pipeline.zrem(key, *members)
+        pipeline.execute()
+
+    def top(self, key: str, count: int):
+        return self.client.zrevrange(key, 0, count - 1, withscores=True)
+
+    def rank(self, key: str, member: str):
+        pipeline = self.client.pipeline()
+        pipeline.zrevrank(key, member)
+        pipeline.zscore(key, member)
+        pipeline.zcard(key)
+        return tuple(pipeline.execute())
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=f"{KEY_PREFIX}*", count=1000))
+        for i in range(0, len(keys), 1000):
+            self.client.delete(*keys[i : i + 1000])
+
+
+_leaderboards = {}
+
+
+def get_leaderboards():
+    """Returns the leaderboards configured by ATTENDANCE_LEADERBOARD_URL."""
+    url = settings.ATTENDANCE_LEADERBOARD_URL
+
+    if url not in _leaderboards:
+        if url.startswith("memory://"):
+            _leaderboards[url] = MemoryLeaderboards()
+        else:
+            _leaderboards[url] = RedisLeaderboards(url)
+
+    return _leaderboards[url]
+
+
+def get_team_memberships(user_ids) -> dict:
+    """Returns {user_id: [team_id, ...]} for the given users."""
+    memberships = defaultdict(list)
+    for user_id, team_id in Team.members.through.objects.filter(
+        user_id__in=user_ids
+    ).values_list("user_id", "team_id"):
+        memberships[user_id].append(team_id)
+    return memberships
+
+
+def update_leaderboards(rollups, removed=(), replace=False):
+    """
+    Writes the worked seconds of the rollups into the company and team
+    leaderboards of their period. `removed` holds the (user_id, periodicity,
+    period_start) of the rollups deleted since. With `replace`, the
+    leaderboards of the rollups are emptied first (rebuilds).
+
+    The leaderboards are written once the transaction is committed, so that
+    they never rank rollups which are rolled back.
+    """
+    rollups = [r for r in rollups if r.periodicity in RANKED_PERIODICITIES]
+    removed = [r for r in removed if r[1] in RANKED_PERIODICITIES]
+    if not rollups and not removed:
+        return
+
+    memberships = get_team_memberships(
+        {r.user_id for r in rollups} | {user_id for user_id, _, _ in removed}
+    )
+
+    scores = defaultdict(dict)
+    for rollup in rollups:
+        for team_id in [None, *memberships[rollup.user_id]]:
+            key = leaderboard_key(rollup.periodicity, rollup.period_start, team_id)
+            scores[key][rollup.user_id] = rollup.worked_seconds
+
+    removed_members = defaultdict(set)
+    for user_id, periodicity, period_start in removed:
+        for team_id in [None, *memberships[user_id]]:
+            key = leaderboard_key(periodicity, period_start, team_id)
+            removed_members[key].add(user_id)
+
+    transaction.on_commit(
+        lambda: get_leaderboards().update(scores, removed_members, replace=replace)
+    )
+
+
+def refresh_team_leaderboards(team_ids):
+    """
+    Rebuilds the leaderboards of the current periods of the teams from the
+    rollups of their members, after a membership change.
+    """
+    scores = {}
+    for periodicity in RANKED_PERIODICITIES:
+        period_start = get_period_range(periodicity)[0]
+        for team_id in team_ids:
+            scores[leaderboard_key(periodicity, period_start, team_id)] = dict(
+                AttendanceRollup.objects.filter(
+                    user__teams=team_id,
+                    periodicity=periodicity,
+                    period_start=period_start,
+                ).values_list("user_id", "worked_seconds")
+            )
+
+    get_leaderboards().update(scores, replace=True)
+
+
+def get_best_performers(periodicity: str, count=3, team=None):
+    """
+    Returns the `count` users with the most worked seconds in the current
+    period (of the team, if given), as
+    [{"user": <user_id>, "total_worked_seconds": <float>}, ...].
+    """
+    period_start = get_period_range(periodicity)[0]
+    key = leaderboard_key(periodicity, period_start, team.id if team else None)
+
+    return [
+        {"user": user_id, "total_worked_seconds": score}
+        for user_id, score in get_leaderboards().top(key, count)
+    ]
+
+
+def get_user_rank(user_id, periodicity: str, team=None):
+    """
+    Returns the rank (1 for the best performer, None without attendance in
+    the period) and worked seconds of the user in the current period, and
+    the number of ranked users.
+    """
+    period_start = get_period_range(periodicity)[0]
+    key = leaderboard_key(periodicity, period_start, team.id if team else None)
+    rank, score, total = get_leaderboards().rank(key, str(user_id))
+
+    return {
+        "user": str(user_id),
+        "rank": rank + 1 if rank is not None else None,
+        "total_worked_seconds": score or 0.0,
+        "ranked_users": total,
+    }
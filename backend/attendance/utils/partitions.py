@@ -0,0 +1,74 @@
+# attendance/utils/partitions.py
+from datetime import date
+
+from django.db import connection, transaction
+
+from attendance.models import Attendance
+
+# Columns written on insert (worked_seconds and check_in_seconds are generated)
+INSERT_COLUMNS = (
+    "id, created_at, updated_at, user_id, day, check_in, check_out, "
+    "is_excused, excuse_reason"
+)
+
+
+def get_partition_name(month: date) -> str:
+    return f"{Attendance._meta.db_table}_y{month:%Y}m{month:%m}"
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def get_partitions() -> list:
+    """Returns the names of the partitions of the attendance table."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT inhrelid::regclass::text FROM pg_inherits "
+            "WHERE inhparent = %s::regclass ORDER BY 1",
+            [Attendance._meta.db_table],
+        )
+        return [name for (name,) in cursor.fetchall()]
+
+
+def create_partitions(start: date, months: int) -> list:
+    """
+    Creates the missing monthly partitions of the attendance table for the
+    `months` months from the month of `start`. Returns their names.
+
+    Attendances of these months stored meanwhile in the default partition
+    are moved to their partition.
+    """
+    table = Attendance._meta.db_table
+    existing = set(get_partitions())
+    created = []
+
+    for offset in range(months):
+        month = add_months(start.replace(day=1), offset)
+        name = get_partition_name(month)
+        if name in existing:
+            continue
+
+        bounds = [month, add_months(month, 1)]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"CREATE TEMP TABLE attendance_moved (LIKE {table})")
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {table}_default "
+                f"WHERE day >= %s AND day < %s RETURNING *) "
+                f"INSERT INTO attendance_moved SELECT * FROM moved",
+                bounds,
+            )
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF {table} "
+                f"FOR VALUES FROM (%s) TO (%s)",
+                bounds,
+            )
+            cursor.execute(
+                f"INSERT INTO {table} ({INSERT_COLUMNS}) "
+                f"SELECT {INSERT_COLUMNS} FROM attendance_moved"
+            )
+            cursor.execute("DROP TABLE attendance_moved")
+        created.append(name)
+
+    return created
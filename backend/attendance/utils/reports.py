@@ -0,0 +1,191 @@
+# attendance/utils/reports.py
+import csv
+import logging
+import os
+from datetime import date
+from itertools import islice
+
+from django.conf import settings
+from django.utils import timezone
+
+from attendance.constants import (
+    PeriodicityChoices,
+    ReportKindChoices,
+    ReportStatusChoices,
+)
+from attendance.models import AttendanceRollup, ReportJob
+from attendance.utils.exports import (
+    EXPORT_COLUMNS,
+    get_archived_export_rows,
+    get_export_queryset,
+    iter_rows,
+)
+
+logger = logging.getLogger(__name__)
+
+# (header, queryset field) of the monthly team timesheets
+TIMESHEET_COLUMNS = [
+    ("team", "user__teams__name"),
+    ("month", "period_start"),
+    ("user_id", "user_id"),
+    ("email", "user__email"),
+    ("days", "days"),
+    ("absent_days", "absent_days"),
+    ("delayed_days", "delayed_days"),
+    ("worked_seconds", "worked_seconds"),
+    ("extra_seconds", "extra_seconds"),
+    ("delay_seconds", "delay_seconds"),
+]
+
+
+def get_timesheet_queryset(start, end, user=None, team=None):
+    """
+    Returns the monthly rollups of the team members, one row per team, month
+    and member, for the months overlapping `start` and `end`.
+    """
+    # In the same filter() call, so that the team rows are joined only once
+    teams = {"user__teams__isnull": False} if team is None else {"user__teams": team}
+    queryset = AttendanceRollup.objects.filter(
+        periodicity=PeriodicityChoices.MONTHLY,
+        period_start__range=(start.replace(day=1), end),
+        **teams,
+    )
+    if user is not None:
+        queryset = queryset.filter(user=user)
+
+    return queryset.order_by("user__teams__name", "period_start", "user__email")
+
+
+# Columns and queryset of each kind of report
+REPORTS = {
+    ReportKindChoices.ATTENDANCE: (EXPORT_COLUMNS, get_export_queryset),
+    ReportKindChoices.TEAM_TIMESHEETS: (TIMESHEET_COLUMNS, get_timesheet_queryset),
+}
+
+
+def _get_filters(job: ReportJob) -> dict:
+    parameters = job.parameters
+    return {
+        "start": date.fromisoformat(parameters["start"]),
+        "end": date.fromisoformat(parameters["end"]),
+        "user": parameters.get("user_id"),
+        "team": parameters.get("team_id"),
+    }
+
+
+def get_report_queryset(job: ReportJob):
+    columns, get_queryset = REPORTS[job.kind]
+    return columns, get_queryset(**_get_filters(job))
+
+
+def _iter_archived_rows(job: ReportJob):
+    # Attendances of the archived years, read before the queryset ones
+    if job.kind == ReportKindChoices.ATTENDANCE:
+        yield from get_archived_export_rows(**_get_filters(job))
+
+
+def _set_progress(job: ReportJob, **fields) -> bool:
+    """
+    Saves the fields of a running job. Returns False if the job is not
+    running anymore (cancelled).
+    """
+    return bool(
+        ReportJob.objects.filter(pk=job.pk, status=ReportStatusChoices.RUNNING).update(
+            updated_at=timezone.now(), **fields
+        )
+    )
+
+
+def _iter_rows(job: ReportJob, columns, queryset):
+    yield from _iter_archived_rows(job)
+    yield from iter_rows(queryset, columns)
+
+
+def _write_rows(job: ReportJob, path: str, columns, queryset) -> bool:
+    """
+    Writes the CSV file of the job by chunks of ATTENDANCE_EXPORT_CHUNK_SIZE
+    rows, saving the rows written after each one. Returns False if the job
+    has been cancelled meanwhile.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rows = _iter_rows(job, columns, queryset)
+    written = 0
+
+    try:
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow([header for header, _ in columns])
+            while chunk := list(islice(rows, settings.ATTENDANCE_EXPORT_CHUNK_SIZE)):
+                writer.writerows(chunk)
+                written += len(chunk)
+                if not _set_progress(job, rows_written=written):
+                    return False
+    finally:
+        rows.close()
+
+    return True
+
+
+def build_report(job_id) -> str:
+    """
+    Builds the CSV file of a pending report job into MEDIA_ROOT. A
+    cancellation is noticed after the current chunk, the partial file is
+    then removed. Returns the final status of the job.
+    """
+    started = ReportJob.objects.filter(
+        pk=job_id, status=ReportStatusChoices.PENDING
+    ).update(status=ReportStatusChoices.RUNNING, started_at=timezone.now())
+    job = ReportJob.objects.get(pk=job_id)
+    if not started:
+        return job.status
+
+    name = job.file.field.generate_filename(job, f"{job.kind}_{job.id}.csv")
+    path = job.file.storage.path(name)
+    status = ReportStatusChoices.CANCELLED
+
+    try:
+        columns, queryset = get_report_queryset(job)
+        if (
+            _set_progress(
+                job,
+                rows_total=queryset.count() + sum(1 for _ in _iter_archived_rows(job)),
+            )
+            and _write_rows(job, path, columns, queryset)
+            and _set_progress(
+                job,
+                file=name,
+                status=ReportStatusChoices.SUCCEEDED,
+                finished_at=timezone.now(),
+            )
+        ):
+            return ReportStatusChoices.SUCCEEDED
+    except Exception as error:
+        logger.exception("Report job %s failed", job_id)
+        _set_progress(
+            job,
+            status=ReportStatusChoices.FAILED,
+            error=str(error),
+            finished_at=timezone.now(),
+        )
+        status = ReportStatusChoices.FAILED
+
+    if os.path.exists(path):
+        os.remove(path)
+    return status
+
+
+def cancel_report(job: ReportJob) -> bool:
+    """
+    Cancels a pending or running job (a running job stops after its current
+    chunk). Returns False if the job is already finished.
+    """
+    cancelled = ReportJob.objects.filter(
+        pk=job.pk,
+        status__in=[ReportStatusChoices.PENDING, ReportStatusChoices.RUNNING],
+    ).update(
+        status=ReportStatusChoices.CANCELLED,
+        finished_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+    job.refresh_from_db()
+    return bool(cancelled)
@@ -0,0 +1,315 @@
+# attendance/utils/rollups.py
+from django.db import connection, transaction
+from django.db.models import Value
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek, TruncYear
+from django.utils import timezone
+
+from attendance.constants import PeriodicityChoices
+from attendance.models import Attendance, AttendanceRollup, TeamKPIs
+from attendance.utils import archive, snapshots
+from attendance.utils.kpi_cache import invalidate_team_kpis, invalidate_user_kpis
+from attendance.utils.kpi_helpers import get_period_bounds
+from attendance.utils.leaderboards import (
+    RANKED_PERIODICITIES,
+    get_leaderboards,
+    update_leaderboards,
+)
+
+# Expression of the period start of an attendance, per periodicity
+PERIOD_STARTS = {
+    PeriodicityChoices.DAILY.value: TruncDay("day"),
+    PeriodicityChoices.WEEKLY.value: TruncWeek("day"),
+    PeriodicityChoices.MONTHLY.value: TruncMonth("day"),
+    PeriodicityChoices.YEARLY.value: TruncYear("day"),
+}
+
+ROLLUP_FIELDS = [
+    "days",
+    "delayed_days",
+    "extra_days",
+    "absent_days",
+    "worked_seconds",
+    "delay_seconds",
+    "extra_seconds",
+]
+
+
+def _get_totals(attendances, periodicity: str):
+    return attendances.annotate(
+        periodicity=Value(periodicity), period_start=PERIOD_STARTS[periodicity]
+    ).rollup_totals("user_id", "periodicity", "period_start")
+
+
+def _to_rollup(totals) -> AttendanceRollup:
+    return AttendanceRollup(
+        user_id=totals["user_id"],
+        periodicity=totals["periodicity"],
+        period_start=totals["period_start"],
+        days=totals["days"],
+        delayed_days=totals["delayed_days"],
+        extra_days=totals["extra_days"],
+        absent_days=totals["absent_days"],
+        worked_seconds=totals["total_worked_seconds"] or 0,
+        delay_seconds=totals["total_delay_seconds"] or 0,
+        extra_seconds=totals["total_extra_seconds"] or 0,
+    )
+
+
+def _add_archived_totals(rollups, periods):
+    """
+    Adds the totals of the archived attendances to the rollups of the given
+    (user_id, periodicity, period_start) periods starting before the hot
+    window (see attendance.utils.archive). Returns the rollups.
+    """
+    hot_start = archive.get_hot_start()
+    periods = {period for period in periods if period[2] < hot_start}
+    if not periods:
+        return rollups
+
+    by_period = {(r.user_id, r.periodicity, r.period_start): r for r in rollups}
+    for period, totals in archive.get_archived_totals(periods).items():
+        user_id, periodicity, period_start = period
+        rollup = by_period.setdefault(
+            period,
+            AttendanceRollup(
+                user_id=user_id, periodicity=periodicity, period_start=period_start
+            ),
+        )
+        for field, value in totals.items():
+            setattr(rollup, field, getattr(rollup, field) + value)
+
+    return list(by_period.values())
+
+
+def _save_rollups(rollups):
+    # Always upsert in the same order so that concurrent refreshes of the
+    # same rollups cannot deadlock
+    rollups.sort(key=lambda r: (r.user_id, r.periodicity, r.period_start))
+    AttendanceRollup.objects.bulk_create(
+        rollups,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["user", "periodicity", "period_start"],
+        update_fields=[*ROLLUP_FIELDS, "updated_at"],
+    )
+
+
+def _get_values(rollup) -> list:
+    return [getattr(rollup, field) for field in ROLLUP_FIELDS]
+
+
+def _lock_users(user_ids):
+    # Serializes the refreshes of the rollups of a user until the end of the
+    # transaction: each one reads the daily rollups written by the previous
+    # one as the totals already applied, and no other one updates the same
+    # rollups concurrently
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(hashtextextended(key, 0)) "
+            "FROM unnest(%s::text[]) AS key ORDER BY key",
+            [sorted(f"rollup:{user_id}" for user_id in user_ids)],
+        )
+
+
+def _apply_changes(changes) -> list:
+    """
+    Applies the {(user_id, periodicity, period_start): values} changes to
+    the rollups in a single query: the values of the daily rollups replace
+    theirs, the values of the other rollups are added to theirs (SET x = x
+    + delta), missing rollups are inserted. Returns the rollups.
+    """
+    table = AttendanceRollup._meta.db_table
+    daily = PeriodicityChoices.DAILY.value
+    now = timezone.now()
+    types = ["text", "text", "text", "date"] + [
+        AttendanceRollup._meta.get_field(field).db_type(connection)
+        for field in ROLLUP_FIELDS
+    ]
+    row = "({})".format(", ".join(f"%s::{type_}" for type_ in types))
+
+    params = []
+    for key, values in changes.items():
+        params += [AttendanceRollup._meta.pk.get_default(), *key, *values]
+
+    fields = ", ".join(ROLLUP_FIELDS)
+    updates = ", ".join(
+        f"{field} = CASE WHEN c.periodicity = '{daily}' "
+        f"THEN c.{field} ELSE r.{field} + c.{field} END"
+        for field in ROLLUP_FIELDS
+    )
+    same_rollup = (
+        "{0}.user_id = c.user_id AND {0}.periodicity = c.periodicity "
+        "AND {0}.period_start = c.period_start"
+    )
+
+    return list(
+        AttendanceRollup.objects.raw(
+            f"""
+            WITH c (id, user_id, periodicity, period_start, {fields}) AS (
+                VALUES {", ".join([row] * len(changes))}
+            ), updated AS (
+                UPDATE {table} AS r SET {updates}, updated_at = %s
+                FROM c WHERE {same_rollup.format("r")}
+                RETURNING r.*
+            ), inserted AS (
+                INSERT INTO {table} (
+                    id, created_at, updated_at, user_id, periodicity,
+                    period_start, {fields}
+                )
+                SELECT c.id, %s, %s, c.user_id, c.periodicity, c.period_start,
+                    {", ".join(f"c.{field}" for field in ROLLUP_FIELDS)}
+                FROM c
+                WHERE NOT EXISTS (
+                    SELECT FROM updated WHERE {same_rollup.format("updated")}
+                )
+                RETURNING *
+            )
+            SELECT * FROM updated UNION ALL SELECT * FROM inserted
+            """,
+            [*params, now, now, now],
+        )
+    )
+
+
+def refresh_rollups(user_days):
+    """
+    Updates the daily, weekly, monthly and yearly rollups containing the
+    given (user_id, day) pairs, after their attendances changed.
+
+    Only the attendances of the pairs are read: the daily rollup of a pair
+    holds the totals of its attendance as last applied, and the difference
+    with the current totals is added to the weekly, monthly and yearly
+    rollups (upserted with the new daily rollups in a single query).
+    Rollups left without attendances are deleted, and the cached KPIs, the
+    snapshots and the leaderboards of these periods are updated.
+    rebuild_rollups recomputes the rollups from scratch.
+    """
+    user_days = {(str(user_id), day) for user_id, day in user_days}
+    if not user_days:
+        return
+
+    user_ids = {user_id for user_id, _ in user_days}
+    days = {day for _, day in user_days}
+    daily = PeriodicityChoices.DAILY.value
+    zeros = [0] * len(ROLLUP_FIELDS)
+
+    with transaction.atomic(savepoint=False):
+        _lock_users(user_ids)
+        totals = {
+            (row["user_id"], row["period_start"]): _get_values(_to_rollup(row))
+            for row in _get_totals(
+                Attendance.objects.filter(user_id__in=user_ids, day__in=days), daily
+            )
+        }
+        applied = {
+            (rollup.user_id, rollup.period_start): _get_values(rollup)
+            for rollup in AttendanceRollup.objects.filter(
+                periodicity=daily, user_id__in=user_ids, period_start__in=days
+            )
+        }
+
+        changes = {}
+        for user_id, day in user_days:
+            values = totals.get((user_id, day), zeros)
+            delta = [
+                new - old
+                for new, old in zip(values, applied.get((user_id, day), zeros))
+            ]
+            if not any(delta):
+                continue
+            changes[(user_id, daily, day)] = values
+            for periodicity in PERIOD_STARTS.keys() - {daily}:
+                key = (user_id, periodicity, get_period_bounds(periodicity, day)[0])
+                changes[key] = [
+                    total + change
+                    for total, change in zip(changes.get(key, zeros), delta)
+                ]
+
+        rollups = _apply_changes(changes) if changes else []
+        empty = [rollup for rollup in rollups if not rollup.days]
+        if empty:
+            AttendanceRollup.objects.filter(pk__in=[r.pk for r in empty]).delete()
+
+    invalidate_user_kpis(user_days)
+    snapshots.invalidate_days(days)
+    update_leaderboards(
+        [rollup for rollup in rollups if rollup.days],
+        {(r.user_id, r.periodicity, r.period_start) for r in empty},
+    )
+
+
+def rebuild_rollups(user_ids=None) -> int:
+    """
+    Recomputes all the rollups (of the given users) from the attendances.
+    Returns the number of rollups saved.
+
+    The rollups of the archived months are kept, those of the periods
+    straddling the archive boundary also count the archived attendances.
+    """
+    attendances = Attendance.objects.all()
+    rollups = AttendanceRollup.objects.all()
+    archived_until = archive.get_archived_until()
+    if archived_until is not None:
+        rollups = rollups.filter(period_start__gt=archived_until)
+    if user_ids is not None:
+        attendances = attendances.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    saved = 0
+    with transaction.atomic():
+        rollups.delete()
+        for periodicity in PERIOD_STARTS:
+            batch = [
+                _to_rollup(row)
+                for row in _get_totals(attendances, periodicity).iterator()
+            ]
+            if archived_until is not None:
+                batch = _add_archived_totals(
+                    batch,
+                    {
+                        (r.user_id, r.periodicity, r.period_start)
+                        for r in batch
+                        if r.period_start <= archived_until
+                    },
+                )
+            _save_rollups(batch)
+            update_leaderboards(batch)
+            saved += len(batch)
+
+    return saved
+
+
+def rebuild_leaderboards() -> int:
+    """
+    Reconstructs all the leaderboards from the rollups (which also cover the
+    archived attendances). Returns the number of (user, period) scores
+    written.
+    """
+    get_leaderboards().clear()
+
+    saved = 0
+    for periodicity in RANKED_PERIODICITIES:
+        batch = []
+        rollups = AttendanceRollup.objects.filter(periodicity=periodicity)
+        for rollup in rollups.iterator(chunk_size=1000):
+            batch.append(rollup)
+            if len(batch) == 1000:
+                update_leaderboards(batch)
+                saved += len(batch)
+                batch = []
+        update_leaderboards(batch)
+        saved += len(batch)
+
+    return saved
+
+
+def refresh_team_kpis():
+    """
+    Refreshes the team KPIs materialized view from the rollups, without
+    blocking its readers.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"REFRESH MATERIALIZED VIEW CONCURRENTLY {TeamKPIs._meta.db_table}"
+        )
+    invalidate_team_kpis()
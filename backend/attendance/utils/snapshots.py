@@ -0,0 +1,435 @@
+# attendance/utils/snapshots.py
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from itertools import chain, islice
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from attendance.models import Attendance
+from attendance.utils import archive
+
+MANIFEST = "manifest.json"
+SEGMENTS_DIR = "segments"
+
+# Column files of a segment: one row per attendance, users are stored as
+# their index in the manifest (append-only, so indexes never change)
+COLUMNS = {
+    "user": np.int32,
+    "day": "datetime64[D]",
+    "check_in": np.float64,  # epoch seconds, NaN without check-in
+    "check_out": np.float64,  # epoch seconds, NaN without check-out
+    "is_excused": np.bool_,
+}
+
+TOTALS = (
+    "days",
+    "delayed_days",
+    "extra_days",
+    "absent_days",
+    "worked_seconds",
+    "delay_seconds",
+    "extra_seconds",
+)
+
+# Cache keys of the sequence number of the last change of a snapshotted
+# month, and of the sequence
+CHANGED_KEY_PREFIX = "attendance:snapshots:changed:"
+SEQUENCE_KEY = "attendance:snapshots:sequence"
+
+# Memory-mapped columns of the segments (immutable, named uniquely)
+_segments = {}
+_segments_lock = threading.Lock()
+# {path: (file version, manifest)} of the parsed manifests
+_manifests = {}
+
+
+def get_snapshot_dir():
+    """Returns the snapshots directory, None if snapshots are disabled."""
+    return settings.ATTENDANCE_SNAPSHOT_DIR or None
+
+
+def read_manifest(directory=None) -> dict:
+    """
+    Returns the manifest of the snapshots: the user ids (by index), the
+    segments names, `closed_until`, the last snapshotted day, and
+    `sequence`, the sequence number taken before the segments were read
+    (see invalidate_days). `exporting_until` is the last day of an export
+    in progress.
+    """
+    directory = directory or get_snapshot_dir()
+    try:
+        with open(os.path.join(directory, MANIFEST)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {
+            "users": [],
+            "segments": [],
+            "closed_until": None,
+        }
+
+
+def _load_manifest(directory) -> dict:
+    # Parsed manifest, shared by the readers until the file is replaced
+    path = os.path.join(directory, MANIFEST)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return read_manifest(directory)
+
+    version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    cached = _manifests.get(path)
+    if cached is None or cached[0] != version:
+        cached = _manifests[path] = (version, read_manifest(directory))
+    return cached[1]
+
+
+def _write_manifest(directory, manifest: dict):
+    # Replacing the manifest publishes the new segments atomically
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, MANIFEST)
+    with open(f"{path}.tmp", "w") as file:
+        json.dump(manifest, file)
+    os.replace(f"{path}.tmp", path)
+
+
+def _get_first_day(manifest: dict):
+    return min(
+        (date.fromisoformat(name.split("_")[0]) for name in manifest["segments"]),
+        default=None,
+    )
+
+
+def _iter_months(start, end):
+    month = start.replace(day=1)
+    while month <= end:
+        yield month
+        month = (month + timedelta(days=31)).replace(day=1)
+
+
+def _changed_key(month) -> str:
+    return f"{CHANGED_KEY_PREFIX}{month:%Y-%m}"
+
+
+def _next_sequence() -> int:
+    # Seeded with the time, so that it keeps increasing if the cache is lost
+    cache.add(SEQUENCE_KEY, time.time_ns() // 1_000_000, None)
+    return cache.incr(SEQUENCE_KEY)
+
+
+def _mark_changed(months):
+    sequence = _next_sequence()
+    cache.set_many({_changed_key(month): sequence for month in months}, None)
+
+
+def invalidate_days(days):
+    """
+    Marks the months of the snapshotted days (or being snapshotted) as
+    changed: the snapshots do not serve them until they are rebuilt (see
+    export_attendance_snapshots). Done again once the transaction is
+    committed, so that an export reading the attendances meanwhile does not
+    miss the change.
+
+    Archiving or restoring attendances does not change them, the snapshots
+    read the archived ones from the archive.
+    """
+    directory = get_snapshot_dir()
+    if not directory:
+        return
+
+    manifest = _load_manifest(directory)
+    horizon = max(
+        (
+            date.fromisoformat(day)
+            for day in (manifest["closed_until"], manifest.get("exporting_until"))
+            if day
+        ),
+        default=None,
+    )
+    months = {day.replace(day=1) for day in days if horizon and day <= horizon}
+    if months:
+        _mark_changed(months)
+        transaction.on_commit(lambda: _mark_changed(months))
+
+
+def get_changed_months(manifest: dict, start=None, end=None) -> list:
+    """
+    Returns the months from `start` to `end` (all the snapshotted ones by
+    default) whose attendances changed since the snapshots were built.
+    """
+    first_day = _get_first_day(manifest)
+    if first_day is None:
+        return []
+
+    start = max(start or first_day, first_day)
+    end = min(end or date.max, date.fromisoformat(manifest["closed_until"]))
+    months = {_changed_key(month): month for month in _iter_months(start, end)}
+    changed = cache.get_many(months)
+    return sorted(
+        months[key]
+        for key, sequence in changed.items()
+        if sequence > manifest.get("sequence", 0)
+    )
+
+
+def get_snapshot(start, end):
+    """
+    Returns the manifest of the snapshots if the KPIs from `start` to `end`
+    can be computed from them (closed days, unchanged since the snapshots
+    were built), None otherwise.
+    """
+    directory = get_snapshot_dir()
+    if not directory:
+        return None
+
+    manifest = _load_manifest(directory)
+    closed_until = manifest["closed_until"]
+    if not closed_until or end > date.fromisoformat(closed_until):
+        return None
+    if get_changed_months(manifest, start, end):
+        return None
+    return manifest
+
+
+def _export_segment(directory, manifest: dict, until) -> int:
+    """
+    Appends the attendances of the days after the `closed_until` of the
+    manifest up to `until` (included) to the manifest as a new segment,
+    without publishing it. Returns the number of rows.
+    """
+    if manifest["closed_until"]:
+        start = date.fromisoformat(manifest["closed_until"]) + timedelta(days=1)
+    else:
+        start = date.min
+    if start > until:
+        return 0
+
+    user_indexes = {user_id: index for index, user_id in enumerate(manifest["users"])}
+    rows = (
+        Attendance.objects.filter(day__range=(start, until))
+        .order_by("day", "user_id")
+        .values_list("user_id", "day", "check_in", "check_out", "is_excused")
+        .iterator(chunk_size=settings.ATTENDANCE_EXPORT_CHUNK_SIZE)
+    )
+    if start < archive.get_hot_start():
+        archived = (
+            (a.user_id, a.day, a.check_in, a.check_out, a.is_excused)
+            for attendances in archive.iter_archived(start, until)
+            for a in attendances
+        )
+        rows = chain(archived, rows)
+
+    # Converted to arrays chunk by chunk to keep the memory per row low
+    chunks = {column: [] for column in COLUMNS}
+    while chunk := list(islice(rows, settings.ATTENDANCE_EXPORT_CHUNK_SIZE)):
+        user_ids, days, check_ins, check_outs, excused = zip(*chunk)
+        for user_id in user_ids:
+            if user_id not in user_indexes:
+                user_indexes[user_id] = len(manifest["users"])
+                manifest["users"].append(user_id)
+
+        for column, values in (
+            ("user", [user_indexes[user_id] for user_id in user_ids]),
+            ("day", days),
+            ("check_in", [c.timestamp() if c else np.nan for c in check_ins]),
+            ("check_out", [c.timestamp() if c else np.nan for c in check_outs]),
+            ("is_excused", excused),
+        ):
+            chunks[column].append(np.array(values, dtype=COLUMNS[column]))
+
+    count = sum(len(chunk) for chunk in chunks["user"])
+    if count:
+        first_day = (
+            min(days.min() for days in chunks["day"]) if start == date.min else start
+        )
+        name = f"{first_day}_{until}_{uuid.uuid4().hex[:8]}"
+        path = os.path.join(directory, SEGMENTS_DIR, name)
+        os.makedirs(f"{path}.tmp")
+        for column in COLUMNS:
+            np.save(
+                os.path.join(f"{path}.tmp", f"{column}.npy"),
+                np.concatenate(chunks[column]),
+            )
+        os.replace(f"{path}.tmp", path)
+        manifest["segments"].append(name)
+
+    manifest["closed_until"] = until.isoformat()
+    return count
+
+
+def _announce_export(directory, manifest: dict, until):
+    # Changes of the days being exported are marked from now on (see
+    # invalidate_days), before the attendances are read
+    _write_manifest(directory, {**manifest, "exporting_until": until.isoformat()})
+
+
+def export_snapshots(until) -> int:
+    """
+    Appends the attendances of the days after the last snapshotted day up to
+    `until` (included) as a new segment. Returns the number of rows.
+
+    Days are expected to be closed: the months of snapshotted days which
+    change later are not served from the snapshots until rebuild_snapshots.
+    Archived attendances are read from the archive.
+    """
+    directory = get_snapshot_dir()
+    manifest = read_manifest(directory)
+    manifest.pop("exporting_until", None)
+    if (
+        manifest["closed_until"]
+        and date.fromisoformat(manifest["closed_until"]) >= until
+    ):
+        return 0
+
+    manifest.setdefault("sequence", _next_sequence())
+    _announce_export(directory, manifest, until)
+    count = _export_segment(directory, manifest, until)
+    _write_manifest(directory, manifest)
+    return count
+
+
+def rebuild_snapshots(until) -> int:
+    """
+    Replaces the snapshots by a new generation: a single segment of the
+    days up to `until`, published by replacing the manifest. The segments
+    of the previous generation are kept for the readers which loaded its
+    manifest, older ones are removed.
+    """
+    directory = get_snapshot_dir()
+    previous = read_manifest(directory)
+    previous.pop("exporting_until", None)
+    manifest = {
+        "users": [],
+        "segments": [],
+        "closed_until": None,
+        "sequence": _next_sequence(),
+    }
+
+    _announce_export(directory, previous, until)
+    rows = _export_segment(directory, manifest, until)
+    _write_manifest(directory, manifest)
+
+    kept = {*previous["segments"], *manifest["segments"]}
+    segments_dir = os.path.join(directory, SEGMENTS_DIR)
+    for name in os.listdir(segments_dir) if os.path.isdir(segments_dir) else []:
+        if name not in kept:
+            shutil.rmtree(os.path.join(segments_dir, name), ignore_errors=True)
+    return rows
+
+
+def _load_segments(directory, names) -> dict:
+    """Returns {name: {column: memory-mapped array}} of the segments."""
+    with _segments_lock:
+        # Segments replaced by a rebuild
+        for name in set(_segments) - set(names):
+            del _segments[name]
+
+        for name in names:
+            if name not in _segments:
+                path = os.path.join(directory, SEGMENTS_DIR, name)
+                _segments[name] = {
+                    column: np.load(os.path.join(path, f"{column}.npy"), mmap_mode="r")
+                    for column in COLUMNS
+                }
+        return dict(_segments)
+
+
+def compute_totals(start, end, user_ids=None, manifest=None) -> dict:
+    """
+    Returns {user_id: {days, delayed_days, ..., extra_seconds}} over the
+    snapshotted attendances from `start` to `end` (of the given users), with
+    the same definitions as the attendance rollups. `manifest` is the one
+    returned by get_snapshot, loaded by default.
+    """
+    directory = get_snapshot_dir()
+    manifest = manifest or _load_manifest(directory)
+    users = manifest["users"]
+    sums = {field: np.zeros(len(users)) for field in TOTALS}
+
+    expected_work_seconds = (settings.CHECK_OUT_HOUR - settings.CHECK_IN_HOUR) * 3600
+    check_in_seconds = settings.CHECK_IN_HOUR * 3600
+    allowed = None
+    if user_ids is not None:
+        indexes = {user_id: index for index, user_id in enumerate(users)}
+        allowed = np.zeros(len(users), dtype=bool)
+        allowed[[indexes[u] for u in map(str, user_ids) if u in indexes]] = True
+
+    segments = _load_segments(directory, manifest["segments"])
+    for name, segment in segments.items():
+        first_day, last_day, _suffix = name.split("_")
+        if date.fromisoformat(first_day) > end or date.fromisoformat(last_day) < start:
+            continue
+
+        mask = (segment["day"] >= np.datetime64(start)) & (
+            segment["day"] <= np.datetime64(end)
+        )
+        if allowed is not None:
+            mask &= allowed[segment["user"]]
+        if not mask.any():
+            continue
+
+        user = segment["user"][mask]
+        check_in = segment["check_in"][mask]
+        check_out = segment["check_out"][mask]
+        is_excused = segment["is_excused"][mask]
+
+        # Same definitions as AttendanceQuerySet (days are UTC days)
+        worked = np.nan_to_num(check_out - check_in, nan=0.0)
+        extra = worked - expected_work_seconds
+        delay = np.nan_to_num(check_in % 86400 - check_in_seconds, nan=0.0)
+        absent = ~is_excused & np.isnan(check_in)
+
+        for field, weights in (
+            ("days", None),
+            ("delayed_days", delay > 0),
+            ("extra_days", extra > 0),
+            ("absent_days", absent),
+            ("worked_seconds", worked),
+            ("delay_seconds", np.where(delay > 0, delay, 0.0)),
+            ("extra_seconds", np.where(extra > 0, extra, 0.0)),
+        ):
+            sums[field] += np.bincount(user, weights=weights, minlength=len(users))
+
+    present = np.flatnonzero(sums["days"])
+    return {
+        users[index]: {
+            field: (
+                float(sums[field][index])
+                if field.endswith("seconds")
+                else int(sums[field][index])
+            )
+            for field in TOTALS
+        }
+        for index in present
+    }
+
+
+def get_best_performers(start, end, count=3, user_ids=None, manifest=None):
+    """
+    Returns the `count` users with the most worked seconds from `start` to
+    `end`, as [{"user": <user_id>, "total_worked_seconds": <float>}, ...].
+    """
+    totals = compute_totals(start, end, user_ids, manifest)
+    users = np.array(list(totals), dtype=object)
+    worked = np.array([total["worked_seconds"] for total in totals.values()])
+
+    # Top-K without sorting every user, then ordered as the SQL ranking
+    if len(worked) > count:
+        top = np.argpartition(-worked, count - 1)[:count]
+        threshold = worked[top].min()
+        top = np.flatnonzero(worked >= threshold)
+    else:
+        top = np.arange(len(worked))
+    ranked = sorted(top, key=lambda index: (-worked[index], users[index]))[:count]
+
+    return [
+        {"user": users[index], "total_worked_seconds": float(worked[index])}
+        for index in ranked
+    ]
@@ -1,8 +1,19 @@
 from .base import AttendanceClocksView as AttendanceClocksView
+from .base import AttendanceClocksSyncView as AttendanceClocksSyncView
 from .base import AttendanceViewSet as AttendanceViewSet
+from .base import AttendanceExportView as AttendanceExportView
 
 from .kpis import UserKPIsView as UserKPIsView
+from .kpis import UsersKPIsView as UsersKPIsView
 from .kpis import UserWorkHoursView as UserWorkHoursView
+from .kpis import UserStandingView as UserStandingView
 from .kpis import BestPerformersView as BestPerformersView
+from .kpis import BestPerformerRankView as BestPerformerRankView
 from .kpis import TeamKPIsView as TeamKPIsView
+from .kpis import TeamsKPIsView as TeamsKPIsView
 from .kpis import TeamBestPerformersView as TeamBestPerformersView
+
+from .reports import ReportJobCreateView as ReportJobCreateView
+from .reports import ReportJobView as ReportJobView
+from .reports import ReportJobCancelView as ReportJobCancelView
+from .reports import ReportJobDownloadView as ReportJobDownloadView
@@ -1,9 +1,22 @@
 # attendance - views.py
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
 
-from rest_framework import viewsets, generics, permissions
+from rest_framework import viewsets, generics, permissions, status
+from rest_framework.response import Response
 
+from attendance.constants import ClockIngestionChoices
 from attendance.models import Attendance
-from attendance.serializers import AttendanceSerializer, AttendanceClocksSerializer
+from attendance.serializers import (
+    AttendanceExportSerializer,
+    AttendanceSerializer,
+    AttendanceClocksSerializer,
+    AttendanceClocksSyncSerializer,
+)
+from attendance.utils.exports import get_export_rows, stream_csv
+from users.authentication import ClaimsJWTAuthentication
+from users.permissions import IsCompanyAdmin
 
 
 class AttendanceViewSet(viewsets.ModelViewSet):
@@ -15,7 +28,73 @@ class AttendanceClocksView(generics.CreateAPIView):
     """
     POST /api/clocks/
     Allows the authenticated user to clock in or out.
+
+    In stream ingestion mode (ATTENDANCE_CLOCK_INGESTION=stream), the clock is
+    buffered and persisted asynchronously: the response is a 202 Accepted.
     """
 
     serializer_class = AttendanceClocksSerializer
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def create(self, request, *args, **kwargs):
+        if settings.ATTENDANCE_CLOCK_INGESTION != ClockIngestionChoices.STREAM:
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        event_id = serializer.publish()
+
+        return Response(
+            {
+                "message": _("Clock successfully received."),
+                "is_check_in_action": serializer.validated_data["is_check_in_action"],
+                "event_id": event_id,
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class AttendanceClocksSyncView(generics.GenericAPIView):
+    """
+    POST /api/clocks/sync/
+    Replays clocks recorded offline (kiosks, mobile app) in a single request.
+    Managers and company admins can sync clocks of any user, other users only
+    their own. Each event gets its own result status.
+    """
+
+    serializer_class = AttendanceClocksSyncSerializer
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.save()
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class AttendanceExportView(generics.GenericAPIView):
+    """
+    GET /api/attendance/export/?start=2025-10-01&end=2025-10-31&team_id=<id>
+    Streams the attendances of the range (default: current month) as CSV,
+    with their worked, extra and delay seconds, optionally filtered by user
+    or team. Rows are sent while they are read from the database.
+    """
+
+    serializer_class = AttendanceExportSerializer
+    permission_classes = [IsCompanyAdmin]
+
+    def get(self, request):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        rows = get_export_rows(
+            params["start"], params["end"], params.get("user"), params.get("team")
+        )
+        response = StreamingHttpResponse(stream_csv(rows), content_type="text/csv")
+        response["Content-Disposition"] = (
+            f'attachment; filename="attendance_{params["start"]}_{params["end"]}.csv"'
+        )
+        return response
@@ -1,15 +1,27 @@
 # attendance/views/kpis.py
-from rest_framework import generics
+from functools import cached_property
+
+from rest_framework import filters, generics, permissions
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
-from attendance.constants import PeriodicityChoices
-from attendance.serializers import BestPerformersSerializer
+from django.db.models import Count
+from attendance.serializers import (
+    BestPerformersSerializer,
+    KPIRangeSerializer,
+    RankingSerializer,
+    TeamKPIsSerializer,
+    UsersKPIsSerializer,
+    WorkHoursSerializer,
+)
+from attendance.utils.kpi_cache import get_team_kpis, get_user_kpis, get_work_hours
 from attendance.utils.kpi_helpers import (
-    compute_user_kpis,
-    compute_team_kpis,
-    compute_work_hours,
-    get_best_performers,
+    annotate_team_kpis,
+    compute_user_standing,
+    compute_users_kpis,
 )
+from attendance.utils.leaderboards import RANKED_PERIODICITIES, get_user_rank
+from users.authentication import ClaimsJWTAuthentication
 from users.permissions import IsCompanyAdmin, IsSelfOrManagerOrCompanyAdmin
 from teams.models import Team
 
@@ -19,34 +31,99 @@ User = get_user_model()
 class UserKPIsView(generics.GenericAPIView):
     """
     GET /api/kpis/<user_id>/?periodicity=monthly
+    GET /api/kpis/<user_id>/?start=2025-01-01&end=2025-03-31
+    GET /api/kpis/<user_id>/?last=30&unit=business_days
     Returns KPI metrics for a specific user.
     """
 
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsSelfOrManagerOrCompanyAdmin]
+    serializer_class = KPIRangeSerializer
 
     def get(self, request, user_id):
-        periodicity = request.query_params.get(
-            "periodicity", PeriodicityChoices.MONTHLY.value
-        )
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
         user = User.objects.get(id=user_id)
-        data = compute_user_kpis(user, periodicity)
+        data = get_user_kpis(
+            user, serializer.validated_data["start"], serializer.validated_data["end"]
+        )
+        return Response(data)
+
+
+class UsersKPIsView(generics.GenericAPIView):
+    """
+    GET /api/kpis/users/?user_ids=<id>,<id>&periodicity=monthly
+    GET /api/kpis/users/?team_id=<team_id>&periodicity=monthly
+    Returns KPI metrics for several users (or the members of a team) at once.
+    """
+
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsSelfOrManagerOrCompanyAdmin]
+    serializer_class = UsersKPIsSerializer
+
+    @cached_property
+    def params(self):
+        serializer = self.get_serializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def get_target_user_ids(self):
+        """Users whose KPIs are requested, for IsSelfOrManagerOrCompanyAdmin."""
+        return self.params["user_ids"]
+
+    def get(self, request):
+        data = compute_users_kpis(
+            self.get_target_user_ids(), self.params["start"], self.params["end"]
+        )
         return Response(data)
 
 
 class UserWorkHoursView(generics.GenericAPIView):
     """
-    GET /api/workhours/<user_id>/?periodicity=weekly
-    Returns total worked hours per day/month for graphs.
+    GET /api/workhours/<user_id>/?periodicity=yearly&granularity=week
+    Returns total worked hours per day/week/month for graphs.
     """
 
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsSelfOrManagerOrCompanyAdmin]
+    serializer_class = WorkHoursSerializer
 
     def get(self, request, user_id):
-        periodicity = request.query_params.get(
-            "periodicity", PeriodicityChoices.WEEKLY.value
-        )
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
         user = User.objects.get(id=user_id)
-        data = compute_work_hours(user, periodicity)
+        data = get_work_hours(
+            user,
+            serializer.validated_data["start"],
+            serializer.validated_data["end"],
+            serializer.validated_data["granularity"],
+        )
+        return Response(data)
+
+
+class UserStandingView(generics.GenericAPIView):
+    """
+    GET /api/kpis/standing/<user_id>/?periodicity=monthly&team_id=<team_id>
+    Returns the rank, percentile and neighbours of a user for worked hours,
+    punctuality and extra hours, company-wide or within a team.
+    """
+
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsSelfOrManagerOrCompanyAdmin]
+    serializer_class = RankingSerializer
+
+    def get(self, request, user_id):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        data = compute_user_standing(
+            user_id,
+            serializer.validated_data["start"],
+            serializer.validated_data["end"],
+            serializer.validated_data.get("team"),
+        )
         return Response(data)
 
 
@@ -56,6 +133,7 @@ class BestPerformersView(generics.GenericAPIView):
     Returns top N best performers based on worked hours.
     """
 
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsCompanyAdmin]
     serializer_class = BestPerformersSerializer
     queryset = []
@@ -74,26 +152,121 @@ class TeamKPIsView(generics.GenericAPIView):
     Returns KPI metrics aggregated for a given team.
     """
 
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsCompanyAdmin]
+    serializer_class = KPIRangeSerializer
 
     def get(self, request, team_id):
-        periodicity = request.query_params.get("periodicity", "monthly")
-        team = Team.objects.get(id=team_id)
-        data = compute_team_kpis(team, periodicity)
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        # Members counted in the lookup of the team, not prefetched
+        team = (
+            Team.objects.select_related(None)
+            .prefetch_related(None)
+            .annotate(members_count=Count("members"))
+            .get(id=team_id)
+        )
+        data = get_team_kpis(
+            team, serializer.validated_data["start"], serializer.validated_data["end"]
+        )
         return Response(data)
 
 
+class TeamsKPIsPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class TeamsKPIsView(generics.ListAPIView):
+    """
+    GET /api/kpis/teams/?periodicity=monthly&ordering=-delay_rate&page=1
+    Returns the KPI metrics of every team, sortable and paginated.
+    """
+
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsCompanyAdmin]
+    serializer_class = TeamKPIsSerializer
+    pagination_class = TeamsKPIsPagination
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = [
+        "name",
+        "members_count",
+        "delay_rate",
+        "delay_seconds",
+        "extra_rate",
+        "extra_seconds",
+        "absent_days",
+    ]
+    ordering = ["name"]
+
+    def get_queryset(self):
+        serializer = KPIRangeSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        return annotate_team_kpis(
+            Team.objects.all(),
+            serializer.validated_data["start"],
+            serializer.validated_data["end"],
+        )
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # Stable pages when teams are equal on the sorted KPI
+        return queryset.order_by(*queryset.query.order_by, "pk")
+
+
 class TeamBestPerformersView(generics.GenericAPIView):
     """
     GET /api/teams/<team_id>/best-performers/?periodicity=monthly&count=3
     Returns best performers (top N) within a team.
     """
 
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsCompanyAdmin]
+    serializer_class = BestPerformersSerializer
 
     def get(self, request, team_id):
-        periodicity = request.query_params.get("periodicity", "monthly")
-        count = int(request.query_params.get("count", 3))
-        team = Team.objects.get(id=team_id)
-        data = get_best_performers(team, periodicity, count)
+        team = generics.get_object_or_404(Team.objects.all(), id=team_id)
+        serializer = self.get_serializer(
+            data=request.query_params,
+            context={**self.get_serializer_context(), "team": team},
+        )
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.to_representation(instance=None)
+        return Response(data)
+
+
+class BestPerformerRankView(generics.GenericAPIView):
+    """
+    GET /api/kpis/best-performers/me/?periodicity=monthly&team_id=<team_id>
+    Returns the rank of the current user by worked hours, company-wide or
+    within a team.
+    """
+
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = RankingSerializer
+
+    def get(self, request):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        if params["periodicity"] in RANKED_PERIODICITIES:
+            data = get_user_rank(
+                request.user.id, params["periodicity"], params.get("team")
+            )
+        else:
+            standing = compute_user_standing(
+                request.user.id, params["start"], params["end"], params.get("team")
+            )
+            data = {
+                "user": standing["user"],
+                "rank": standing["worked_hours"]["rank"],
+                "total_worked_seconds": standing["worked_hours"]["value"] or 0.0,
+                "ranked_users": standing["ranked_users"],
+            }
         return Response(data)
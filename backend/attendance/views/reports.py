@@ -0,0 +1,83 @@
+# attendance/views/reports.py
+from django.db import transaction
+from django.http import FileResponse
+from django.utils.translation import gettext_lazy as _
+from rest_framework import generics, status
+from rest_framework.response import Response
+
+from attendance.constants import ReportStatusChoices
+from attendance.models import ReportJob
+from attendance.serializers import ReportJobCreateSerializer, ReportJobSerializer
+from attendance.tasks import build_report
+from attendance.utils.reports import cancel_report
+from users.permissions import IsCompanyAdmin
+
+
+class ReportJobMixin:
+    permission_classes = [IsCompanyAdmin]
+    serializer_class = ReportJobSerializer
+    lookup_url_kwarg = "job_id"
+
+    def get_queryset(self):
+        return ReportJob.objects.filter(created_by_id=self.request.user.pk)
+
+
+class ReportJobCreateView(ReportJobMixin, generics.CreateAPIView):
+    """
+    POST /api/reports/
+    Enqueues a report (attendance export or monthly team timesheets) built
+    in the background. Returns the job to poll, with a 202 Accepted.
+    """
+
+    serializer_class = ReportJobCreateSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save()
+        transaction.on_commit(lambda: build_report.delay(job.id))
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class ReportJobView(ReportJobMixin, generics.RetrieveAPIView):
+    """
+    GET /api/reports/<job_id>/
+    Returns the status and progress of a report job.
+    """
+
+
+class ReportJobCancelView(ReportJobMixin, generics.GenericAPIView):
+    """
+    POST /api/reports/<job_id>/cancel/
+    Cancels a pending or running report job.
+    """
+
+    def post(self, request, job_id):
+        job = self.get_object()
+        if not cancel_report(job):
+            return Response(
+                {"detail": _("The report is already finished.")},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(self.get_serializer(job).data)
+
+
+class ReportJobDownloadView(ReportJobMixin, generics.GenericAPIView):
+    """
+    GET /api/reports/<job_id>/download/
+    Downloads the file of a succeeded report job.
+    """
+
+    def get(self, request, job_id):
+        job = self.get_object()
+        if job.status != ReportStatusChoices.SUCCEEDED or not job.file:
+            return Response(
+                {"detail": _("The report is not ready.")},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return FileResponse(
+            job.file.open("rb"),
+            as_attachment=True,
+            filename=f"{job.kind}_{job.parameters['start']}_{job.parameters['end']}.csv",
+            content_type="text/csv",
+        )
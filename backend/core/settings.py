@@ -21,6 +21,7 @@ except ImportError:
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
+ENV = os.getenv("ENV", "dev")
 SITE_NAME = os.getenv("SITE_NAME", "Time Manager App")
 
 
@@ -71,6 +72,7 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "AUTH_HEADER_TYPES": ("Bearer",),
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.TokenRefreshSerializer",
 }
 
 SPECTACULAR_SETTINGS = {
@@ -192,12 +194,32 @@ CELERY_TIMEZONE = "Africa/Porto-Novo"
 
 # Celery beat scheduler
 CELERY_BEAT_SCHEDULE = {
+    "create-attendance-partitions": {
+        "task": "attendance.tasks.create_attendance_partitions",
+        "schedule": crontab(hour=0, minute=0),  # Before the daily attendances
+    },
     "create-daily-attendance": {
         "task": "attendance.tasks.create_daily_attendance_records",
         "schedule": crontab(
             hour=0, minute=5, day_of_week="1-5"
         ),  # Monday to Friday at 00:05
     },
+    "export-attendance-snapshots": {
+        "task": "attendance.tasks.export_attendance_snapshots",
+        "schedule": crontab(hour=1, minute=0),  # Every day at 01:00
+    },
+    "archive-attendance": {
+        "task": "attendance.tasks.archive_attendance",
+        "schedule": crontab(
+            hour=2, minute=0, day_of_month=1
+        ),  # Every month (closed years are archived in January)
+    },
+    "refresh-team-kpis": {
+        "task": "attendance.tasks.refresh_team_kpis",
+        "schedule": timedelta(
+            seconds=int(os.getenv("ATTENDANCE_TEAM_KPIS_REFRESH_INTERVAL", "300"))
+        ),
+    },
 }
 CELERY_WORKER_MAX_TASKS_PER_CHILD = 1
 CELERY_WORKER_SEND_TASK_EVENTS = True
@@ -230,3 +252,103 @@ COMPANY_LONGITUDE = float(os.getenv("COMPANY_LONGITUDE", 2.429160219575613))
 
 # Authorized radius (in meters) around company location for attendance
 ATTENDANCE_LOCATION_RADIUS = int(os.getenv("ATTENDANCE_LOCATION_RADIUS", 150))
+# The company location is only used while no attendance Site is configured.
+# Seconds after which a process rebuilds its in-memory index of the sites
+ATTENDANCE_SITE_INDEX_TTL = int(os.getenv("ATTENDANCE_SITE_INDEX_TTL", "300"))
+
+# Clock ingestion mode: "direct" writes each clock to the database within the
+# request, "stream" appends it to a Redis stream persisted in batches by Celery
+ATTENDANCE_CLOCK_INGESTION = os.getenv("ATTENDANCE_CLOCK_INGESTION", "direct")
+# Use "memory://" for an in-process stream (tests, local development)
+ATTENDANCE_CLOCK_STREAM_URL = os.getenv(
+    "ATTENDANCE_CLOCK_STREAM_URL", CELERY_BROKER_URL
+)
+ATTENDANCE_CLOCK_STREAM_NAME = os.getenv(
+    "ATTENDANCE_CLOCK_STREAM_NAME", "attendance:clocks"
+)
+ATTENDANCE_CLOCK_STREAM_BATCH_SIZE = int(
+    os.getenv("ATTENDANCE_CLOCK_STREAM_BATCH_SIZE", "500")
+)
+# Deliveries after which the entries of a failing batch are moved to the
+# "<ATTENDANCE_CLOCK_STREAM_NAME>:dead" stream
+ATTENDANCE_CLOCK_STREAM_MAX_DELIVERIES = int(
+    os.getenv("ATTENDANCE_CLOCK_STREAM_MAX_DELIVERIES", "5")
+)
+if ATTENDANCE_CLOCK_INGESTION == "stream":
+    CELERY_BEAT_SCHEDULE["persist-clock-events"] = {
+        "task": "attendance.tasks.persist_clock_events",
+        "schedule": timedelta(
+            seconds=int(os.getenv("ATTENDANCE_CLOCK_FLUSH_INTERVAL", "2"))
+        ),
+    }
+
+# Maximum number of clock events accepted by /api/clocks/sync/ per request
+ATTENDANCE_CLOCK_SYNC_MAX_EVENTS = int(
+    os.getenv("ATTENDANCE_CLOCK_SYNC_MAX_EVENTS", "1000")
+)
+# Seconds after which a clock recorded offline is too old to be synced
+ATTENDANCE_CLOCK_SYNC_MAX_AGE = int(
+    os.getenv("ATTENDANCE_CLOCK_SYNC_MAX_AGE", str(7 * 24 * 3600))
+)
+
+# Seconds after which the group registry of a process (users.utils.get_group)
+# picks up the group changes made by the other processes
+GROUP_REGISTRY_CHECK_INTERVAL = int(os.getenv("GROUP_REGISTRY_CHECK_INTERVAL", "5"))
+
+# Token versions (access token revocation) are cached for this many seconds
+# by users.authentication.ClaimsJWTAuthentication
+TOKEN_VERSION_CACHE_TIMEOUT = int(os.getenv("TOKEN_VERSION_CACHE_TIMEOUT", "60"))
+
+# Cache shared by all the processes (KPI results, token versions)
+CACHES = {
+    "default": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CACHE_URL", "redis://localhost:6379/1"),
+        }
+        if ENV != "test"
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+}
+# Seconds a KPI result stays cached (it is also invalidated on writes)
+KPI_CACHE_TIMEOUT = int(os.getenv("KPI_CACHE_TIMEOUT", "300"))
+# Seconds concurrent misses wait for the computation of the first one
+KPI_CACHE_LOCK_TIMEOUT = int(os.getenv("KPI_CACHE_LOCK_TIMEOUT", "10"))
+
+# Best performers leaderboards (sorted sets per period and per team). Use
+# "memory://" for in-process leaderboards (tests, local development)
+ATTENDANCE_LEADERBOARD_URL = (
+    os.getenv("ATTENDANCE_LEADERBOARD_URL", CELERY_BROKER_URL)
+    if ENV != "test"
+    else "memory://"
+)
+# Seconds a leaderboard is kept after its last update
+ATTENDANCE_LEADERBOARD_TTL = int(
+    os.getenv("ATTENDANCE_LEADERBOARD_TTL", str(400 * 24 * 3600))
+)
+
+# Timezone of the company, in which the KPI periods and ranges start and end
+COMPANY_TIME_ZONE = os.getenv("COMPANY_TIME_ZONE", CELERY_TIMEZONE)
+
+# Rows fetched per round trip by the attendance CSV export (server-side cursor)
+ATTENDANCE_EXPORT_CHUNK_SIZE = int(os.getenv("ATTENDANCE_EXPORT_CHUNK_SIZE", "2000"))
+
+# Columnar snapshots of the closed days (NumPy files), from which historical
+# KPIs are computed without querying PostgreSQL. Empty to disable them
+ATTENDANCE_SNAPSHOT_DIR = (
+    os.getenv("ATTENDANCE_SNAPSHOT_DIR", os.path.join(BASE_DIR, "snapshots"))
+    if ENV != "test"
+    else ""
+)
+# Days after which a day is closed (no more excuses nor corrections)
+ATTENDANCE_SNAPSHOT_CLOSED_AFTER_DAYS = int(
+    os.getenv("ATTENDANCE_SNAPSHOT_CLOSED_AFTER_DAYS", "45")
+)
+
+# Monthly partitions of the attendance table created ahead of the current one
+ATTENDANCE_PARTITIONS_AHEAD = int(os.getenv("ATTENDANCE_PARTITIONS_AHEAD", "3"))
+
+# Years of attendances kept in the attendance table (the current one
+# included), the older ones are moved to the attendance archive. Restore the
+# archived years (archive_attendance --restore) before raising it
+ATTENDANCE_HOT_YEARS = int(os.getenv("ATTENDANCE_HOT_YEARS", "2"))
@@ -0,0 +1,57 @@
+# users/authentication.py
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from users.models import UserRolesMixin
+from users.utils import get_token_version
+
+
+class ClaimsUser(UserRolesMixin, TokenUser):
+    """
+    Lightweight user built from the claims of a RoleRefreshToken access token.
+    """
+
+    @cached_property
+    def email(self) -> str:
+        return self.token.get("email", "")
+
+    @cached_property
+    def group_names(self) -> frozenset:
+        return frozenset(self.token.get("roles", ()))
+
+    @cached_property
+    def team_ids(self) -> list:
+        return self.token.get("team_ids", [])
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication trusting the role and team claims of the access tokens
+    issued at login, without loading the user from the database.
+
+    The token version claim is checked against the user's token_version
+    (cached, see users.utils.get_token_version): bumping it revokes the
+    tokens issued so far. Tokens without claims use the default behavior.
+    """
+
+    def get_user(self, validated_token):
+        if "ver" not in validated_token:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+        if validated_token["ver"] != get_token_version(user_id):
+            raise AuthenticationFailed(
+                _("Token has been revoked."), code="token_revoked"
+            )
+
+        return ClaimsUser(validated_token)
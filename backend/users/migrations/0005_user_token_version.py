@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0004_alter_user_is_active"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="token_version",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Incremented to revoke the access tokens issued so far (e.g. on role or team changes).",
+            ),
+        ),
+    ]
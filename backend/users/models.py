@@ -4,6 +4,7 @@ from django.contrib.auth.models import (
     BaseUserManager,
     PermissionsMixin,
 )
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 
@@ -48,7 +49,35 @@ class UserManager(BaseUserManager):
         return self.prefetch_related("groups")
 
 
-class User(AbstractBaseUser, BaseModel, PermissionsMixin):
+class UserRolesMixin:
+    """
+    Role helpers, based on the `group_names` of the user.
+    """
+
+    def _is_in_group(self, group_name: str) -> bool:
+        """
+        Return True if the user belongs to the given group name.
+        """
+        return group_name in self.group_names
+
+    @property
+    def is_employee(self) -> bool:
+        return self._is_in_group(UserGroupChoices.EMPLOYEE.value)
+
+    @property
+    def is_manager(self) -> bool:
+        return self._is_in_group(UserGroupChoices.MANAGER.value)
+
+    @property
+    def is_company_admin(self) -> bool:
+        return self._is_in_group(UserGroupChoices.COMPANY_ADMIN.value)
+
+    @property
+    def is_manager_or_company_admin(self) -> bool:
+        return self.is_manager or self.is_company_admin
+
+
+class User(UserRolesMixin, AbstractBaseUser, BaseModel, PermissionsMixin):
     class Meta:
         verbose_name = _("User")
         verbose_name_plural = _("Users")
@@ -82,6 +111,13 @@ class User(AbstractBaseUser, BaseModel, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
     is_admin = models.BooleanField(default=False)
+    token_version = models.PositiveIntegerField(
+        default=0,
+        help_text=_(
+            "Incremented to revoke the access tokens issued so far "
+            "(e.g. on role or team changes)."
+        ),
+    )
 
     @property
     def fullname(self) -> str:
@@ -90,27 +126,14 @@ class User(AbstractBaseUser, BaseModel, PermissionsMixin):
 
         return f"{self.firstname} {self.lastname}".strip()
 
-    def _is_in_group(self, group_name: str) -> bool:
+    @cached_property
+    def group_names(self) -> frozenset:
         """
-        Return True if the user belongs to the given group name.
+        Names of the user's groups, resolved once per instance (i.e. once per
+        request for request.user). Reset when the user's groups change
+        (see users.signals).
         """
-        return any(group.name == group_name for group in self.groups.all())
-
-    @property
-    def is_employee(self) -> bool:
-        return self._is_in_group(UserGroupChoices.EMPLOYEE.value)
-
-    @property
-    def is_manager(self) -> bool:
-        return self._is_in_group(UserGroupChoices.MANAGER.value)
-
-    @property
-    def is_company_admin(self) -> bool:
-        return self._is_in_group(UserGroupChoices.COMPANY_ADMIN.value)
-
-    @property
-    def is_manager_or_company_admin(self) -> bool:
-        return self.is_manager or self.is_company_admin
+        return frozenset(group.name for group in self.groups.all())
 
     def __str__(self):
         if not self.is_authenticated:
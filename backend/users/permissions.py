@@ -20,7 +20,8 @@ class IsManagerOrCompanyAdmin(permissions.BasePermission):
 class IsSelfOrManagerOrCompanyAdmin(permissions.BasePermission):
     """
     Allows access if the user is:
-    - Themselves (user.id == target_id)
+    - Themselves (user.id == target_id, or the only user targeted by views
+      exposing get_target_user_ids)
     - A manager (user.is_manager)
     - A company admin (user.is_company_admin)
     """
@@ -35,6 +36,9 @@ class IsSelfOrManagerOrCompanyAdmin(permissions.BasePermission):
         if user.is_manager_or_company_admin:
             return True
 
+        if hasattr(view, "get_target_user_ids"):
+            return set(map(str, view.get_target_user_ids())) == {str(user.id)}
+
         return str(user.id) == str(target_id)
 
 
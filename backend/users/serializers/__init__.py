@@ -1,3 +1,3 @@
 from .base import UserCreateSerializer, UserUpdateSerializer, UserListSerializer  # noqa
-from .login import LoginInitSerializer, LoginVerifySerializer  # noqa
+from .login import LoginInitSerializer, LoginVerifySerializer, TokenRefreshSerializer  # noqa
 from .register import RegisterSerializer  # noqa
@@ -1,7 +1,6 @@
 # users - serializers.py
 import logging
 
-from django.contrib.auth.models import Group
 from django.utils.translation import gettext_lazy as _
 
 
@@ -9,6 +8,7 @@ from rest_framework import serializers
 
 from users.models import User
 from users.constants import UserGroupChoices
+from users.utils import get_group
 
 logger = logging.getLogger(__name__)
 
@@ -39,8 +39,10 @@ class BaseUserSerializer(serializers.ModelSerializer):
         ]
 
     def get_role(self, obj):
-        if obj.groups.exists():
-            return obj.groups.first().name
+        # Iterates all() so that prefetched groups do not cost a query
+        groups = sorted(obj.groups.all(), key=lambda group: group.pk)
+        if groups:
+            return groups[0].name
         return
 
 
@@ -48,7 +50,7 @@ class UserCreateSerializer(BaseUserSerializer):
     def create(self, validated_data):
         groups = validated_data.pop("groups", None)
         if not groups:
-            groups = [Group.objects.get(name=UserGroupChoices.EMPLOYEE)]
+            groups = [get_group(UserGroupChoices.EMPLOYEE)]
 
         user = User(**validated_data)
         user.save()
@@ -76,7 +78,7 @@ class UserUpdateSerializer(BaseUserSerializer):
             )
 
         if not groups:
-            groups = [Group.objects.get(name=UserGroupChoices.EMPLOYEE)]
+            groups = [get_group(UserGroupChoices.EMPLOYEE)]
 
         user.groups.set(groups)
         return user
@@ -6,11 +6,21 @@ from django.utils.translation import gettext_lazy as _
 
 
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import (
+    TokenRefreshSerializer as BaseTokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from users.models import LoginOTP
+from users.models import LoginOTP, User
 from users.serializers.register import RegisterSerializer
-from users.utils import generate_and_send_otp
+from users.tokens import RoleRefreshToken
+from users.utils import (
+    REVOKED_TOKEN_VERSION,
+    generate_and_send_otp,
+    get_token_version,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -79,12 +89,12 @@ class LoginVerifySerializer(serializers.Serializer):
         otp.is_used = True
         otp.save()
 
-        refresh = RefreshToken.for_user(otp.user)
-
         if not otp.user.is_active:
             otp.user.is_active = True
             otp.user.save()
 
+        refresh = RoleRefreshToken.for_user(otp.user)
+
         logger.info(f"Login success for {otp.user.email} via OTP")
 
         return {
@@ -93,3 +103,32 @@ class LoginVerifySerializer(serializers.Serializer):
             "refresh": str(refresh),
             "detail": _("Login successful."),
         }
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    """
+    Refreshes the access token with up-to-date claims (roles, teams) and
+    token version: a token version bump only revokes the access tokens, the
+    refresh tokens issued before it stay valid. Refresh tokens of deactivated
+    or deleted users are rejected.
+    """
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs["refresh"])
+        if "ver" not in refresh:
+            return super().validate(attrs)
+
+        # Checked before the base validation, which fails on deleted users.
+        # The cached token version can be stale: the user is checked again
+        user_id = refresh[api_settings.USER_ID_CLAIM]
+        user = None
+        if get_token_version(user_id) != REVOKED_TOKEN_VERSION:
+            user = User.objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed(
+                _("Token has been revoked."), code="token_revoked"
+            )
+
+        data = super().validate(attrs)
+        data["access"] = str(RoleRefreshToken.for_user(user).access_token)
+        return data
@@ -1,7 +1,6 @@
 # users - serializers/register.py
 import logging
 
-from django.contrib.auth.models import Group
 from django.utils.translation import gettext_lazy as _
 
 
@@ -9,6 +8,7 @@ from rest_framework import serializers
 
 from users.models import User
 from users.constants import UserGroupChoices
+from users.utils import get_group
 
 logger = logging.getLogger(__name__)
 
@@ -43,7 +43,7 @@ class RegisterSerializer(serializers.ModelSerializer):
         logger.info(f"Validating registration data from user {request.user.email}")
 
         groups = data.pop("groups", None)
-        employee_group = Group.objects.get(name=UserGroupChoices.EMPLOYEE)
+        employee_group = get_group(UserGroupChoices.EMPLOYEE)
 
         if not groups:
             groups = [employee_group]
@@ -0,0 +1,47 @@
+# users/signals.py
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import User
+from users.utils import bump_token_version, clear_group_registry, forget_token_versions
+
+
+@receiver([post_save, post_delete], sender=Group)
+def reset_group_registry(sender, **kwargs):
+    clear_group_registry()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def reset_user_roles(sender, instance, **kwargs):
+    """Forget the memoized roles of a user whose groups changed."""
+    if isinstance(instance, User):
+        instance.__dict__.pop("group_names", None)
+
+
+def _get_changed_user_ids(instance, action, pk_set, members):
+    if isinstance(instance, User):
+        return [instance.pk]
+    if action == "pre_clear":
+        return list(getattr(instance, members).values_list("pk", flat=True))
+    return pk_set or []
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def revoke_tokens_on_role_change(sender, instance, action, pk_set, **kwargs):
+    """Access tokens carry the roles: revoke them when groups change."""
+    if action in ("post_add", "post_remove", "pre_clear"):
+        bump_token_version(_get_changed_user_ids(instance, action, pk_set, "user_set"))
+
+
+@receiver(m2m_changed, sender="teams.Team_members")
+def revoke_tokens_on_team_change(sender, instance, action, pk_set, **kwargs):
+    """Access tokens carry the team ids: revoke them when teams change."""
+    if action in ("post_add", "post_remove", "pre_clear"):
+        bump_token_version(_get_changed_user_ids(instance, action, pk_set, "members"))
+
+
+@receiver([post_save, post_delete], sender=User)
+def reset_token_version(sender, instance, **kwargs):
+    """Re-check deactivated or deleted users on their next request."""
+    forget_token_versions([instance.pk])
@@ -0,0 +1,138 @@
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from teams.models import Team
+from users.authentication import ClaimsJWTAuthentication, ClaimsUser
+from users.constants import UserGroupChoices
+from users.tokens import RoleRefreshToken
+from users.utils import TOKEN_VERSION_CACHE_KEY, get_group
+
+from .base import BaseTestCase
+
+
+class ClaimsJWTAuthenticationTests(BaseTestCase):
+    """Test the stateless authentication with role claims"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.factory = APIRequestFactory()
+
+    def _authenticate(self, token):
+        request = self.factory.get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        return ClaimsJWTAuthentication().authenticate(request)
+
+    def test_claims_user_is_built_without_queries(self):
+        """A valid access token is trusted without loading the user"""
+        team = Team.objects.create(name="Team A")
+        team.members.add(self.manager)
+        token = RoleRefreshToken.for_user(self.manager).access_token
+
+        # Token version is cached after the first request
+        self._authenticate(token)
+        with self.assertNumQueries(0):
+            user, _ = self._authenticate(token)
+
+        self.assertIsInstance(user, ClaimsUser)
+        self.assertEqual(user.pk, self.manager.pk)
+        self.assertEqual(user.email, self.manager.email)
+        self.assertTrue(user.is_manager)
+        self.assertTrue(user.is_manager_or_company_admin)
+        self.assertFalse(user.is_company_admin)
+        self.assertEqual(user.team_ids, [team.id])
+
+    def test_role_change_revokes_tokens(self):
+        """Changing the groups of a user bumps its token version"""
+        token = RoleRefreshToken.for_user(self.employee).access_token
+        self._authenticate(token)
+
+        self.employee.groups.add(get_group(UserGroupChoices.MANAGER))
+
+        with self.assertRaises(AuthenticationFailed) as context:
+            self._authenticate(token)
+        self.assertEqual(context.exception.detail["code"], "token_revoked")
+
+    def test_team_change_revokes_tokens(self):
+        """Adding a user to a team bumps its token version"""
+        token = RoleRefreshToken.for_user(self.employee).access_token
+        self._authenticate(token)
+
+        Team.objects.create(name="Team A").members.add(self.employee)
+
+        with self.assertRaises(AuthenticationFailed) as context:
+            self._authenticate(token)
+        self.assertEqual(context.exception.detail["code"], "token_revoked")
+
+    def test_deactivated_user_is_rejected(self):
+        """Tokens of a deactivated user are rejected on the next request"""
+        token = RoleRefreshToken.for_user(self.employee).access_token
+        self._authenticate(token)
+
+        self.employee.is_active = False
+        self.employee.save()
+
+        with self.assertRaises(AuthenticationFailed) as context:
+            self._authenticate(token)
+        self.assertEqual(context.exception.detail["code"], "token_revoked")
+
+    def test_kpi_permissions_use_the_claims(self):
+        """KPI views check the roles and id carried by the token"""
+        token = RoleRefreshToken.for_user(self.employee).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        response = self.client.get(reverse("user_kpis", args=[self.employee.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(reverse("user_kpis", args=[self.manager.id]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_other_views_load_the_user(self):
+        """Views out of the clock and KPI paths authenticate a User"""
+        token = RoleRefreshToken.for_user(self.admin).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        response = self.client.get(reverse("attendance_export"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.wsgi_request.user, self.admin)
+
+    def test_refresh_issues_up_to_date_claims(self):
+        """A refresh token issued before a role change gets the new claims"""
+        refresh = RoleRefreshToken.for_user(self.employee)
+        self.employee.groups.add(get_group(UserGroupChoices.MANAGER))
+
+        response = self.client.post(
+            reverse("token_refresh"), {"refresh": str(refresh)}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user, _ = self._authenticate(response.json()["access"])
+        self.assertTrue(user.is_manager)
+
+    def test_refresh_of_a_deactivated_user_is_rejected(self):
+        """Refresh tokens of a deactivated user are revoked"""
+        refresh = RoleRefreshToken.for_user(self.employee)
+        self.employee.is_active = False
+        self.employee.save()
+
+        response = self.client.post(
+            reverse("token_refresh"), {"refresh": str(refresh)}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_of_a_deleted_user_is_rejected(self):
+        """Refresh tokens of a deleted user are revoked despite a stale cache"""
+        refresh = RoleRefreshToken.for_user(self.employee)
+        key = TOKEN_VERSION_CACHE_KEY.format(self.employee.pk)
+        version = cache.get(key)
+        self.employee.delete()
+        cache.set(key, version)
+
+        response = self.client.post(
+            reverse("token_refresh"), {"refresh": str(refresh)}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
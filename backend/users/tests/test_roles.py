@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.contrib.auth.models import Group
+from freezegun import freeze_time
+
+from users import utils
+from users.constants import UserGroupChoices
+from users.models import User
+from users.utils import clear_group_registry, get_group
+
+from .base import BaseTestCase
+
+
+class UserRolesTests(BaseTestCase):
+    """Test the role resolution of users and the group registry"""
+
+    def tearDown(self):
+        # Groups are rolled back without signals: drop them from the registry
+        clear_group_registry()
+
+    def test_roles_are_resolved_with_a_single_query(self):
+        """All role properties share one groups lookup per instance"""
+        user = User.objects.get(id=self.manager.id)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(user.is_manager)
+            self.assertFalse(user.is_employee)
+            self.assertFalse(user.is_company_admin)
+            self.assertTrue(user.is_manager_or_company_admin)
+
+    def test_roles_follow_group_changes(self):
+        """Changing the groups of a user resets its memoized roles"""
+        self.assertFalse(self.employee.is_manager)
+
+        self.employee.groups.add(get_group(UserGroupChoices.MANAGER))
+        self.assertTrue(self.employee.is_manager)
+
+        self.employee.groups.clear()
+        self.assertFalse(self.employee.is_employee)
+
+    def test_group_registry_is_reset_when_groups_change(self):
+        """Groups are fetched once, until a group is saved or deleted"""
+        get_group(UserGroupChoices.EMPLOYEE)
+        with self.assertNumQueries(0):
+            group = get_group(UserGroupChoices.EMPLOYEE)
+
+        Group.objects.filter(id=group.id).update(name="staff")
+        Group.objects.get(id=group.id).save()
+        Group.objects.create(name=UserGroupChoices.EMPLOYEE)
+
+        self.assertNotEqual(get_group(UserGroupChoices.EMPLOYEE).id, group.id)
+
+    def test_group_registry_follows_changes_from_other_processes(self):
+        """A registry reloads its groups once another process changed them"""
+        with freeze_time("2025-10-21 09:00:00") as frozen:
+            group = get_group(UserGroupChoices.EMPLOYEE)
+
+            # Change made in another process: its own registry is cleared and
+            # the shared version changes, this registry still holds the group
+            registry = dict(utils._groups)
+            version = utils._groups_version
+            Group.objects.filter(id=group.id).update(name="staff")
+            Group.objects.create(name=UserGroupChoices.EMPLOYEE)
+            clear_group_registry()
+            utils._groups.update(registry)
+            utils._groups_version = version
+
+            # The shared version is only checked once per interval
+            with self.assertNumQueries(0):
+                self.assertEqual(get_group(UserGroupChoices.EMPLOYEE).id, group.id)
+
+            frozen.tick(settings.GROUP_REGISTRY_CHECK_INTERVAL)
+            self.assertNotEqual(get_group(UserGroupChoices.EMPLOYEE).id, group.id)
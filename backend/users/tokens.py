@@ -0,0 +1,21 @@
+# users/tokens.py
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.utils import get_token_version
+
+
+class RoleRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the claims needed to authenticate without loading
+    the user (see users.authentication.ClaimsJWTAuthentication).
+    The claims are copied to the access tokens issued from it.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token["email"] = user.email
+        token["roles"] = sorted(user.group_names)
+        token["team_ids"] = sorted(user.teams.values_list("id", flat=True))
+        token["ver"] = get_token_version(user.pk)
+        return token
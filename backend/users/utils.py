@@ -2,9 +2,17 @@
 
 import random
 import logging
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 from datetime import timedelta
-from users.models import LoginOTP
+from users.models import LoginOTP, User
 from users.emails import OtpEmail
 
 logger = logging.getLogger(__name__)
@@ -26,3 +34,109 @@ def generate_and_send_otp(user):
     otp_email.send()
 
     return otp
+
+
+# {name: group}
+_groups = {}
+_groups_lock = threading.Lock()
+# Version of the registry (see GROUPS_VERSION_CACHE_KEY) and time.monotonic()
+# when it was last compared with the shared one
+_groups_version = None
+_groups_checked_at = None
+# Version of the group registries of all the processes, changed when groups
+# change
+GROUPS_VERSION_CACHE_KEY = "users:groups:version"
+
+
+def _set_groups_version(version):
+    global _groups_version, _groups_checked_at
+    with _groups_lock:
+        if version != _groups_version:
+            _groups.clear()
+            _groups_version = version
+        _groups_checked_at = time.monotonic()
+
+
+def get_group(name: str) -> Group:
+    """
+    Returns the Group with the given name (see UserGroupChoices) from a
+    process-wide registry, loaded on first use. The registry is reloaded at
+    once when groups change in this process (see users.signals and
+    clear_group_registry), and at most GROUP_REGISTRY_CHECK_INTERVAL
+    seconds after they changed in another one.
+    """
+    if (
+        _groups_checked_at is None
+        or time.monotonic() - _groups_checked_at
+        >= settings.GROUP_REGISTRY_CHECK_INTERVAL
+    ):
+        _set_groups_version(cache.get(GROUPS_VERSION_CACHE_KEY))
+
+    group = _groups.get(name)
+    if group is None:
+        group = Group.objects.get(name=name)
+        with _groups_lock:
+            _groups[name] = group
+    return group
+
+
+def _change_groups_version():
+    version = uuid.uuid4().hex
+    cache.set(GROUPS_VERSION_CACHE_KEY, version, None)
+    _set_groups_version(version)
+
+
+def clear_group_registry():
+    """
+    Makes every process reload its groups. Done again once the transaction
+    is committed, so that a group reloaded meanwhile is not kept.
+    """
+    _change_groups_version()
+    transaction.on_commit(_change_groups_version)
+
+
+TOKEN_VERSION_CACHE_KEY = "users:token_version:{}"
+# Cached for deactivated or deleted users, never matches a token
+REVOKED_TOKEN_VERSION = -1
+
+
+def get_token_version(user_id) -> int:
+    """
+    Returns the token version of an active user (REVOKED_TOKEN_VERSION for
+    inactive or unknown users), cached for TOKEN_VERSION_CACHE_TIMEOUT
+    seconds. The cache entry is dropped when the version is bumped.
+    """
+    key = TOKEN_VERSION_CACHE_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = (
+            User.objects.filter(pk=user_id, is_active=True)
+            .values_list("token_version", flat=True)
+            .first()
+        )
+        if version is None:
+            version = REVOKED_TOKEN_VERSION
+        cache.set(key, version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def forget_token_versions(user_ids):
+    """
+    Drops the cached token versions of the users. Done again once the
+    transaction is committed, so that a version read meanwhile (before the
+    change is visible) is not kept.
+    """
+    keys = [TOKEN_VERSION_CACHE_KEY.format(user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def bump_token_version(user_ids):
+    """
+    Revokes the access tokens issued so far to the given users, e.g. when
+    their roles or teams change (see users.signals). Their refresh tokens
+    get access tokens with the new claims.
+    """
+    user_ids = list(user_ids)
+    User.objects.filter(pk__in=user_ids).update(token_version=F("token_version") + 1)
+    forget_token_versions(user_ids)